@@ -0,0 +1 @@
+"""Offline benchmarks for the backend (run with ``python -m backend.benchmarks.<name>``)."""
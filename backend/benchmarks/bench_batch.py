@@ -0,0 +1,93 @@
+"""Throughput of /prompt/batch vs. sequential /prompt/ calls with a stubbed chat service.
+
+Every item needs three knowledge calls plus the group chat, each LLM call
+waiting ``--latency`` seconds, so the batch gains from running items
+concurrently.
+
+Usage: python -m backend.benchmarks.bench_batch --items 16 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+
+os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o")
+
+import httpx  # noqa: E402
+
+from backend.benchmarks.fake_chat import FakeChatCompletion  # noqa: E402
+from backend.cache import knowledge_cache  # noqa: E402
+from backend.main import app  # noqa: E402
+from backend.runtime import runtime_manager  # noqa: E402
+from backend.services import registry  # noqa: E402
+
+
+def make_items(count: int, run: str) -> list[dict]:
+    # Distinct prompts, so the knowledge cache doesn't answer repeated items
+    return [
+        {"prompt": f"Villa {run}-{i} in Bogenhausen, 4 bedrooms", "manager_mode": "fast"}
+        for i in range(count)
+    ]
+
+
+async def sequential(client: httpx.AsyncClient, items: list[dict]) -> int:
+    completed = 0
+    for item in items:
+        response = await client.post("/prompt/", json=item)
+        completed += response.status_code == 201
+    return completed
+
+
+async def batch(client: httpx.AsyncClient, items: list[dict], concurrency: int) -> int:
+    completed = 0
+    async with client.stream(
+        "POST", "/prompt/batch", json={"items": items, "concurrency": concurrency}
+    ) as response:
+        async for line in response.aiter_lines():
+            completed += json.loads(line).get("status") == "completed"
+    return completed
+
+
+async def main(args: argparse.Namespace) -> None:
+    service = FakeChatCompletion(ai_model_id="fake", latency=args.latency)
+    registry.register(os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT_NAME"], service)
+    transport = httpx.ASGITransport(app=app)
+
+    async with runtime_manager, httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        runs = [("sequential /prompt/", None)] + [
+            (f"/prompt/batch concurrency {c}", c) for c in args.concurrency
+        ]
+        baseline = None
+        for label, concurrency in runs:
+            knowledge_cache.clear()
+            items = make_items(args.items, label)
+            service.calls = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if concurrency is None:
+                    completed = await sequential(client, items)
+                else:
+                    completed = await batch(client, items, concurrency)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                f"{label:<30} {elapsed:7.2f} s  {args.items / elapsed:6.2f} items/s  "
+                f"x{baseline / elapsed:4.1f}  ({completed}/{args.items} ok, "
+                f"{service.calls} LLM calls)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=16)
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="fake LLM delay in seconds"
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    asyncio.run(main(parser.parse_args()))
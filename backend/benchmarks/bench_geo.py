@@ -0,0 +1,78 @@
+"""GridIndex at city scale: build time and radius / k-nearest query latency.
+
+Points are spread uniformly over the Munich area (about 20 x 26 km), split
+into six property types. Every query is compared with a brute-force
+vectorised distance scan.
+
+Usage: python -m backend.benchmarks.bench_geo --points 1000000
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from backend.geo import GridIndex, distance_km
+
+
+def timed(label: str, queries: list, func) -> None:
+    samples = []
+    for lat, lng in queries:
+        start = time.perf_counter()
+        found = func(lat, lng)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    print(
+        f"  {label:<30} p50 {statistics.median(samples):9.1f} us  "
+        f"p95 {samples[int(0.95 * (len(samples) - 1))]:9.1f} us  ({found} found)"
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(42)
+    lat = 48.06 + rng.random(args.points) * 0.18
+    lng = 11.40 + rng.random(args.points) * 0.35
+    groups = rng.integers(0, 6, args.points)
+
+    index = GridIndex(cell_km=args.cell_km)
+    start = time.perf_counter()
+    index.add_many(np.arange(args.points), lat, lng, groups)
+    print(f"indexed {len(index)} points in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        index.add(args.points + i, 48.14, 11.58, i % 6)
+    print(f"incremental add: {(time.perf_counter() - start) / 1000 * 1e6:.1f} us")
+
+    queries = list(zip(48.08 + rng.random(args.repeat) * 0.14, 11.43 + rng.random(args.repeat) * 0.29))
+    print("grid index:")
+    for radius in (0.5, 1.0):
+        timed(f"within {radius} km", queries, lambda a, b: len(index.within(a, b, radius)[0]))
+    for k in (15, 256):
+        timed(
+            f"nearest {k} of one type",
+            queries,
+            lambda a, b: len(index.nearest(a, b, k, group=1, max_radius_km=3)[0]),
+        )
+
+    print("brute-force scan:")
+    timed(
+        "within 1.0 km",
+        queries[:50],
+        lambda a, b: int(np.count_nonzero(distance_km(a, b, lat, lng) <= 1.0)),
+    )
+
+    def brute_nearest(a: float, b: float) -> int:
+        distances = np.where(groups == 1, distance_km(a, b, lat, lng), np.inf)
+        return len(np.argpartition(distances, 15)[:15])
+
+    timed("nearest 15 of one type", queries[:50], brute_nearest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--cell-km", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=1000)
+    main(parser.parse_args())
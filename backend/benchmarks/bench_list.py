@@ -0,0 +1,119 @@
+"""/api/property/list at scale: full listing vs. cursor pages and ETag revalidation.
+
+Usage: python -m backend.benchmarks.bench_list --records 100000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import backend.main as api  # noqa: E402
+from backend.repository import (  # noqa: E402
+    InMemoryPropertyRepository,
+    PropertyRepository,
+    SQLitePropertyRepository,
+)
+
+
+def populate(repository: PropertyRepository, records: int) -> None:
+    start = datetime(2025, 1, 1)
+    repository.add_many(
+        {
+            "id": f"property-{i:07d}",
+            "images": [],
+            "image_refs": [],
+            "description": "Bright apartment with balcony.",
+            "user_prompt": None,
+            "uploaded_at": (start + timedelta(seconds=30 * i)).isoformat(),
+            "processed": i % 4 == 0,
+        }
+        for i in range(records)
+    )
+
+
+def timed(label: str, func, repeat: int) -> None:
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<34} {elapsed * 1000:9.3f} ms  {result}")
+
+
+def bench(repository: PropertyRepository, records: int, repeat: int) -> None:
+    populate(repository, records)
+    api.property_repository = repository
+    client = TestClient(api.app)
+
+    def full_list() -> str:
+        # What the endpoint used to do: serialize every record on each poll
+        summaries = repository.list_summaries()
+        return f"{len(json.dumps(summaries)) // 1024} KB"
+
+    def first_page() -> str:
+        response = client.get("/api/property/list", params={"limit": 50})
+        return f"{len(response.content) // 1024} KB"
+
+    last = repository.list_summaries(limit=1, descending=True)[0]
+    deep_cursor = api._encode_cursor(
+        repository.list_summaries(descending=True, limit=101)[100]
+    )
+
+    def deep_page() -> str:
+        response = client.get(
+            "/api/property/list", params={"limit": 50, "cursor": deep_cursor}
+        )
+        return f"{len(response.json()['properties'])} rows"
+
+    def filtered_page() -> str:
+        response = client.get(
+            "/api/property/list",
+            params={
+                "status": "processed",
+                "order": "desc",
+                "uploaded_from": "2025-01-10",
+                "uploaded_before": last["uploaded_at"],
+                "limit": 50,
+            },
+        )
+        return f"{len(response.json()['properties'])} rows"
+
+    etag = client.get("/api/property/list", params={"limit": 50}).headers["ETag"]
+
+    def not_modified() -> str:
+        response = client.get(
+            "/api/property/list",
+            params={"limit": 50},
+            headers={"If-None-Match": etag},
+        )
+        return str(response.status_code)
+
+    timed("full list (previous behaviour)", full_list, max(1, repeat // 50))
+    timed("first page", first_page, repeat)
+    timed("page via cursor near the end", deep_page, repeat)
+    timed("status + date range filter", filtered_page, repeat)
+    timed("If-None-Match revalidation", not_modified, repeat)
+
+
+def main(args: argparse.Namespace) -> None:
+    print(f"in-memory repository, {args.records} records:")
+    bench(InMemoryPropertyRepository(), args.records, args.repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"SQLite repository, {args.records} records:")
+        repository = SQLitePropertyRepository(os.path.join(directory, "properties.db"))
+        bench(repository, args.records, args.repeat)
+        repository.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
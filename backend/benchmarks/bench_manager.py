@@ -0,0 +1,115 @@
+"""LLM calls, wall-clock time and manager prompt sizes per manager and expert mode.
+
+Compares the LLM and the fast-path manager, each with sequential expert turns
+and with the first round answered by all experts concurrently. With
+--complete-answers every mode also runs with experts that mention price,
+size, bedrooms and location, so the LLM manager ends the chat by its local
+completeness check; the LLM calls saved count every call (termination,
+selection, expert turns and result), not only the skipped termination calls.
+
+Usage: python -m backend.benchmarks.bench_manager --requests 20 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o")
+
+from backend.benchmarks.fake_chat import (  # noqa: E402
+    COMPLETE_EXPERT_ANSWER,
+    FakeChatCompletion,
+)
+from backend.completeness import termination_stats  # noqa: E402
+from backend.groupchat import EXPERT_MODES, do_groupchat  # noqa: E402
+from backend.models import GeneratedKnowledge  # noqa: E402
+from backend.runtime import runtime_manager  # noqa: E402
+from backend.services import registry  # noqa: E402
+from backend.tokens import manager_prompt_stats  # noqa: E402
+
+
+async def run(
+    service: FakeChatCompletion,
+    manager_mode: str,
+    expert_mode: str,
+    answers: str,
+    args: argparse.Namespace,
+) -> float:
+    """Run ``args.requests`` sequential group chats, print per-chat averages and
+    return the LLM calls per chat."""
+    requests = args.requests
+    knowledge = GeneratedKnowledge()
+    turns = 0
+
+    async def on_event(event: str, data: dict) -> None:
+        nonlocal turns
+        if event == "agent_turn":
+            turns += 1
+
+    service.calls = 0
+    manager_prompt_stats.clear()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(requests):
+            await do_groupchat(
+                knowledge,
+                on_event=on_event,
+                manager_mode=manager_mode,
+                expert_mode=expert_mode,
+                max_rounds=args.max_rounds,
+            )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{manager_mode:>4} manager, {expert_mode:>10} experts, {answers:>8} answers: "
+        f"{service.calls / requests:5.1f} LLM calls, "
+        f"{turns / requests:4.1f} expert turns, "
+        f"{elapsed / requests * 1000:8.1f} ms per group chat"
+    )
+    for call, stats in manager_prompt_stats.stats().items():
+        print(
+            f"  {call:<18} avg {stats['avg_tokens']:7.1f} tokens, "
+            f"max {stats['max_tokens']:5d} tokens / {stats['max_messages']} messages"
+        )
+    return service.calls / requests
+
+
+async def main(args: argparse.Namespace) -> None:
+    service = FakeChatCompletion(ai_model_id="fake", latency=args.latency)
+    registry.register(os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT_NAME"], service)
+    answers = {"generic": service.expert_answer}
+    if args.complete_answers:
+        answers["complete"] = COMPLETE_EXPERT_ANSWER
+
+    async with runtime_manager:
+        for manager_mode in ("llm", "fast"):
+            for expert_mode in EXPERT_MODES:
+                calls = {}
+                for name, answer in answers.items():
+                    service.expert_answer = answer
+                    calls[name] = await run(service, manager_mode, expert_mode, name, args)
+                if "complete" in calls:
+                    print(
+                        f"  LLM calls saved by complete answers: "
+                        f"{calls['generic'] - calls['complete']:.1f} per group chat"
+                    )
+    stats = termination_stats.stats()
+    print(
+        f"completeness check: {stats['early_terminations']} of {stats['chats']} chats "
+        f"ended early, {stats['termination_calls_skipped']} termination calls skipped, "
+        f"{stats['rounds_saved']} rounds saved"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="fake LLM delay in seconds"
+    )
+    parser.add_argument("--max-rounds", type=int, help="expert turns per group chat")
+    parser.add_argument("--complete-answers", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,269 @@
+"""End-to-end latency of the API with a fake chat service, for local runs and CI.
+
+Drives /prompt/ (knowledge + group chat), /api/property/upload and
+/api/property/generate (upload, then queue the generation and poll the
+status until the job has finished) in-process through the ASGI app. Every
+LLM call is answered by FakeChatCompletion with a configurable latency
+distribution, so no Azure access is needed and runs are repeatable.
+
+Reports p50/p95/p99 latency, throughput, LLM calls and tokens per scenario and
+the peak RSS of the process. With --max-p95-ms, --min-throughput or
+--max-rss-mb the exit code is 1 when a threshold is missed, e.g.:
+
+Usage: python -m backend.benchmarks.bench_pipeline --requests 64 --concurrency 8 \
+    --latency 0.05 --latency-distribution lognormal --latency-spread 0.5 \
+    --max-p95-ms prompt=2000 --json results.json
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o")
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from backend.benchmarks.fake_chat import (  # noqa: E402
+    LATENCY_DISTRIBUTIONS,
+    FakeChatCompletion,
+)
+from backend.jobs import FINISHED_STATES  # noqa: E402
+
+SCENARIOS = ("prompt", "upload", "generate")
+
+
+def make_image(seed: int, size: tuple[int, int] = (640, 480)) -> str:
+    """A small base64 JPEG; the seed keeps images of different requests apart."""
+    image = Image.effect_noise(size, 64 + seed % 32).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[round(q / 100 * (len(ordered) - 1))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _prompt(client: httpx.AsyncClient, i: int, args: argparse.Namespace) -> None:
+    response = await client.post(
+        "/prompt/",
+        json={
+            # Distinct prompts, so neither the cache nor single-flight answers
+            "prompt": f"Villa {args.run}-{i} in Bogenhausen, 4 bedrooms, 280 sqm",
+            "manager_mode": args.manager_mode,
+        },
+    )
+    response.raise_for_status()
+
+
+def make_upload(i: int, args: argparse.Namespace) -> dict:
+    return {
+        "images": [make_image(i * args.images + n) for n in range(args.images)],
+        "description": f"Bright apartment {args.run}-{i} with balcony in Maxvorstadt",
+    }
+
+
+async def _upload(client: httpx.AsyncClient, body: dict) -> str:
+    response = await client.post("/api/property/upload", json=body)
+    response.raise_for_status()
+    return response.json()["property_id"]
+
+
+async def _generate(client: httpx.AsyncClient, property_id: str) -> None:
+    response = await client.post(f"/api/property/generate/{property_id}")
+    response.raise_for_status()
+    while True:
+        status = (await client.get(f"/api/property/status/{property_id}")).json()
+        job = status.get("job") or {}
+        if job.get("state") in FINISHED_STATES:
+            if not status["processed"]:
+                raise RuntimeError(f"Generation {job['state']}: {job.get('error')}")
+            return
+        await asyncio.sleep(0.005)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    service: FakeChatCompletion,
+    scenario: str,
+    args: argparse.Namespace,
+) -> dict:
+    """Run ``args.requests`` requests of a scenario and return its statistics."""
+    # Request bodies and uploads to generate from are prepared untimed
+    uploads = property_ids = []
+    if scenario in ("upload", "generate"):
+        uploads = [make_upload(i, args) for i in range(args.requests)]
+    if scenario == "generate":
+        property_ids = [await _upload(client, body) for body in uploads]
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if scenario == "prompt":
+                    await _prompt(client, i, args)
+                elif scenario == "upload":
+                    await _upload(client, uploads[i])
+                else:
+                    await _generate(client, property_ids[i])
+            except (httpx.HTTPError, RuntimeError):
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    calls, prompt_tokens, completion_tokens = (
+        service.calls, service.prompt_tokens, service.completion_tokens
+    )
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "requests": args.requests,
+        "errors": errors,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "llm_calls": service.calls - calls,
+        "prompt_tokens": service.prompt_tokens - prompt_tokens,
+        "completion_tokens": service.completion_tokens - completion_tokens,
+    }
+    for q in (50, 95, 99):
+        result[f"p{q}_ms"] = (
+            round(percentile(latencies, q) * 1000, 1) if latencies else None
+        )
+    return result
+
+
+def parse_thresholds(values: list[str]) -> dict[str, float]:
+    """``scenario=value`` pairs; a bare value applies to every scenario."""
+    thresholds = {}
+    for value in values:
+        scenario, _, number = value.rpartition("=")
+        for name in [scenario] if scenario else SCENARIOS:
+            if name not in SCENARIOS:
+                raise SystemExit(f"Unknown scenario in threshold: {name}")
+            thresholds[name] = float(number)
+    return thresholds
+
+
+def check_thresholds(results: dict, args: argparse.Namespace) -> list[str]:
+    failures = []
+    for scenario, limit in parse_thresholds(args.max_p95_ms).items():
+        p95 = results.get(scenario, {}).get("p95_ms")
+        if p95 is not None and p95 > limit:
+            failures.append(f"{scenario}: p95 {p95} ms > {limit} ms")
+    for scenario, limit in parse_thresholds(args.min_throughput).items():
+        throughput = results.get(scenario, {}).get("throughput_rps")
+        if throughput is not None and throughput < limit:
+            failures.append(f"{scenario}: {throughput} req/s < {limit} req/s")
+    for scenario, stats in results.items():
+        if stats["errors"]:
+            failures.append(f"{scenario}: {stats['errors']} failed requests")
+    if args.max_rss_mb is not None and peak_rss_mb() > args.max_rss_mb:
+        failures.append(f"peak RSS {peak_rss_mb():.0f} MB > {args.max_rss_mb} MB")
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    from backend.cache import knowledge_cache
+    from backend.main import app
+    from backend.services import registry
+
+    service = FakeChatCompletion(
+        ai_model_id="fake",
+        latency=args.latency,
+        latency_distribution=args.latency_distribution,
+        latency_spread=args.latency_spread,
+        seed=args.seed,
+        output_tokens=args.output_tokens,
+    )
+    results = {}
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        registry.register(os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT_NAME"], service)
+        for scenario in args.scenarios:
+            knowledge_cache.clear()
+            results[scenario] = stats = await run_scenario(client, service, scenario, args)
+            print(
+                f"{scenario:<9} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+                f"p99 {stats['p99_ms']:8.1f} ms  {stats['throughput_rps']:7.2f} req/s  "
+                f"{stats['llm_calls']:5d} LLM calls  "
+                f"{stats['prompt_tokens'] + stats['completion_tokens']:8d} tokens  "
+                f"({stats['errors']} errors)"
+            )
+    print(f"peak RSS  {peak_rss_mb():.0f} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(
+                {"config": vars(args), "results": results, "peak_rss_mb": round(peak_rss_mb(), 1)},
+                file,
+                indent=2,
+            )
+    failures = check_thresholds(results, args)
+    for failure in failures:
+        print(f"FAILED {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--manager-mode", choices=("llm", "fast"), default="llm")
+    parser.add_argument("--images", type=int, default=2, help="images per upload")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="fake LLM delay (median) in seconds"
+    )
+    parser.add_argument(
+        "--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="fixed"
+    )
+    parser.add_argument(
+        "--latency-spread",
+        type=float,
+        default=0.0,
+        help="+/- seconds (uniform) or sigma (lognormal)",
+    )
+    parser.add_argument("--output-tokens", type=int, default=0, help="words per expert answer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run", default="bench", help="prefix of the generated prompts")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument(
+        "--max-p95-ms", nargs="*", default=[], metavar="[SCENARIO=]MS"
+    )
+    parser.add_argument(
+        "--min-throughput", nargs="*", default=[], metavar="[SCENARIO=]RPS"
+    )
+    parser.add_argument("--max-rss-mb", type=float)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Uploaded images of the benchmark never end up in the working directory
+        os.environ.setdefault("BLOB_STORE_DIR", os.path.join(directory, "blobs"))
+        sys.exit(asyncio.run(main(arguments)))
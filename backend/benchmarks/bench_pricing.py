@@ -0,0 +1,116 @@
+"""ComparablesEngine at scale: single and batch pricing latency.
+
+Compares the windowed engine with a brute-force vectorised scan over the
+whole corpus, which is what a "simple" NumPy implementation would do.
+
+Usage: python -m backend.benchmarks.bench_pricing --listings 1000000
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from backend.pricing import ComparablesEngine
+
+TYPES = np.array(["Villa", "Apartment", "House", "Penthouse", "Loft", "Townhouse"])
+
+
+def make_corpus(rng: np.random.Generator, size: int) -> dict:
+    sqft = rng.integers(300, 4000, size).astype(float)
+    lat = 48.06 + rng.random(size) * 0.18
+    lng = 11.40 + rng.random(size) * 0.35
+    return {
+        "price": sqft * rng.uniform(250, 600, size),
+        "sqft": sqft,
+        "bedrooms": np.clip(np.round(sqft / 700) + rng.integers(-1, 2, size), 1, 8),
+        "types": TYPES[rng.integers(0, len(TYPES), size)],
+        "lat": lat,
+        "lng": lng,
+    }
+
+
+def brute_force(corpus: dict, sqft: float, bedrooms: float, type_: str, k: int) -> float:
+    same_type = corpus["types"] == type_
+    distance = (np.log(corpus["sqft"] / sqft) / 0.25) ** 2 + (corpus["bedrooms"] - bedrooms) ** 2
+    distance[~same_type] = np.inf
+    nearest = np.argpartition(distance, k)[:k]
+    return float(np.median(corpus["price"][nearest]))
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(42)
+    corpus = make_corpus(rng, args.listings)
+    engine = ComparablesEngine()
+
+    start = time.perf_counter()
+    engine.add_arrays(
+        corpus["price"], corpus["sqft"], corpus["bedrooms"],
+        corpus["types"], corpus["lat"], corpus["lng"],
+    )
+    print(f"indexed {len(engine)} listings in {time.perf_counter() - start:.2f} s")
+
+    samples = []
+    for i in range(100):
+        start = time.perf_counter()
+        engine.add(f"new-{i}", {
+            "price": 900000, "details": {"sqft": 2000, "bedrooms": 3, "type": "House"},
+            "location": {"coordinates": {"lat": 48.14, "lng": 11.58}},
+        })
+        samples.append((time.perf_counter() - start) * 1e6)
+    # The maximum includes growing the columns once after the bulk load
+    print(
+        f"incremental add:    p50 {statistics.median(samples):8.1f} us  "
+        f"max {max(samples):8.1f} us"
+    )
+
+    queries = make_corpus(rng, args.batch)
+    start = time.perf_counter()
+    engine.price(
+        queries["price"][0], queries["sqft"][0], queries["bedrooms"][0],
+        queries["types"][0], queries["lat"][0], queries["lng"][0],
+    )
+    print(f"price() with merge: {(time.perf_counter() - start) * 1e6:8.1f} us (100 pending adds)")
+
+    samples = []
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        result = engine.price(
+            queries["price"][i], queries["sqft"][i], queries["bedrooms"][i],
+            queries["types"][i], queries["lat"][i], queries["lng"][i],
+        )
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    print(
+        f"single price():     p50 {statistics.median(samples):8.1f} us  "
+        f"p95 {samples[int(0.95 * (len(samples) - 1))]:8.1f} us  "
+        f"(sample_size {result['sample_size']}, {result['market_position']})"
+    )
+
+    start = time.perf_counter()
+    batch = engine.price_many(
+        queries["price"], queries["sqft"], queries["bedrooms"],
+        queries["types"], queries["lat"], queries["lng"],
+    )
+    elapsed = time.perf_counter() - start
+    positions = dict(zip(*np.unique(batch["market_position"], return_counts=True)))
+    print(
+        f"price_many({args.batch}): {elapsed * 1000:8.1f} ms total, "
+        f"{elapsed / args.batch * 1e6:.2f} us per listing  {positions}"
+    )
+
+    samples = []
+    for i in range(min(args.repeat, 20)):
+        start = time.perf_counter()
+        brute_force(corpus, queries["sqft"][i], queries["bedrooms"][i], queries["types"][i], 15)
+        samples.append((time.perf_counter() - start) * 1e6)
+    print(f"brute-force scan:   p50 {statistics.median(samples):8.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listings", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=500)
+    main(parser.parse_args())
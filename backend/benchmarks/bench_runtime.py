@@ -0,0 +1,96 @@
+"""Sustained group chat throughput: shared runtime vs. a runtime per request,
+and how fast a failing group chat returns its error instead of waiting for
+the timeout.
+
+Usage: python -m backend.benchmarks.bench_runtime --requests 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import time
+
+os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o")
+
+from backend.benchmarks.fake_chat import FakeChatCompletion  # noqa: E402
+from backend import groupchat, runtime  # noqa: E402
+from backend.groupchat import do_groupchat  # noqa: E402
+from backend.models import GeneratedKnowledge  # noqa: E402
+from backend.runtime import RuntimeManager  # noqa: E402
+from backend.services import registry  # noqa: E402
+
+
+class FailingChatCompletion(FakeChatCompletion):
+    """Fails every expert turn, like an unreachable deployment."""
+
+    def _respond(self, response_format, chat_history) -> str:
+        if response_format is None:
+            raise ConnectionError("Deployment unreachable.")
+        return super()._respond(response_format, chat_history)
+
+
+async def run(requests: int, concurrency: int) -> float:
+    """Run ``requests`` group chats, ``concurrency`` at a time; return req/s."""
+    semaphore = asyncio.Semaphore(concurrency)
+    knowledge = GeneratedKnowledge()
+
+    async def one() -> None:
+        async with semaphore:
+            await do_groupchat(knowledge)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*[one() for _ in range(requests)])
+    return requests / (time.perf_counter() - start)
+
+
+async def time_to_error() -> float:
+    """Seconds until a group chat with failing experts raises."""
+    # The runtime logs the handler's exception before it reaches the result
+    logging.getLogger("in_process_runtime").setLevel(logging.CRITICAL)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await do_groupchat(GeneratedKnowledge())
+    except ConnectionError:
+        return time.perf_counter() - start
+    raise RuntimeError("The group chat did not fail.")
+
+
+async def main(args: argparse.Namespace) -> None:
+    deployment = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT_NAME"]
+    for shared in (False, True):
+        registry.register(
+            deployment, FakeChatCompletion(ai_model_id="fake", latency=args.latency)
+        )
+        # do_groupchat() runs on the module's runtime manager
+        runtime.runtime_manager = manager = RuntimeManager(
+            max_concurrency=args.concurrency, timeout=args.timeout, shared=shared
+        )
+        groupchat.runtime_manager = manager
+        label = "shared runtime:     " if shared else "per-request runtime:"
+        async with manager:
+            throughput = await run(args.requests, args.concurrency)
+            print(f"{label} {throughput:8.1f} orchestrations/s")
+
+            registry.register(
+                deployment, FailingChatCompletion(ai_model_id="fake", latency=args.latency)
+            )
+            elapsed = await time_to_error()
+            print(
+                f"{label} {elapsed * 1000:8.1f} ms to error (timeout {args.timeout:.0f} s)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="fake LLM delay in seconds"
+    )
+    parser.add_argument("--timeout", type=float, default=60.0, help="orchestration timeout")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""PropertySearchIndex at scale: build time, incremental updates and query latency.
+
+Usage: python -m backend.benchmarks.bench_search --listings 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from backend.search import PropertySearchIndex
+
+TYPES = ["Villa", "Apartment", "House", "Penthouse", "Loft", "Townhouse"]
+ADJECTIVES = ["Modern", "Charming", "Bright", "Spacious", "Renovated", "Quiet", "Luxurious"]
+NEIGHBORHOODS = [
+    "Bogenhausen", "Maxvorstadt", "Pasing", "Schwabing", "Haidhausen",
+    "Sendling", "Giesing", "Nymphenburg", "Lehel", "Trudering",
+]
+FEATURES = [
+    "Garden", "Garage", "Balcony", "Elevator", "Fireplace", "Terrace", "Sauna",
+    "Pool", "Basement", "Modern Kitchen", "City Views", "Parking", "Solar Panels",
+]
+WORDS = (
+    "bright quiet family friendly close to schools and public transport with "
+    "renovated bathrooms large windows hardwood floors open plan living area"
+).split()
+
+
+def make_listing(rng: random.Random, i: int) -> dict:
+    property_type = rng.choice(TYPES)
+    neighborhood = rng.choice(NEIGHBORHOODS)
+    sqft = rng.randint(30, 400)
+    price = sqft * rng.randint(5000, 14000)
+    return {
+        "id": f"listing-{i}",
+        "title": f"{rng.choice(ADJECTIVES)} {property_type} in {neighborhood}",
+        "price": price,
+        "pricePerSqft": price // sqft,
+        "details": {"bedrooms": rng.randint(1, 7), "sqft": sqft, "type": property_type},
+        "features": rng.sample(FEATURES, rng.randint(2, 6)),
+        "description": " ".join(rng.choices(WORDS, k=30)),
+    }
+
+
+def percentile(samples: list[float], q: float) -> float:
+    return sorted(samples)[int(q * (len(samples) - 1))]
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(42)
+    listings = [make_listing(rng, i) for i in range(args.listings)]
+    index = PropertySearchIndex()
+
+    start = time.perf_counter()
+    for listing in listings:
+        index.add(listing["id"], listing)
+    print(f"indexed {len(index)} listings in {time.perf_counter() - start:.2f} s")
+
+    updates = [make_listing(rng, rng.randrange(args.listings)) for _ in range(1000)]
+    start = time.perf_counter()
+    for listing in updates:
+        index.add(listing["id"], listing)
+    print(f"incremental update: {(time.perf_counter() - start) / len(updates) * 1e6:.1f} us")
+
+    queries = {
+        "word (sauna)": dict(query="sauna"),
+        "two words (villa bogenhausen)": dict(query="villa bogenhausen"),
+        "words + price range": dict(
+            query="penthouse pool", ranges={"price": (1_000_000, 3_000_000)}
+        ),
+        "narrow price range": dict(ranges={"price": (2_000_000, 2_010_000)}),
+        "sqft + bedrooms ranges": dict(
+            ranges={"sqft": (120, 125), "bedrooms": (3, 4)}, sort="price_asc"
+        ),
+        "broad range (price >= 1M)": dict(ranges={"price": (1_000_000, None)}),
+    }
+    print(f"{'query':<32} {'matches':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    for label, kwargs in queries.items():
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            _, total = index.search(limit=20, **kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{label:<32} {total:>8} {statistics.median(samples):>9.3f} "
+            f"{percentile(samples, 0.95):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
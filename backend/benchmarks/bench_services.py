@@ -0,0 +1,89 @@
+"""Compare pooled registry services with a fresh client per call.
+
+Usage: python -m backend.benchmarks.bench_services --requests 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from semantic_kernel.contents import ChatHistory
+
+from backend.benchmarks.fake_openai_server import FakeOpenAIServer
+from backend.services import ServiceRegistry
+
+DEPLOYMENT = "gpt-4o"
+
+
+async def _call(service) -> float:
+    history = ChatHistory()
+    history.add_user_message("ping")
+    start = time.perf_counter()
+    settings = service.get_prompt_execution_settings_class()()
+    await service.get_chat_message_content(history, settings=settings)
+    return time.perf_counter() - start
+
+
+async def run_fresh(url: str, requests: int, concurrency: int) -> list[float]:
+    """Build (and close) a new client for every call, like the old code did."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            registry = ServiceRegistry(endpoint=url, api_key="fake")
+            try:
+                return await _call(registry.get_chat_service(DEPLOYMENT))
+            finally:
+                await registry.aclose()
+
+    return await asyncio.gather(*[one() for _ in range(requests)])
+
+
+async def run_pooled(url: str, requests: int, concurrency: int) -> list[float]:
+    """Share one pooled service across all calls."""
+    semaphore = asyncio.Semaphore(concurrency)
+    registry = ServiceRegistry(endpoint=url, api_key="fake")
+    service = registry.get_chat_service(DEPLOYMENT)
+
+    async def one() -> float:
+        async with semaphore:
+            return await _call(service)
+
+    try:
+        return await asyncio.gather(*[one() for _ in range(requests)])
+    finally:
+        await registry.aclose()
+
+
+def report(name: str, latencies: list[float], wall: float) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:>7}: mean {statistics.mean(latencies) * 1000:7.2f} ms  "
+        f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+        f"p95 {p95 * 1000:7.2f} ms  "
+        f"{len(latencies) / wall:8.1f} req/s"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    for name, runner in (("fresh", run_fresh), ("pooled", run_pooled)):
+        start = time.perf_counter()
+        latencies = await runner(args.url, args.requests, args.concurrency)
+        report(name, latencies, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="server delay in seconds"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(port=args.port, latency=args.latency) as server:
+        args.url = server.url
+        asyncio.run(main(args))
@@ -0,0 +1,122 @@
+"""Peak Python memory per upload: base64 JSON vs. multipart streamed to the blob store.
+
+Runs the API with uvicorn in a background thread and streams both request
+bodies from disk, so the traced peak is dominated by the server side.
+
+Usage: python -m backend.benchmarks.bench_upload --images 5 --size-mb 4
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+import httpx
+import uvicorn
+
+CHUNK_SIZE = 3 * 64 * 1024  # Multiple of 3, so chunks base64-encode independently
+
+
+def _read_chunks(path: str):
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+def json_body(paths: list[str], description: str):
+    """Yield a PropertyImageUpload JSON body with base64 images."""
+    yield b'{"images": ['
+    for i, path in enumerate(paths):
+        yield b',"' if i else b'"'
+        for chunk in _read_chunks(path):
+            yield base64.b64encode(chunk)
+        yield b'"'
+    yield f'], "description": "{description}"}}'.encode()
+
+
+def multipart_body(paths: list[str], description: str, boundary: str):
+    """Yield a multipart/form-data body with the raw image files."""
+    yield (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="description"\r\n\r\n'
+        f"{description}\r\n"
+    ).encode()
+    for i, path in enumerate(paths):
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="images"; filename="image{i}.jpg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n"
+        ).encode()
+        yield from _read_chunks(path)
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
+
+
+def measure(client: httpx.Client, url: str, content, headers: dict) -> float:
+    """Return the traced peak in MB above the level before the request."""
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    response = client.post(url, content=content, headers=headers)
+    response.raise_for_status()
+    return (tracemalloc.get_traced_memory()[1] - baseline) / 1024 / 1024
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["BLOB_STORE_DIR"] = os.path.join(directory, "blobs")
+        from backend.main import app
+
+        paths = []
+        for i in range(args.images):
+            path = os.path.join(directory, f"image{i}.jpg")
+            with open(path, "wb") as file:
+                file.write(os.urandom(int(args.size_mb * 1024 * 1024)))
+            paths.append(path)
+
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        base_url = f"http://127.0.0.1:{args.port}"
+        description = "Bright apartment with balcony and garden."
+        boundary = uuid.uuid4().hex
+        total_mb = args.images * args.size_mb
+        tracemalloc.start()
+        try:
+            with httpx.Client(base_url=base_url, timeout=120) as client:
+                json_peak = measure(
+                    client,
+                    "/api/property/upload",
+                    json_body(paths, description),
+                    {"Content-Type": "application/json"},
+                )
+                multipart_peak = measure(
+                    client,
+                    "/api/property/upload/multipart",
+                    multipart_body(paths, description, boundary),
+                    {"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                )
+        finally:
+            tracemalloc.stop()
+            server.should_exit = True
+            thread.join()
+
+        print(f"upload of {args.images} x {args.size_mb} MB ({total_mb:.1f} MB):")
+        print(f"  base64 JSON: {json_peak:8.1f} MB peak")
+        print(f"  multipart:   {multipart_peak:8.1f} MB peak")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--port", type=int, default=8766)
+    main(parser.parse_args())
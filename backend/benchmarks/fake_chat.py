@@ -0,0 +1,211 @@
+"""Deterministic in-process chat completion service for offline benchmarks."""
+
+import asyncio
+import json
+import random
+
+from semantic_kernel.agents.orchestration.group_chat import BooleanResult, StringResult
+from semantic_kernel.connectors.ai.chat_completion_client_base import (
+    ChatCompletionClientBase,
+)
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatHistory,
+    ChatMessageContent,
+    StreamingChatMessageContent,
+)
+
+from backend.tokens import count_message_tokens, count_tokens
+
+EXPERTS = ["CustomerExpert", "LocationExpert", "ImageExpert"]
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+EXPERT_ANSWER = "Fake expert assessment of the property."
+# An answer that covers every fact of backend.completeness
+COMPLETE_EXPERT_ANSWER = (
+    "The villa is located in Bogenhausen, has 4 bedrooms on 280 sqm "
+    "and should be listed at €1,200,000."
+)
+FILLER_WORDS = (
+    "bright spacious renovated quiet central garden balcony kitchen transport "
+    "schools parking terrace family modern light view"
+).split()
+
+SAMPLE_PROPERTY = {
+    "property": {
+        "id": "fake-property",
+        "title": "Modern Villa with Garden",
+        "price": 1200000,
+        "pricePerSqft": 4286,
+        "location": {
+            "address": "Musterstraße 1, Munich",
+            "city": "Munich",
+            "state": "Bavaria",
+            "zipCode": "81675",
+            "neighborhood": "Bogenhausen",
+            "coordinates": {"lat": 48.1549, "lng": 11.6187},
+        },
+        "details": {
+            "bedrooms": 4,
+            "bathrooms": 3,
+            "sqft": 280,
+            "type": "Villa",
+            "yearBuilt": 2018,
+            "parking": 2,
+            "lotSize": 900,
+        },
+        "images": [],
+        "features": ["Garden", "Garage", "Modern Kitchen"],
+        "description": "A bright modern villa in a quiet residential street.",
+        "listing": {
+            "datePosted": "2025-07-15T00:00:00",
+            "daysOnMarket": 0,
+            "status": "active",
+            "agent": {
+                "name": "AI Generated Agent",
+                "company": "Real Estate AI",
+                "phone": "+49 89 123456789",
+                "email": "agent@realestate-ai.com",
+            },
+        },
+        "confidence_score": 0.9,
+        "ai_suggestions": ["Add floor plans"],
+        "pricing_analysis": {
+            "market_position": "competitive",
+            "confidence": 0.85,
+            "price_difference_percentage": 2.5,
+            "comparable_properties": {
+                "avg_price": 1170000,
+                "min_price": 950000,
+                "max_price": 1400000,
+                "sample_size": 12,
+            },
+            "recommendations": ["Price is competitive"],
+            "market_insights": ["Strong demand in Bogenhausen"],
+        },
+    },
+    "processing_time": 0.0,
+    "recommendations": ["Ready to publish"],
+}
+
+
+def _sample_value(path: str):
+    value = SAMPLE_PROPERTY
+    for key in path.split("."):
+        value = value[int(key)] if isinstance(value, list) else value[key]
+    return value
+
+
+class FakeChatCompletion(ChatCompletionClientBase):
+    """Answers every request after a delay and counts the calls and tokens.
+
+    The delay is ``latency`` seconds ("fixed"), uniform in ``latency`` +/-
+    ``latency_spread`` ("uniform") or lognormal with median ``latency`` and
+    sigma ``latency_spread`` ("lognormal"). Delays depend only on ``seed`` and
+    the call number, so runs are repeatable. Expert answers are padded to
+    ``output_tokens`` words. ``expert_answer`` is the text experts answer with.
+
+    Manager calls get valid BooleanResult/StringResult JSON: termination is
+    always declined (the round limit ends the chat) and speakers are selected
+    round-robin. The structured result filter returns SAMPLE_PROPERTY with
+    ``result_overrides`` (dotted path -> value) applied, e.g. to produce
+    invalid fields; repair requests get the SAMPLE_PROPERTY values back.
+    """
+
+    latency: float = 0.0
+    latency_distribution: str = "fixed"
+    latency_spread: float = 0.0
+    seed: int = 0
+    output_tokens: int = 0
+    expert_answer: str = EXPERT_ANSWER
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    next_speaker: int = 0
+    result_overrides: dict = {}
+
+    async def _inner_get_chat_message_contents(
+        self, chat_history: ChatHistory, settings
+    ) -> list[ChatMessageContent]:
+        delay = self._delay(self.calls)
+        self.calls += 1
+        await asyncio.sleep(delay)
+        response_format = settings.extension_data.get("response_format")
+        content = self._respond(response_format, chat_history)
+        usage = CompletionUsage(
+            prompt_tokens=count_message_tokens(chat_history.messages),
+            completion_tokens=count_tokens(content),
+        )
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        return [
+            ChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                content=content,
+                ai_model_id=self.ai_model_id,
+                metadata={"usage": usage},
+            )
+        ]
+
+    def _delay(self, call: int) -> float:
+        if self.latency_distribution == "fixed":
+            return self.latency
+        rng = random.Random(self.seed * 1_000_003 + call)
+        if self.latency_distribution == "uniform":
+            return max(
+                0.0,
+                rng.uniform(
+                    self.latency - self.latency_spread, self.latency + self.latency_spread
+                ),
+            )
+        if self.latency_distribution == "lognormal":
+            return self.latency * rng.lognormvariate(0.0, self.latency_spread)
+        raise ValueError(f"Unknown latency distribution: {self.latency_distribution}.")
+
+    async def _inner_get_streaming_chat_message_contents(
+        self, chat_history: ChatHistory, settings, function_invoke_attempt: int = 0
+    ):
+        (message,) = await self._inner_get_chat_message_contents(chat_history, settings)
+        yield [
+            StreamingChatMessageContent(
+                role=message.role,
+                content=message.content,
+                choice_index=0,
+                ai_model_id=self.ai_model_id,
+            )
+        ]
+
+    def _respond(self, response_format, chat_history: ChatHistory) -> str:
+        if isinstance(response_format, dict) and response_format.get("type") == "json_schema":
+            result = json.loads(json.dumps(SAMPLE_PROPERTY))
+            for path, value in self.result_overrides.items():
+                *parents, key = path.split(".")
+                target = result
+                for parent in parents:
+                    target = target[parent]
+                target[key] = value
+            return json.dumps(result)
+        if isinstance(response_format, dict) and response_format.get("type") == "json_object":
+            fields = json.loads(str(chat_history.messages[-1].content))
+            return json.dumps(
+                {"fixes": [{"path": f["path"], "value": _sample_value(f["path"])} for f in fields]}
+            )
+        if response_format is BooleanResult:
+            return BooleanResult(result=False, reason="Fake.").model_dump_json()
+        if response_format is StringResult:
+            last = str(chat_history.messages[-1].content) if chat_history.messages else ""
+            if "select the next participant" in last:
+                speaker = EXPERTS[self.next_speaker % len(EXPERTS)]
+                self.next_speaker += 1
+                return StringResult(result=speaker, reason="Fake.").model_dump_json()
+            return StringResult(
+                result=json.dumps(SAMPLE_PROPERTY), reason="Fake."
+            ).model_dump_json()
+        if self.output_tokens <= 0:
+            return self.expert_answer
+        words = [
+            FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(self.output_tokens)
+        ]
+        return f"{self.expert_answer} {' '.join(words)}"
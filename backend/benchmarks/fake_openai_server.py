@@ -0,0 +1,54 @@
+"""Minimal OpenAI-compatible chat completions server for local benchmarks."""
+
+import asyncio
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI
+
+app = FastAPI(title="Fake Azure OpenAI")
+app.state.latency = 0.0
+
+
+@app.post("/openai/deployments/{deployment}/chat/completions")
+async def chat_completions(deployment: str, body: dict):
+    """Answer every chat completion request with a fixed message after a delay."""
+    await asyncio.sleep(app.state.latency)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "Fake response."},
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    }
+
+
+class FakeOpenAIServer:
+    """Runs the fake server with uvicorn in a background thread."""
+
+    def __init__(self, port: int = 8765, latency: float = 0.0) -> None:
+        app.state.latency = latency
+        self.url = f"http://127.0.0.1:{port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join()
@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Local content-addressed blob store for uploaded images.
+
+Uploads are copied to disk in fixed-size chunks while their SHA-256 is
+computed, so an image is never held in memory as a whole (or as base64). The
+property records only keep the returned references; identical images are
+stored once. Because a blob may be shared by several records, nothing deletes
+a single upload's blobs; sweep() removes the ones no record references.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import re
+import time
+import uuid
+from typing import Optional, Protocol
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_BLOB_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobTooLarge(ValueError):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+class BlobStore:
+    """Stores blobs under ``<directory>/<sha[:2]>/<sha>`` with a metadata sidecar."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_blob_bytes: Optional[int] = None,
+    ) -> None:
+        """Initialize the store.
+
+        Defaults come from BLOB_STORE_DIR ("blob_store") and
+        BLOB_STORE_MAX_BYTES (10 MB per blob).
+        """
+        self.directory = directory or os.getenv("BLOB_STORE_DIR", "blob_store")
+        self.chunk_size = chunk_size
+        self.max_blob_bytes = max_blob_bytes or int(
+            os.getenv("BLOB_STORE_MAX_BYTES", str(10 * 1024 * 1024))
+        )
+
+    def path(self, blob_id: str) -> str:
+        """Return the file path of a blob (the id is validated)."""
+        if not _BLOB_ID.match(blob_id):
+            raise KeyError(blob_id)
+        return os.path.join(self.directory, blob_id[:2], blob_id)
+
+    async def save_stream(self, source: AsyncReadable, content_type: str) -> dict:
+        """Copy ``source`` chunk by chunk into the store and return its reference."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        file = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while chunk := await source.read(self.chunk_size):
+                size += len(chunk)
+                if size > self.max_blob_bytes:
+                    raise BlobTooLarge(
+                        f"Image exceeds the limit of {self.max_blob_bytes} bytes."
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(file.write, chunk)
+        except BaseException:
+            file.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        file.close()
+
+        blob_id = digest.hexdigest()
+        await asyncio.to_thread(self._commit, tmp_path, blob_id, content_type)
+        return {"blob_id": blob_id, "content_type": content_type, "size": size}
+
+    async def save_bytes(self, data: bytes, content_type: str) -> dict:
+        """Store an in-memory blob and return its reference."""
+        blob_id = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self._write, blob_id, data, content_type)
+        return {"blob_id": blob_id, "content_type": content_type, "size": len(data)}
+
+    async def read(self, blob_id: str) -> tuple[bytes, str]:
+        """Return the bytes and content type of a blob."""
+        return await asyncio.to_thread(self._read, blob_id)
+
+    def content_type(self, blob_id: str) -> str:
+        """Return the stored content type of a blob."""
+        with open(f"{self.path(blob_id)}.type", "r", encoding="utf-8") as file:
+            return file.read()
+
+    def exists(self, blob_id: str) -> bool:
+        """Whether a blob is stored."""
+        try:
+            return os.path.exists(self.path(blob_id))
+        except KeyError:
+            return False
+
+    def sweep(self, referenced: set[str], min_age: float) -> int:
+        """Delete blobs not in ``referenced`` and unchanged for ``min_age`` seconds.
+
+        Storing a blob renews its modification time, so ``min_age`` protects the
+        blobs of uploads whose record is not written yet (and blobs stored again
+        since ``referenced`` was collected). Leftover temporary files of
+        interrupted uploads are removed as well. Returns the number of blobs deleted.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - min_age
+        deleted = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                file_path = os.path.join(root, name)
+                is_blob = _BLOB_ID.match(name) is not None
+                if not is_blob and not name.endswith(".tmp"):
+                    continue  # Sidecars go with their blob
+                if is_blob and name in referenced:
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    if os.stat(file_path).st_mtime >= cutoff:
+                        continue
+                    if is_blob:
+                        self._delete(name)
+                        deleted += 1
+                    else:
+                        os.remove(file_path)
+        return deleted
+
+    def _commit(self, tmp_path: str, blob_id: str, content_type: str) -> None:
+        path = self.path(blob_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.type", "w", encoding="utf-8") as file:
+            file.write(content_type)
+        # Identical content has the same id, so replacing an existing blob is
+        # harmless and renews its modification time for sweep()
+        os.replace(tmp_path, path)
+
+    def _write(self, blob_id: str, data: bytes, content_type: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        self._commit(tmp_path, blob_id, content_type)
+
+    def _delete(self, blob_id: str) -> None:
+        path = self.path(blob_id)
+        for file_path in (path, f"{path}.type"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(file_path)
+
+    def _read(self, blob_id: str) -> tuple[bytes, str]:
+        with open(self.path(blob_id), "rb") as file:
+            data = file.read()
+        return data, self.content_type(blob_id)
+
+
+blob_store = BlobStore()
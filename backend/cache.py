@@ -0,0 +1,193 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Content-addressed cache for knowledge-agent responses.
+
+Sellers retry and edit listings all the time, which re-submits the same prompt
+and images to the three knowledge agents. Responses are cached under a hash of
+the agent instructions, the prompt text and the image bytes, in an in-memory
+LRU tier and an optional on-disk tier.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Union
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + optional disk) cache with TTL and size limits."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 24 * 60 * 60,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        """Initialize the cache; ``directory`` enables the on-disk tier."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bytes = 0
+        self._disk_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Create a cache configured by the KNOWLEDGE_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.getenv("KNOWLEDGE_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("KNOWLEDGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl=float(os.getenv("KNOWLEDGE_CACHE_TTL", str(24 * 60 * 60))),
+            directory=os.getenv("KNOWLEDGE_CACHE_DIR") or None,
+            max_disk_bytes=int(
+                os.getenv("KNOWLEDGE_CACHE_MAX_DISK_BYTES", str(512 * 1024 * 1024))
+            ),
+        )
+
+    @staticmethod
+    def key(
+        instructions: str, prompt: str, images: Iterable[Union[str, bytes]] = ()
+    ) -> str:
+        """Return the content address of an agent request."""
+        digest = hashlib.sha256()
+        for part in (instructions, prompt, *images):
+            data = part.encode("utf-8") if isinstance(part, str) else part
+            # Length prefix so ("ab", "c") and ("a", "bc") hash differently
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response for ``key`` or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            created, value = entry
+            if time.time() - created <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._remove(key)
+
+        if self.directory:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._store(key, *entry)
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[1]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        """Cache ``value`` under ``key`` in both tiers."""
+        created = time.time()
+        self._store(key, created, value)
+        if self.directory:
+            await asyncio.to_thread(self._write_disk, key, created, value)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current memory footprint."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def clear(self) -> None:
+        """Drop the memory tier (the disk tier is left alone)."""
+        self._entries.clear()
+        self._bytes = 0
+
+    # Memory tier
+
+    def _store(self, key: str, created: float, value: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (created, value)
+        self._bytes += len(value)
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    # Disk tier (runs in a worker thread)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[tuple[float, str]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - entry["created"] > self.ttl:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            return None
+        return entry["created"], entry["value"]
+
+    def _write_disk(self, key: str, created: float, value: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"created": created, "value": value}, file)
+        os.replace(tmp_path, path)
+
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete expired entries, then the oldest ones beyond max_disk_bytes."""
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                with contextlib.suppress(FileNotFoundError):
+                    stat = os.stat(path)
+                    if now - stat.st_mtime > self.ttl:
+                        os.remove(path)
+                    else:
+                        files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+            self.evictions += 1
+
+
+knowledge_cache = ResponseCache.from_env()
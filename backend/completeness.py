@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Local check whether a group chat already covers the facts of a listing.
+
+The result filter needs price, size, bedrooms and location for the
+AIGeneratedProperty. Once the experts have mentioned all of them, the manager
+can end the discussion without asking the model (see should_terminate).
+The patterns are deliberately simple and match English and German answers.
+"""
+
+import re
+from collections.abc import Iterable
+
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from backend.geo import find_neighborhood
+
+_NUMBER = r"\d[\d.,']*"
+# A capitalised name (case-sensitive even in the IGNORECASE patterns)
+_NAME = r"(?-i:[A-ZÄÖÜ][\w'-]*)"
+
+FACT_PATTERNS = {
+    "price": re.compile(
+        rf"(?:€|\beur(?:o|os)?\b)\s*{_NUMBER}"
+        rf"|{_NUMBER}\s*(?:k\b|m\b|mio\.?|million\w*)?\s*(?:€|\beur(?:o|os)?\b)"
+        rf"|{_NUMBER}\s*(?:mio\.?|million\w*)",
+        re.IGNORECASE,
+    ),
+    "sqft": re.compile(
+        rf"{_NUMBER}\s*(?:sq\.?\s?ft\b|sqft\b|square\s+f(?:ee|oo)t\b|sqm\b|m²|m2\b|qm\b"
+        r"|square\s+met(?:er|re)s?\b|quadratmeter\w*)",
+        re.IGNORECASE,
+    ),
+    "bedrooms": re.compile(
+        r"\d+\s*-?\s*(?:bedrooms?\b|beds?\b|schlafzimmer\b|zimmer\b)"
+        r"|(?:bedrooms?|schlafzimmer)\s*[:=]?\s*\d+",
+        re.IGNORECASE,
+    ),
+    # A street with house number, or a named district or city; a cue like
+    # "located in" or "address" alone is not a location
+    "location": re.compile(
+        rf"{_NAME}(?:straße|strasse|str\.|weg|gasse|allee|platz)\s+\d"
+        rf"|\b\d+\w?,?\s+{_NAME}(?:\s+{_NAME})?\s+(?:street|st\.|road|rd\.|avenue|ave\.|lane)"
+        r"|\b(?:located|situated|gelegen|liegt)\s+in\s+(?:the\s+|der\s+|dem\s+)?"
+        rf"(?:(?:district|neighbou?rhood|city)\s+of\s+)?{_NAME}"
+        rf"|\b(?:district|neighbou?rhood|city|stadtteil|stadt)\s+(?:of\s+)?{_NAME}"
+        rf"|\b(?:address|adresse)\s*[:=]?\s*{_NAME}[^\n]*?\d",
+        re.IGNORECASE,
+    ),
+}
+
+REQUIRED_FACTS = tuple(FACT_PATTERNS)
+
+
+def listing_facts(text: str) -> set[str]:
+    """Return the required facts (price, sqft, bedrooms, location) mentioned in ``text``."""
+    facts = {fact for fact, pattern in FACT_PATTERNS.items() if pattern.search(text)}
+    if "location" not in facts and find_neighborhood(text) is not None:
+        facts.add("location")
+    return facts
+
+
+def missing_facts(messages: Iterable[ChatMessageContent]) -> list[str]:
+    """Required facts that no expert message of the discussion mentions yet."""
+    found: set[str] = set()
+    for message in messages:
+        if message.role == AuthorRole.ASSISTANT:
+            found |= listing_facts(str(message.content or ""))
+            if len(found) == len(REQUIRED_FACTS):
+                return []
+    return [fact for fact in REQUIRED_FACTS if fact not in found]
+
+
+class TerminationStats:
+    """Rounds and manager calls of finished group chats, for /api/metrics."""
+
+    def __init__(self) -> None:
+        self.chats = 0
+        self.early_terminations = 0
+        self.termination_calls_skipped = 0
+        self.rounds_used = 0
+        self.rounds_saved = 0
+
+    def record_skipped_call(self) -> None:
+        """Count a termination decision made without the model."""
+        self.termination_calls_skipped += 1
+
+    def record_chat(self, rounds_used: int, max_rounds: int, early: bool) -> None:
+        """Count a finished discussion; ``early`` if the completeness check ended it."""
+        self.chats += 1
+        self.rounds_used += rounds_used
+        if early:
+            self.early_terminations += 1
+            self.rounds_saved += max(max_rounds - rounds_used, 0)
+
+    def stats(self) -> dict:
+        """Return the totals and the average rounds per chat."""
+        return {
+            "chats": self.chats,
+            "early_terminations": self.early_terminations,
+            "termination_calls_skipped": self.termination_calls_skipped,
+            "rounds_used": self.rounds_used,
+            "rounds_saved": self.rounds_saved,
+            "avg_rounds": self.rounds_used / self.chats if self.chats else 0.0,
+        }
+
+
+termination_stats = TerminationStats()
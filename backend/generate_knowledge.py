@@ -3,32 +3,114 @@
 # Copyright (c) Microsoft. All rights reserved.
 
 import asyncio
+import base64
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Optional
 
 from dotenv import load_dotenv
+from opentelemetry import trace
 from semantic_kernel.agents import ChatCompletionAgent
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatMessageContent,
+    ImageContent,
+    TextContent,
+)
+
+from backend.blob_store import blob_store
+from backend.cache import knowledge_cache
+from backend.images import image_stats, preprocess_images
+from backend.models import Coordinates, GeneratedKnowledge, Input  # Import aus models.py statt aus main.py
+from backend.pricing import pricing_engine
+from backend.services import get_chat_service
+from backend.telemetry import knowledge_duration, tracer, usage_attributes
 
-from backend.models import Input  # Import aus models.py statt aus main.py
+KNOWLEDGE_DEPLOYMENT = "gpt-4o"
 
-agentLocal = ChatCompletionAgent(
-    service=AzureChatCompletion(deployment_name="gpt-4o"),
-    name="Assistant",
-    instructions="You are a location assessment specialist. Generate some knowledge.",
+LOCATION_INSTRUCTIONS = (
+    "You are a location assessment specialist. Generate some knowledge."
+)
+CUSTOMER_INSTRUCTIONS = (
+    "You are a customer assessment specialist. Generate some knowledge."
 )
+IMAGES_INSTRUCTIONS = "You are a real estate image assessment specialist. Analyze the provided property images and describe the property features, condition, style, layout, and any notable aspects visible in the images."
 
+# Deadline per knowledge agent; an agent missing it is replaced by its fallback text
+KNOWLEDGE_DEADLINE_SECONDS = float(os.getenv("KNOWLEDGE_DEADLINE_SECONDS", "45"))
+# Send a second, identical request if the first has not answered after this
+# many seconds and use whichever answers first (0 disables hedging)
+KNOWLEDGE_HEDGE_AFTER_SECONDS = float(os.getenv("KNOWLEDGE_HEDGE_AFTER_SECONDS", "0"))
 
-agentCustomer = ChatCompletionAgent(
-    service=AzureChatCompletion(deployment_name="gpt-4o"),
-    name="Assistant",
-    instructions="You are a customer assessment specialist. Generate some knowledge.",
-)
 
+class KnowledgeStats:
+    """Latency, deadline and hedging counters per knowledge agent, for /api/metrics."""
 
-agentImages = ChatCompletionAgent(
-    service=AzureChatCompletion(deployment_name="gpt-4o"),
-    name="Assistant",
-    instructions="You are a real estate image assessment specialist. Analyze the provided property images and describe the property features, condition, style, layout, and any notable aspects visible in the images.",
-)
+    def __init__(self, window: int = 1024) -> None:
+        self._window = window
+        self._latencies: dict[str, deque] = {}
+        self._counts: dict[str, dict[str, int]] = {}
+
+    def record(
+        self, agent: str, seconds: float, timed_out: bool, hedged: bool, hedge_won: bool
+    ) -> None:
+        """Add one agent call; ``seconds`` is the time until an answer or the deadline."""
+        self._latencies.setdefault(agent, deque(maxlen=self._window)).append(seconds)
+        counts = self._counts.setdefault(
+            agent, {"calls": 0, "deadline_hits": 0, "hedged": 0, "hedge_wins": 0}
+        )
+        counts["calls"] += 1
+        counts["deadline_hits"] += timed_out
+        counts["hedged"] += hedged
+        counts["hedge_wins"] += hedge_won
+
+    def stats(self) -> dict:
+        """Return the counters and p50/p95/p99/max latency (ms) of the recent calls."""
+        result = {}
+        for agent, counts in self._counts.items():
+            latencies = sorted(self._latencies[agent])
+            last = len(latencies) - 1
+            result[agent] = {
+                **counts,
+                **{
+                    f"p{q}_ms": round(latencies[round(q / 100 * last)] * 1000, 1)
+                    for q in (50, 95, 99)
+                },
+                "max_ms": round(latencies[-1] * 1000, 1),
+            }
+        return result
+
+
+knowledge_stats = KnowledgeStats()
+
+
+def get_knowledge_agents() -> tuple[
+    ChatCompletionAgent, ChatCompletionAgent, ChatCompletionAgent
+]:
+    """Return the location, customer and image agents.
+
+    The agents are cheap wrappers; the underlying service comes from the shared
+    registry, so no new HTTP connection pool is created per request.
+    """
+    service = get_chat_service(KNOWLEDGE_DEPLOYMENT)
+    agentLocal = ChatCompletionAgent(
+        service=service,
+        name="Assistant",
+        instructions=LOCATION_INSTRUCTIONS,
+    )
+    agentCustomer = ChatCompletionAgent(
+        service=service,
+        name="Assistant",
+        instructions=CUSTOMER_INSTRUCTIONS,
+    )
+    agentImages = ChatCompletionAgent(
+        service=service,
+        name="Assistant",
+        instructions=IMAGES_INSTRUCTIONS,
+    )
+    return agentLocal, agentCustomer, agentImages
 
 
 # async def get_bing_agent():
@@ -46,43 +128,272 @@ agentImages = ChatCompletionAgent(
 # bing_agent = asyncio.run(get_bing_agent())
 
 
-async def generate_knowledge(input: Input):
-    # Parallel execution of both agent queries
-    location_task = agentLocal.get_response(
-        messages=[input.prompt],
+def decode_image(image: str) -> tuple[bytes, str]:
+    """Return (bytes, mime type) of a base64 string or data URL.
+
+    Raises ValueError for anything else, e.g. an http(s) URL.
+    """
+    mime_type = "image/jpeg"
+    if image.startswith("data:"):
+        header, _, image = image.partition(",")
+        mime_type = header[len("data:") :].split(";")[0] or mime_type
+    try:
+        # validate: without it, characters outside the alphabet are dropped
+        # silently and a URL may "decode" to garbage
+        data = base64.b64decode("".join(image.split()), validate=True)
+    except ValueError:  # binascii.Error
+        data = b""
+    if not data:
+        raise ValueError("not a base64-encoded image or data URL")
+    return data, mime_type
+
+
+async def load_images(input: Input) -> list[tuple[bytes, str]]:
+    """Return (bytes, mime type) of the request's images.
+
+    ``input.images`` holds base64 strings (optionally data URLs) from JSON
+    clients, ``input.image_ids`` references images in the blob store.
+    """
+    images = [decode_image(image) for image in input.images]
+    for blob_id in input.image_ids:
+        images.append(await blob_store.read(blob_id))
+    return images
+
+
+async def _cached_response(
+    agent: ChatCompletionAgent,
+    prompt: str,
+    images: Optional[list[tuple[bytes, str]]] = None,
+) -> str:
+    """Return the agent's answer, reusing a cached one for identical requests."""
+    key = knowledge_cache.key(
+        f"{KNOWLEDGE_DEPLOYMENT}\n{agent.instructions}",
+        prompt,
+        [data for data, _ in images or []],
     )
+    span = trace.get_current_span()
+    cached = await knowledge_cache.get(key)
+    span.set_attribute("knowledge.cached", cached is not None)
+    if cached is not None:
+        return cached
+
+    if images is not None:
+        # Die Bilder werden als Bytes übergeben, nicht als base64-Strings im Speicher gehalten
+        message = ChatMessageContent(
+            role=AuthorRole.USER,
+            items=[
+                TextContent(text=prompt),
+                *(
+                    ImageContent(data=data, mime_type=mime_type)
+                    for data, mime_type in images
+                ),
+            ],
+        )
+        response = await agent.get_response(messages=[message])
+    else:
+        response = await agent.get_response(messages=[prompt])
 
-    customer_task = agentCustomer.get_response(
-        messages=[input.prompt],
+    span.set_attributes(usage_attributes(response.message))
+    content = str(response)
+    await knowledge_cache.set(key, content)
+    return content
+
+
+async def _answer_within_deadline(
+    name: str,
+    request: Callable[[], Awaitable[str]],
+    fallback: str,
+    deadline: Optional[float] = None,
+    hedge_after: Optional[float] = None,
+) -> tuple[str, bool]:
+    """Return the agent's answer and whether it missed the deadline.
+
+    ``request`` is called once, and a second time if ``hedge_after`` seconds
+    pass without an answer; the first answer wins and the other call is
+    cancelled. Without an answer by the deadline, ``fallback`` is returned.
+    If every call fails, the first error is raised.
+    """
+    deadline = KNOWLEDGE_DEADLINE_SECONDS if deadline is None else deadline
+    hedge_after = KNOWLEDGE_HEDGE_AFTER_SECONDS if hedge_after is None else hedge_after
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    errors = []
+    winner = None
+    with tracer.start_as_current_span(
+        "knowledge", attributes={"knowledge.agent": name}
+    ) as span:
+        # The calls run as tasks of this span, so their attributes land on it
+        tasks = [asyncio.ensure_future(request())]
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                now = loop.time() - start
+                if now >= deadline:
+                    break
+                hedge_pending = hedge_after > 0 and len(tasks) == 1
+                timeout = deadline - now
+                if hedge_pending:
+                    timeout = min(timeout, max(hedge_after - now, 0))
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        winner = winner or task
+                    else:
+                        errors.append(task.exception())
+                if winner is None and hedge_pending and loop.time() - start >= hedge_after:
+                    tasks.append(asyncio.ensure_future(request()))
+                    pending.add(tasks[-1])
+        finally:
+            for task in pending:
+                task.cancel()
+
+        elapsed = loop.time() - start
+        timed_out = winner is None and not (errors and not pending)
+        span.set_attributes(
+            {"knowledge.timed_out": timed_out, "knowledge.hedged": len(tasks) > 1}
+        )
+    knowledge_stats.record(
+        name,
+        elapsed,
+        timed_out=timed_out,
+        hedged=len(tasks) > 1,
+        hedge_won=winner is not None and winner is not tasks[0],
+    )
+    knowledge_duration.record(
+        elapsed, {"knowledge.agent": name, "knowledge.timed_out": timed_out}
     )
+    if winner is not None:
+        return winner.result(), False
+    if errors and not pending:
+        raise errors[0]
+    return fallback, True
+
 
-    # Prepare images for the image agent (assuming input.images contains base64 encoded images)
-    images_task = agentImages.get_response(
-        messages=["Here are my images"],
-        image_references=[
-            {"image_data": {"url": f"data:image/jpeg;base64,{img}"}}
-            for img in input.images
-        ],
+async def _emit_when_done(
+    name: str,
+    task: Awaitable[tuple[str, bool]],
+    on_event: Optional[Callable[[str, dict], Awaitable[None]]],
+) -> str:
+    """Await a knowledge task and report its result as soon as it is available."""
+    content, timed_out = await task
+    if on_event is not None:
+        await on_event(
+            "knowledge", {"agent": name, "content": content, "timed_out": timed_out}
+        )
+    return content
+
+
+def nearby_listings_context(
+    coordinates: Optional[Coordinates], radius_km: float = 1.0, limit: int = 5
+) -> str:
+    """Generated listings around the property, for the LocationExpert.
+
+    Empty without coordinates: a neighbourhood named in the prompt only gives
+    its centre, and distances from there would look more precise than they
+    are. Listings generated without a real address carry coordinates spread
+    around their neighbourhood centre (see geo.neighborhood_coordinates), so
+    distances to those are approximate.
+    """
+    if coordinates is None:
+        return ""
+    listings, total = pricing_engine.nearby(
+        coordinates.lat, coordinates.lng, radius_km, limit
     )
+    if not listings:
+        return ""
+    lines = [f"Listings within {radius_km:g} km of the property: {total}, nearest:"]
+    for listing in listings:
+        lines.append(
+            f"- {listing['type'].title()}, {listing['sqft']:.0f} sqft, "
+            f"€{listing['price']:,.0f} ({listing['distance_km']:.1f} km away)"
+        )
+    return "\n".join(lines) + "\n\n"
+
+
+async def generate_knowledge(
+    input: Input,
+    dump_dir: Optional[str] = None,
+    on_event: Optional[Callable[[str, dict], Awaitable[None]]] = None,
+) -> GeneratedKnowledge:
+    """Generate the knowledge for the group chat experts of a single request.
+
+    The result is returned in memory so concurrent requests never share state. If
+    ``dump_dir`` (or the KNOWLEDGE_DUMP_DIR env var) is set, the knowledge is
+    additionally written there for debugging. ``on_event`` receives the image
+    preprocessing report ("images_preprocessed") and a "knowledge" event per
+    agent as soon as that agent has answered.
+    """
+    agentLocal, agentCustomer, agentImages = get_knowledge_agents()
+    fallbacks = GeneratedKnowledge()
+
+    # Parallel execution of all agent queries
+    location_task = _emit_when_done(
+        "location",
+        _answer_within_deadline(
+            "location",
+            lambda: _cached_response(agentLocal, input.prompt),
+            fallbacks.location,
+        ),
+        on_event,
+    )
+
+    customer_task = _emit_when_done(
+        "customer",
+        _answer_within_deadline(
+            "customer",
+            lambda: _cached_response(agentCustomer, input.prompt),
+            fallbacks.customer,
+        ),
+        on_event,
+    )
+
+    async def image_knowledge() -> str:
+        # Runs inside gather, so loading and preprocessing overlap with the
+        # location and customer calls.
+        # Bilder verkleinern und Duplikate entfernen, bevor sie das Vision-Modell sieht
+        images, image_report = await asyncio.to_thread(
+            preprocess_images, await load_images(input)
+        )
+        image_stats.record(image_report)
+        if on_event is not None:
+            await on_event("images_preprocessed", image_report)
+
+        return await _emit_when_done(
+            "images",
+            _answer_within_deadline(
+                "images",
+                lambda: _cached_response(agentImages, "Here are my images", images),
+                fallbacks.images,
+            ),
+            on_event,
+        )
 
     # Wait for all tasks to complete simultaneously
     location_response, customer_response, images_response = await asyncio.gather(
-        location_task, customer_task, images_task
+        location_task, customer_task, image_knowledge()
     )
 
-    with open("generated_knowledge_location.txt", "w", encoding="utf-8") as file:
-        file.write(f"Location Assessment:\n{location_response}\n\n")
-
-    with open("generated_knowledge_customer.txt", "w", encoding="utf-8") as file:
-        file.write(f"Customer Assessment:\n{customer_response}\n")
+    knowledge = GeneratedKnowledge(
+        location=(
+            f"Location Assessment:\n{location_response}\n\n"
+            f"{nearby_listings_context(input.coordinates)}"
+        ),
+        customer=f"Customer Assessment:\n{customer_response}\n",
+        images=f"Images Assessment:\n{images_response}\n",
+    )
 
-    with open("generated_knowledge_images.txt", "w", encoding="utf-8") as file:
-        file.write(f"Images Assessment:\n{images_response}\n")
+    dump_dir = dump_dir or os.getenv("KNOWLEDGE_DUMP_DIR")
+    if dump_dir:
+        await asyncio.to_thread(knowledge.dump, dump_dir)
 
     # # Print responses
     # print(f"# {location_response.name}: {location_response}")
     # print(f"# {customer_response.name}: {customer_response}")
 
+    return knowledge
+
 
 if __name__ == "__main__":
     load_dotenv()
@@ -90,4 +401,4 @@ if __name__ == "__main__":
         prompt="STUNNING VILLA FOR SALE - PRIME LOCATION!!! Price: €2,850,000 (negotiable) was €3.2M - REDUCED FOR QUICK SALE! Property Details: Size: 450 sqm living space + 180 sqm terraces, Plot: 1,200 sqm private land, Bedrooms: 6 (master suite with walk-in closet), Bathrooms: 4.5 (3 full, 2 half baths), Built: 2018 (practically NEW!), Parking: 3-car garage + 2 outdoor spaces. Location & Views: Address: Via delle Rose 47, Tuscany Hills - 15 min to city center, 5 min walk to local shops, BREATHTAKING panoramic views of valley & mountains, South-facing orientation (sun ALL DAY), Quiet residential area but close to everything. Features & Amenities: Interior: Open concept kitchen with island (Miele appliances), Living room with fireplace, Formal dining room, Home office/study, Wine cellar (climate controlled), Laundry room, Storage rooms, High ceilings throughout, Marble floors downstairs, hardwood upstairs. Outdoor: Infinity pool (12m x 6m) with heating, Pool house with bar & BBQ area, Landscaped gardens with automatic irrigation, Olive trees (20+ mature trees), Multiple terraces & patios, Outdoor kitchen, Guest cottage (2 bed, 1 bath). Technical Specs: Heating: Underfloor heating + heat pump, Cooling: Central A/C throughout, Energy Rating: A+ (solar panels installed), Internet: Fiber optic ready, Security: Alarm system + cameras, Water: Private well + mains connection, Utilities: All connected (gas, electric, water, sewage). Condition & Maintenance: Move-in ready condition, Recently painted (2024), New roof tiles (2023), Pool renovated last year, Garden professionally maintained, All appliances included, Some furniture negotiable. Legal & Financial: Property Tax: €4,200/year, HOA Fees: None (private property), Utilities: ~€300/month average, Title: Clear, no liens, Permits: All building permits in order, Zoning: Residential (can't build commercial). Investment Potential: Rental income potential: €8,000-12,000/month (seasonal), Property values increasing 5-8% annually in area, Tourism growing in region, Perfect for vacation rental business, Could subdivide plot (subject to permits). Nearby Amenities: Schools: International school 10km, Shopping: Supermarket 2km, mall 15km, Healthcare: Hospital 20km, clinic 5km, Transport: Train station 12km, airport 45km, Recreation: Golf course 8km, beach 25km, Restaurants: 3 excellent restaurants within 5km. Contact & Viewing: Agent: Marco Rossi, Licensed Real Estate Professional, Phone: +39 055 123 4567, Email: marco@tuscanyvillas.com, Available: Mon-Sat 9AM-7PM, Viewings: By appointment only (24hr notice preferred). Additional Notes: Serious buyers only, Proof of funds required before viewing, International buyers welcome, Financing assistance available, Virtual tour available on request, Drone footage & professional photos available, Property inspection reports available, Comparable sales data provided upon request. MOTIVATED SELLER - OPEN TO REASONABLE OFFERS! Property ID: TV-2024-0847, Listed: January 2025, Last Updated: July 15, 2025. Disclaimer: All measurements approximate. Buyer to verify all information. Property sold as-is. Agent represents seller.",
         images=[],  # No images provided in this example
     )
-    asyncio.run(generate_knowledge(input))
+    asyncio.run(generate_knowledge(input, dump_dir="."))
@@ -0,0 +1,259 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Spatial index over listing coordinates.
+
+A uniform grid of square cells (``cell_km`` wide) maps each cell to the items
+inside it, optionally split by a group such as the property type. Radius and
+k-nearest queries only look at the cells around the query point, then filter
+the candidates with vectorised distances.
+
+Nothing here geocodes: the only known places are the ten Munich
+neighbourhoods of NEIGHBORHOOD_COORDINATES, and listings without a real
+address get synthetic coordinates near their neighbourhood's centre.
+"""
+
+import hashlib
+import math
+import threading
+from typing import Optional
+
+import numpy as np
+
+KM_PER_DEGREE = 111.32
+
+# Approximate centres of the neighbourhoods used by the listing templates
+NEIGHBORHOOD_COORDINATES = {
+    "Altstadt": (48.1374, 11.5755),
+    "Bogenhausen": (48.1548, 11.6155),
+    "Haidhausen": (48.1292, 11.5986),
+    "Lehel": (48.1400, 11.5890),
+    "Maxvorstadt": (48.1487, 11.5670),
+    "Nymphenburg": (48.1583, 11.5033),
+    "Pasing": (48.1497, 11.4614),
+    "Schwabing": (48.1642, 11.5822),
+    "Sendling": (48.1183, 11.5447),
+    "Trudering": (48.1225, 11.6658),
+}
+
+# Jitter of generated coordinates around the neighbourhood centre
+NEIGHBORHOOD_RADIUS_KM = 0.8
+
+
+def distance_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Distances from one point (equirectangular approximation, fine within a city)."""
+    north = (lats - lat) * KM_PER_DEGREE
+    east = (lngs - lng) * (KM_PER_DEGREE * math.cos(math.radians(lat)))
+    return np.sqrt(north**2 + east**2)
+
+
+def find_neighborhood(text: str) -> Optional[str]:
+    """Return the first known neighbourhood mentioned in ``text``."""
+    lowered = text.lower()
+    for name in NEIGHBORHOOD_COORDINATES:
+        if name.lower() in lowered:
+            return name
+    return None
+
+
+def neighborhood_coordinates(neighborhood: Optional[str], seed: str) -> Optional[dict]:
+    """Coordinates in a neighbourhood, spread deterministically by ``seed``.
+
+    Listings of the same neighbourhood would otherwise all share one point.
+    The point is synthetic, not the listing's address: it is only accurate to
+    about NEIGHBORHOOD_RADIUS_KM. Returns None for unknown neighbourhoods.
+    """
+    centre = NEIGHBORHOOD_COORDINATES.get(neighborhood or "")
+    if centre is None:
+        return None
+    digest = hashlib.sha256(seed.encode()).digest()
+    angle = int.from_bytes(digest[:4], "big") / 2**32 * 2 * math.pi
+    radius = math.sqrt(int.from_bytes(digest[4:8], "big") / 2**32) * NEIGHBORHOOD_RADIUS_KM
+    lat = centre[0] + radius * math.sin(angle) / KM_PER_DEGREE
+    lng = centre[1] + radius * math.cos(angle) / (
+        KM_PER_DEGREE * math.cos(math.radians(centre[0]))
+    )
+    return {"lat": round(lat, 6), "lng": round(lng, 6)}
+
+
+class GridIndex:
+    """Grid of items (non-negative ints) by coordinates, with radius and kNN queries."""
+
+    def __init__(self, cell_km: float = 0.5, reference_lat: float = 48.0) -> None:
+        """``reference_lat`` sets the cell width in degrees of longitude."""
+        self.cell_km = cell_km
+        self._lat_step = cell_km / KM_PER_DEGREE
+        self._lng_step = cell_km / (KM_PER_DEGREE * math.cos(math.radians(reference_lat)))
+        self._cells: dict[tuple[int, int, int], np.ndarray] = {}
+        self._groups: set[int] = set()
+        self._cell_of: dict[int, tuple[int, int, int]] = {}
+        self._lat = np.full(1024, np.nan)
+        self._lng = np.full(1024, np.nan)
+        # Occupied rows and columns, to know when a search covers everything
+        self._bounds: Optional[list[int]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def add(self, item: int, lat: float, lng: float, group: int = 0) -> None:
+        """Add or move an item."""
+        self.add_many(np.array([item]), np.array([lat]), np.array([lng]), np.array([group]))
+
+    def add_many(
+        self,
+        items: np.ndarray,
+        lat: np.ndarray,
+        lng: np.ndarray,
+        groups: Optional[np.ndarray] = None,
+    ) -> None:
+        """Add or move many items; items without coordinates are skipped."""
+        items = np.asarray(items, dtype=np.int64)
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        groups = (
+            np.zeros(len(items), dtype=np.int64)
+            if groups is None
+            else np.asarray(groups, dtype=np.int64)
+        )
+        located = ~(np.isnan(lat) | np.isnan(lng))
+        items, lat, lng, groups = items[located], lat[located], lng[located], groups[located]
+        if not len(items):
+            return
+        rows = np.floor(lat / self._lat_step).astype(np.int64)
+        cols = np.floor(lng / self._lng_step).astype(np.int64)
+
+        with self._lock:
+            for item in items.tolist():
+                if item in self._cell_of:
+                    self._remove(item)
+            self._grow(int(items.max()) + 1)
+            self._lat[items] = lat
+            self._lng[items] = lng
+
+            # Group the items by cell with one sort instead of a dict lookup each
+            order = np.lexsort((cols, rows, groups))
+            keys = np.stack((groups[order], rows[order], cols[order]), axis=1)
+            boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+            for start, end in zip(
+                [0, *boundaries.tolist()], [*boundaries.tolist(), len(order)]
+            ):
+                key = tuple(keys[start].tolist())
+                cell_items = items[order[start:end]]
+                cell = self._cells.get(key)
+                self._cells[key] = (
+                    cell_items if cell is None else np.concatenate((cell, cell_items))
+                )
+                self._cell_of.update(dict.fromkeys(cell_items.tolist(), key))
+            self._groups.update(np.unique(groups).tolist())
+
+            bounds = [int(rows.min()), int(rows.max()), int(cols.min()), int(cols.max())]
+            if self._bounds is not None:
+                bounds = [
+                    min(bounds[0], self._bounds[0]),
+                    max(bounds[1], self._bounds[1]),
+                    min(bounds[2], self._bounds[2]),
+                    max(bounds[3], self._bounds[3]),
+                ]
+            self._bounds = bounds
+
+    def remove(self, item: int) -> None:
+        """Remove an item if present."""
+        with self._lock:
+            if item in self._cell_of:
+                self._remove(item)
+
+    def _remove(self, item: int) -> None:
+        key = self._cell_of.pop(item)
+        cell = self._cells[key]
+        cell = cell[cell != item]
+        if len(cell):
+            self._cells[key] = cell
+        else:
+            del self._cells[key]
+        self._lat[item] = self._lng[item] = np.nan
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self._lat)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for name in ("_lat", "_lng"):
+            grown = np.full(capacity, np.nan)
+            old = getattr(self, name)
+            grown[: len(old)] = old
+            setattr(self, name, grown)
+
+    def _candidates(
+        self, lat: float, lng: float, radius_km: float, group: Optional[int]
+    ) -> tuple[np.ndarray, bool]:
+        """Items in the cells overlapping the radius, and whether that was all cells."""
+        delta_lat = radius_km / KM_PER_DEGREE
+        delta_lng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+        row_from = math.floor((lat - delta_lat) / self._lat_step)
+        row_to = math.floor((lat + delta_lat) / self._lat_step)
+        col_from = math.floor((lng - delta_lng) / self._lng_step)
+        col_to = math.floor((lng + delta_lng) / self._lng_step)
+        groups = self._groups if group is None else (group,)
+        cells = self._cells
+        found = [
+            cells[key]
+            for g in groups
+            for row in range(row_from, row_to + 1)
+            for col in range(col_from, col_to + 1)
+            if (key := (g, row, col)) in cells
+        ]
+        items = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        bounds = self._bounds
+        covers_all = bounds is None or (
+            row_from <= bounds[0]
+            and row_to >= bounds[1]
+            and col_from <= bounds[2]
+            and col_to >= bounds[3]
+        )
+        return items, covers_all
+
+    def within(
+        self, lat: float, lng: float, radius_km: float, group: Optional[int] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Items within ``radius_km`` and their distances, nearest first."""
+        with self._lock:
+            items, _ = self._candidates(lat, lng, radius_km, group)
+            distances = distance_km(lat, lng, self._lat[items], self._lng[items])
+        inside = distances <= radius_km
+        items, distances = items[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return items[order], distances[order]
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int,
+        group: Optional[int] = None,
+        max_radius_km: Optional[float] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """The ``k`` nearest items (within ``max_radius_km``) and their distances."""
+        radius = self.cell_km
+        with self._lock:
+            while True:
+                if max_radius_km is not None:
+                    radius = min(radius, max_radius_km)
+                items, covers_all = self._candidates(lat, lng, radius, group)
+                distances = distance_km(lat, lng, self._lat[items], self._lng[items])
+                # Items found beyond ``radius`` may not be the nearest yet;
+                # widen the search until k items lie inside it
+                if (
+                    covers_all
+                    or (max_radius_km is not None and radius >= max_radius_km)
+                    or np.count_nonzero(distances <= radius) >= k
+                ):
+                    break
+                radius *= 2
+        if max_radius_km is not None:
+            inside = distances <= max_radius_km
+            items, distances = items[inside], distances[inside]
+        if k < len(items):
+            nearest = np.argpartition(distances, k - 1)[:k]
+            items, distances = items[nearest], distances[nearest]
+        order = np.argsort(distances, kind="stable")
+        return items[order], distances[order]
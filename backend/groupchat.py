@@ -1,8 +1,19 @@
 # Copyright (c) Microsoft. All rights reserved.
 
 import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
 import sys
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
 
+from opentelemetry import context
+
+from pydantic import BaseModel, PrivateAttr, ValidationError
 from semantic_kernel.agents import Agent, ChatCompletionAgent, GroupChatOrchestration
 from semantic_kernel.agents.orchestration.group_chat import (
     BooleanResult,
@@ -10,11 +21,9 @@ from semantic_kernel.agents.orchestration.group_chat import (
     MessageResult,
     StringResult,
 )
-from semantic_kernel.agents.runtime import InProcessRuntime
 from semantic_kernel.connectors.ai.chat_completion_client_base import (
     ChatCompletionClientBase,
 )
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
 from semantic_kernel.connectors.ai.prompt_execution_settings import (
     PromptExecutionSettings,
 )
@@ -23,61 +32,183 @@ from semantic_kernel.functions import KernelArguments
 from semantic_kernel.kernel import Kernel
 from semantic_kernel.prompt_template import KernelPromptTemplate, PromptTemplateConfig
 
+from backend.completeness import missing_facts, termination_stats
+from backend.models import GeneratedKnowledge, PropertyGenerationResponse
+from backend.runtime import RuntimeManager, runtime_manager
+from backend.services import get_chat_service
+from backend.telemetry import (
+    INPUT_TOKENS,
+    OUTPUT_TOKENS,
+    manager_duration,
+    tracer,
+    turn_duration,
+    usage_attributes,
+)
+from backend.tokens import (
+    CONTEXT_HISTORY_TOKENS,
+    CONTEXT_KNOWLEDGE_TOKENS,
+    compact_messages,
+    context_stats,
+    count_message_tokens,
+    count_tokens,
+    manager_prompt_stats,
+    truncate_tokens,
+)
+
 if sys.version_info >= (3, 12):
     from typing import override  # pragma: no cover
 else:
     from typing_extensions import override  # pragma: no cover
 
+logger = logging.getLogger(__name__)
 
-def get_agents() -> list[Agent]:
-    """Return a list of agents that will participate in the group style discussion.
+# Result filter: repair requests for invalid fields before giving up
+RESULT_REPAIR_ATTEMPTS = 2
 
-    Loads pre-generated knowledge from text files and incorporates it into agent instructions.
-    """
+RESULT_METADATA_KEY = "property_generation_response"
+# Metadata key of the exception that ended a group chat, see report_failure()
+RESULT_ERROR_KEY = "group_chat_error"
+
+GROUPCHAT_TASK = "Please start the discussion."
+
+# Expert turns of the LLM manager unless a request sets max_rounds
+LLM_MAX_ROUNDS = 2
+# Upper bound for the max_rounds of a request
+GROUPCHAT_MAX_ROUNDS = int(os.getenv("GROUPCHAT_MAX_ROUNDS", "10"))
 
-    # Laden der vorgenerierten Wissensdateien
-    try:
-        with open(
-            "backend/generated_knowledge_customer.txt", "r", encoding="utf-8"
-        ) as file:
-            customer_knowledge = file.read()
-    except FileNotFoundError:
+EXPERT_MODES = ("sequential", "concurrent")
+
+
+def _strict_schema(schema: dict, definitions: dict) -> dict:
+    """Rewrite a pydantic JSON schema node for strict structured outputs.
+
+    Strict mode wants every property listed as required (optional ones are
+    nullable anyway), no additional properties and no defaults or titles.
+    """
+    if "$ref" in schema:
+        return _strict_schema(definitions[schema["$ref"].rsplit("/", 1)[-1]], definitions)
+    if "anyOf" in schema:
+        return {"anyOf": [_strict_schema(option, definitions) for option in schema["anyOf"]]}
+    if "properties" in schema:
+        properties = {
+            name: _strict_schema(value, definitions)
+            for name, value in schema["properties"].items()
+        }
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False,
+        }
+    strict = {key: value for key, value in schema.items() if key not in ("default", "title")}
+    if "items" in strict:
+        strict["items"] = _strict_schema(strict["items"], definitions)
+    return strict
+
+
+def structured_output_format(model: type[BaseModel]) -> dict:
+    """JSON schema response format that makes the model answer with ``model``."""
+    schema = model.model_json_schema()
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "strict": True,
+            "schema": _strict_schema(schema, schema.get("$defs", {})),
+        },
+    }
+
+
+def _get_path(document, path: tuple):
+    for key in path:
         try:
-            with open(
-                "generated_knowledge_customer.txt", "r", encoding="utf-8"
-            ) as file:
-                customer_knowledge = file.read()
-        except FileNotFoundError:
-            customer_knowledge = "Keine Kundeninformationen verfügbar."
-
-    try:
-        with open(
-            "backend/generated_knowledge_location.txt", "r", encoding="utf-8"
-        ) as file:
-            location_knowledge = file.read()
-    except FileNotFoundError:
+            document = document[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return document
+
+
+def _set_path(document: dict, path: tuple, value) -> None:
+    for key, next_key in zip(path, path[1:]):
+        child = _get_path(document, (key,))
+        if not isinstance(child, (dict, list)):
+            child = [] if isinstance(next_key, int) else {}
+            document[key] = child
+        document = child
+    if isinstance(document, list):
+        document.extend([None] * (path[-1] + 1 - len(document)))
+    document[path[-1]] = value
+
+
+def _reports_failure(method):
+    """Pass an exception of a manager step to the manager's failure_callback first."""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
         try:
-            with open(
-                "generated_knowledge_location.txt", "r", encoding="utf-8"
-            ) as file:
-                location_knowledge = file.read()
-        except FileNotFoundError:
-            location_knowledge = "Keine Standortinformationen verfügbar."
-
-    try:
-        with open(
-            "backend/generated_knowledge_images.txt", "r", encoding="utf-8"
-        ) as file:
-            images_knowledge = file.read()
-    except FileNotFoundError:
+            return await method(self, *args, **kwargs)
+        except Exception as error:
+            if self.failure_callback is not None:
+                await self.failure_callback(error)
+            raise
+
+    return wrapper
+
+
+class ExpertAgent(ChatCompletionAgent):
+    """Chat completion agent that sends the discussion within a token budget."""
+
+    history_token_budget: int = CONTEXT_HISTORY_TOKENS
+
+    # Receives the exception of a failed turn, see PropertyGroupChatOrchestration
+    failure_callback: Callable[[BaseException], Awaitable[None]] | None = None
+
+    @override
+    async def invoke_stream(self, *args, **kwargs):
+        # The orchestration invokes its members through invoke_stream
         try:
-            with open("generated_knowledge_images.txt", "r", encoding="utf-8") as file:
-                images_knowledge = file.read()
-        except FileNotFoundError:
-            images_knowledge = "Keine Bildinformationen verfügbar."
+            async for response in super().invoke_stream(*args, **kwargs):
+                yield response
+        except Exception as error:
+            if self.failure_callback is not None:
+                await self.failure_callback(error)
+            raise
+
+    @override
+    async def _prepare_agent_chat_history(
+        self, history: ChatHistory, kernel: Kernel, arguments: KernelArguments
+    ) -> ChatHistory:
+        messages, before, after = compact_messages(
+            history.messages, self.history_token_budget
+        )
+        context_stats.record("history", before, after)
+        return await super()._prepare_agent_chat_history(
+            ChatHistory(messages=messages), kernel, arguments
+        )
+
+
+def _knowledge_within_budget(text: str, budget: int) -> str:
+    compacted = truncate_tokens(text, budget)
+    context_stats.record("knowledge", count_tokens(text), count_tokens(compacted))
+    return compacted
+
+
+def get_agents(
+    knowledge: GeneratedKnowledge, knowledge_token_budget: int | None = None
+) -> list[Agent]:
+    """Return a list of agents that will participate in the group style discussion.
+
+    Incorporates the per-request generated knowledge into the agent instructions,
+    each block cut to ``knowledge_token_budget`` tokens (CONTEXT_KNOWLEDGE_TOKENS
+    by default).
+    """
+    budget = knowledge_token_budget or CONTEXT_KNOWLEDGE_TOKENS
+    customer_knowledge = _knowledge_within_budget(knowledge.customer, budget)
+    location_knowledge = _knowledge_within_budget(knowledge.location, budget)
+    images_knowledge = _knowledge_within_budget(knowledge.images, budget)
 
     # Erstellung der Agenten mit dem geladenen Wissen
-    customer_agent = ChatCompletionAgent(
+    customer_agent = ExpertAgent(
         name="CustomerExpert",
         description="Expert for potential buyers of the property.",
         instructions=(
@@ -88,9 +219,9 @@ def get_agents() -> list[Agent]:
             "Use this expertise to provide insights during discussions about properties.\n\n"
             f"Additional context about the property's customer assessment:\n{customer_knowledge}"
         ),
-        service=AzureChatCompletion(),
+        service=get_chat_service(),
     )
-    location_agent = ChatCompletionAgent(
+    location_agent = ExpertAgent(
         name="LocationExpert",
         description="Expert for location of property.",
         instructions=(
@@ -101,9 +232,9 @@ def get_agents() -> list[Agent]:
             "Use this knowledge to provide context about property locations during discussions.\n\n"
             f"Additional context about the property's location:\n{location_knowledge}"
         ),
-        service=AzureChatCompletion(),
+        service=get_chat_service(),
     )
-    image_agent = ChatCompletionAgent(
+    image_agent = ExpertAgent(
         name="ImageExpert",
         description="Expert for images of the property.",
         instructions=(
@@ -114,7 +245,7 @@ def get_agents() -> list[Agent]:
             "insights about property images during discussions.\n\n"
             f"Additional context about the property's images:\n{images_knowledge}"
         ),
-        service=AzureChatCompletion(),
+        service=get_chat_service(),
     )
 
     return [
@@ -135,6 +266,13 @@ class ChatCompletionGroupChatManager(GroupChatManager):
 
     topic: str
 
+    # Optional hook that receives the manager's decisions, e.g. for streaming
+    event_callback: Callable[[str, dict], Awaitable[None]] | None = None
+
+    # Optional hook that receives the prompt size of every model call:
+    # (call name, prompt tokens, number of messages)
+    prompt_callback: Callable[[str, int, int], None] | None = None
+
     termination_prompt: str = (
         "Du bist ein Moderator, der eine Fachdiskussion zum Thema '{{$topic}}' leitet. "
         "Die Experten diskutieren eine Immobilie und tauschen ihre fachlichen Einschätzungen aus. "
@@ -187,10 +325,21 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         '    "images": ["Platzhalter f��r Bilder"],\n'
         '    "features": ["Feature1", "Feature2", ...],\n'
         '    "description": "[ausführliche Beschreibung der Immobilie]",\n'
+        '    "listing": {\n'
+        '      "datePosted": "[heutiges Datum im ISO-Format]",\n'
+        '      "daysOnMarket": 0,\n'
+        '      "status": "active",\n'
+        '      "agent": {\n'
+        '        "name": "[Name des Maklers]",\n'
+        '        "company": "[Firma]",\n'
+        '        "phone": "[Telefon]",\n'
+        '        "email": "[E-Mail]"\n'
+        "      }\n"
+        "    },\n"
         '    "confidence_score": [Zahl zwischen 0 und 1],\n'
         '    "ai_suggestions": ["Vorschlag1", "Vorschlag2", ...],\n'
         '    "pricing_analysis": {\n'
-        '      "market_position": "[Position im Markt]",\n'
+        '      "market_position": "[competitive | below_market | above_market]",\n'
         '      "confidence": [Zahl zwischen 0 und 1],\n'
         '      "price_difference_percentage": [Prozentsatz],\n'
         '      "comparable_properties": {\n'
@@ -199,6 +348,7 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         '        "max_price": [Höchstpreis],\n'
         '        "sample_size": [Anzahl]\n'
         "      },\n"
+        '      "recommendations": ["Empfehlung1", "Empfehlung2", ...],\n'
         '      "market_insights": ["Insight1", "Insight2", ...]\n'
         "    }\n"
         "  },\n"
@@ -211,17 +361,111 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         "Gib direkt die json aus nichts anderes, keine Erklärungen oder Kommentare. Das ist sehr wichtig"
     )
 
+    result_repair_prompt: str = (
+        "Du korrigierst einzelne Felder einer JSON-Immobilienbewertung zum Thema '{{$topic}}'. "
+        "Die Bewertung entstand aus der vorangegangenen Expertendiskussion. Für jedes "
+        "ungültige Feld erhältst du den Pfad, den Fehler und den bisherigen Wert. "
+        "Antworte nur mit einem JSON-Objekt der Form "
+        '{"fixes": [{"path": "property.details.sqft", "value": 120}]} '
+        "mit korrigierten Werten für genau diese Felder, nichts anderes."
+    )
+
+    # How often invalid fields of the result are sent back for repair
+    repair_attempts: int = RESULT_REPAIR_ATTEMPTS
+
+    # Tokens of the discussion sent with each manager call, see compact_messages()
+    history_token_budget: int = CONTEXT_HISTORY_TOKENS
+
+    # End the discussion without asking the model once the experts have
+    # covered price, size, bedrooms and location (see backend.completeness)
+    early_termination: bool = True
+
+    # OpenTelemetry context of the request; the manager runs in the runtime's
+    # tasks, which don't inherit it
+    trace_context: Any = None
+
+    # Receives the exception of a failed step, see PropertyGroupChatOrchestration
+    failure_callback: Callable[[BaseException], Awaitable[None]] | None = None
+
+    _rendered_prompts: dict = PrivateAttr(default_factory=dict)
+
     def __init__(self, topic: str, service: ChatCompletionClientBase, **kwargs) -> None:
         """Initialize the group chat manager."""
         super().__init__(topic=topic, service=service, **kwargs)
 
     async def _render_prompt(self, prompt: str, arguments: KernelArguments) -> str:
-        """Helper to render a prompt with arguments."""
-        prompt_template_config = PromptTemplateConfig(template=prompt)
-        prompt_template = KernelPromptTemplate(
-            prompt_template_config=prompt_template_config
+        """Helper to render a prompt with arguments (cached, the inputs rarely change)."""
+        key = (prompt, tuple(sorted(arguments.items())))
+        if key not in self._rendered_prompts:
+            prompt_template_config = PromptTemplateConfig(template=prompt)
+            prompt_template = KernelPromptTemplate(
+                prompt_template_config=prompt_template_config
+            )
+            self._rendered_prompts[key] = await prompt_template.render(
+                Kernel(), arguments=arguments
+            )
+        return self._rendered_prompts[key]
+
+    async def _get_response(
+        self,
+        call: str,
+        chat_history: ChatHistory,
+        system_prompt: str,
+        instruction: str,
+        response_format: type | dict,
+    ) -> ChatMessageContent:
+        """Ask the model with the prompts wrapped around the discussion.
+
+        The request is a new message list referencing the discussion messages, so
+        the history passed in by the orchestration is neither copied nor mutated.
+        Older turns are shortened once the discussion exceeds the token budget.
+        """
+        messages, history_tokens, compacted_tokens = compact_messages(
+            chat_history.messages, self.history_token_budget
         )
-        return await prompt_template.render(Kernel(), arguments=arguments)
+        context_stats.record("history", history_tokens, compacted_tokens)
+        request = ChatHistory(
+            messages=[
+                ChatMessageContent(role=AuthorRole.SYSTEM, content=system_prompt),
+                *messages,
+                ChatMessageContent(role=AuthorRole.USER, content=instruction),
+            ]
+        )
+        prompt_tokens = count_message_tokens(request.messages)
+        if self.prompt_callback is not None:
+            self.prompt_callback(call, prompt_tokens, len(request.messages))
+        with tracer.start_as_current_span(
+            f"llm {call}",
+            attributes={
+                "groupchat.call": call,
+                INPUT_TOKENS: prompt_tokens,
+                "context.tokens_saved": history_tokens - compacted_tokens,
+            },
+        ) as span:
+            start = time.perf_counter()
+            response = await self.service.get_chat_message_content(
+                request,
+                settings=PromptExecutionSettings(response_format=response_format),
+            )
+            span.set_attributes(usage_attributes(response))
+        manager_duration.record(time.perf_counter() - start, {"groupchat.call": call})
+        return response
+
+    def _record_chat(self, chat_history: ChatHistory, early: bool) -> None:
+        """Count the finished discussion for the termination metrics."""
+        turns = sum(message.role == AuthorRole.ASSISTANT for message in chat_history.messages)
+        termination_stats.record_chat(turns, self.max_rounds or turns, early)
+
+    def _span(self, name: str):
+        """Start a span of this manager below the request's span."""
+        return tracer.start_as_current_span(name, context=self.trace_context)
+
+    async def _emit(self, event: str, result: BooleanResult | StringResult) -> None:
+        """Forward a manager decision to the event callback, if any."""
+        if self.event_callback is not None:
+            await self.event_callback(
+                event, {"result": result.result, "reason": result.reason}
+            )
 
     @override
     async def should_request_user_input(
@@ -237,6 +481,7 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         )
 
     @override
+    @_reports_failure
     async def should_terminate(self, chat_history: ChatHistory) -> BooleanResult:
         """Provide concrete implementation for determining if the discussion should end.
 
@@ -245,40 +490,47 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         """
         should_terminate = await super().should_terminate(chat_history)
         if should_terminate.result:
+            self._record_chat(chat_history, early=False)
+            await self._emit("termination", should_terminate)
             return should_terminate
 
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.termination_prompt,
-                    KernelArguments(topic=self.topic),
+        if self.early_termination and not missing_facts(chat_history.messages):
+            # Alles Nötige für das Ergebnis ist besprochen: kein LLM-Aufruf
+            complete = BooleanResult(
+                result=True, reason="Price, size, bedrooms and location are covered."
+            )
+            termination_stats.record_skipped_call()
+            self._record_chat(chat_history, early=True)
+            await self._emit("termination", complete)
+            return complete
+
+        with self._span("should_terminate") as span:
+            response = await self._get_response(
+                "should_terminate",
+                chat_history,
+                await self._render_prompt(
+                    self.termination_prompt, KernelArguments(topic=self.topic)
                 ),
-            ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(
-                role=AuthorRole.USER, content="Determine if the discussion should end."
-            ),
-        )
-
-        response = await self.service.get_chat_message_content(
-            chat_history,
-            settings=PromptExecutionSettings(response_format=BooleanResult),
-        )
-
-        termination_with_reason = BooleanResult.model_validate_json(response.content)
-
-        print("*********************")
-        print(
-            f"Should terminate: {termination_with_reason.result}\nReason: {termination_with_reason.reason}."
+                "Determine if the discussion should end.",
+                BooleanResult,
+            )
+
+            termination_with_reason = BooleanResult.model_validate_json(response.content)
+            span.set_attribute("groupchat.terminate", termination_with_reason.result)
+        if termination_with_reason.result:
+            self._record_chat(chat_history, early=False)
+
+        logger.debug(
+            "Should terminate: %s. Reason: %s.",
+            termination_with_reason.result,
+            termination_with_reason.reason,
         )
-        print("*********************")
+        await self._emit("termination", termination_with_reason)
 
         return termination_with_reason
 
     @override
+    @_reports_failure
     async def select_next_agent(
         self,
         chat_history: ChatHistory,
@@ -289,11 +541,11 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         The manager will select the next agent to speak after each agent message
         or human input (if applicable) if the conversation is not terminated.
         """
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
+        with self._span("select_next_agent") as span:
+            response = await self._get_response(
+                "select_next_agent",
+                chat_history,
+                await self._render_prompt(
                     self.selection_prompt,
                     KernelArguments(
                         topic=self.topic,
@@ -302,29 +554,21 @@ class ChatCompletionGroupChatManager(GroupChatManager):
                         ),
                     ),
                 ),
-            ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(
-                role=AuthorRole.USER,
-                content="Now select the next participant to speak.",
-            ),
-        )
-
-        response = await self.service.get_chat_message_content(
-            chat_history,
-            settings=PromptExecutionSettings(response_format=StringResult),
-        )
-
-        participant_name_with_reason = StringResult.model_validate_json(
-            response.content
-        )
-
-        print("*********************")
-        print(
-            f"Next participant: {participant_name_with_reason.result}\nReason: {participant_name_with_reason.reason}."
+                "Now select the next participant to speak.",
+                StringResult,
+            )
+
+            participant_name_with_reason = StringResult.model_validate_json(
+                response.content
+            )
+            span.set_attribute("groupchat.next_agent", participant_name_with_reason.result)
+
+        logger.debug(
+            "Next participant: %s. Reason: %s.",
+            participant_name_with_reason.result,
+            participant_name_with_reason.reason,
         )
-        print("*********************")
+        await self._emit("selection", participant_name_with_reason)
 
         if participant_name_with_reason.result in participant_descriptions:
             return participant_name_with_reason
@@ -332,91 +576,364 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         raise RuntimeError(f"Unknown participant selected: {response.content}.")
 
     @override
+    @_reports_failure
     async def filter_results(
         self,
         chat_history: ChatHistory,
     ) -> MessageResult:
         """Provide concrete implementation for filtering the results of the discussion.
 
-        The manager will filter the results of the conversation after the conversation is terminated.
+        The model answers with a PropertyGenerationResponse via structured output,
+        which is validated once. Invalid fields are sent back for repair (up to
+        ``repair_attempts`` times) instead of rerunning the discussion. The
+        validated response is attached to the message metadata.
         """
         if not chat_history.messages:
             raise RuntimeError("No messages in the chat history.")
 
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.result_filter_prompt,
-                    KernelArguments(topic=self.topic),
+        with self._span("filter_results") as span:
+            response = await self._get_response(
+                "filter_results",
+                chat_history,
+                await self._render_prompt(
+                    self.result_filter_prompt, KernelArguments(topic=self.topic)
                 ),
+                "Now create the JSON assessment of the property.",
+                structured_output_format(PropertyGenerationResponse),
+            )
+            content = response.content
+            for attempt in range(self.repair_attempts + 1):
+                try:
+                    result = PropertyGenerationResponse.model_validate_json(content)
+                    break
+                except ValidationError as error:
+                    if attempt == self.repair_attempts:
+                        raise
+                    content = await self._repair_result(chat_history, content, error)
+            span.set_attribute("groupchat.repairs", attempt)
+
+        return MessageResult(
+            result=ChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                content=result.model_dump_json(),
+                metadata={RESULT_METADATA_KEY: result},
             ),
+            reason="Validated against PropertyGenerationResponse.",
         )
-        chat_history.add_message(
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.result_filter_prompt,
-                    KernelArguments(topic=self.topic),
+
+    async def _repair_result(
+        self, chat_history: ChatHistory, content: str, error: ValidationError
+    ) -> str:
+        """Ask the model for corrected values of the invalid fields only."""
+        try:
+            document = json.loads(content)
+        except ValueError:
+            document = None
+        if not isinstance(document, dict):
+            # Kein JSON-Objekt, also nichts zu flicken: komplett neu anfordern
+            response = await self._get_response(
+                "filter_results_retry",
+                chat_history,
+                await self._render_prompt(
+                    self.result_filter_prompt, KernelArguments(topic=self.topic)
                 ),
+                "Now create the JSON assessment of the property.",
+                structured_output_format(PropertyGenerationResponse),
+            )
+            return response.content
+
+        invalid = {
+            ".".join(map(str, item["loc"])): (
+                tuple(item["loc"]),
+                {
+                    "path": ".".join(map(str, item["loc"])),
+                    "error": item["msg"],
+                    "value": _get_path(document, item["loc"]),
+                },
+            )
+            for item in error.errors()
+        }
+        response = await self._get_response(
+            "filter_results_repair",
+            chat_history,
+            await self._render_prompt(
+                self.result_repair_prompt, KernelArguments(topic=self.topic)
             ),
+            json.dumps([field for _, field in invalid.values()], ensure_ascii=False),
+            {"type": "json_object"},
         )
+        try:
+            fixes = json.loads(response.content).get("fixes", [])
+        except (ValueError, AttributeError):
+            fixes = []
+        for fix in fixes if isinstance(fixes, list) else []:
+            # Only the fields that were reported invalid may change
+            if isinstance(fix, dict) and fix.get("path") in invalid:
+                _set_path(document, invalid[fix["path"]][0], fix.get("value"))
+        return json.dumps(document)
+
+
+class FastPathGroupChatManager(ChatCompletionGroupChatManager):
+    """Group chat manager that only calls the model to produce the result.
+
+    Experts speak in round-robin order and the discussion ends once every expert
+    has spoken (or max_rounds is reached), which saves the termination and
+    selection LLM calls of every turn.
+    """
 
-        response = await self.service.get_chat_message_content(
-            chat_history,
-            settings=PromptExecutionSettings(response_format=StringResult),
-        )
-        string_with_reason = StringResult.model_validate_json(response.content)
+    participants: list[str] = []
+    current_index: int = 0
 
-        return MessageResult(
-            result=ChatMessageContent(
-                role=AuthorRole.ASSISTANT, content=string_with_reason.result
-            ),
-            reason=string_with_reason.reason,
+    @override
+    @_reports_failure
+    async def should_terminate(self, chat_history: ChatHistory) -> BooleanResult:
+        """Terminate once every participant has contributed a message."""
+        should_terminate = await GroupChatManager.should_terminate(self, chat_history)
+        if not should_terminate.result and self.participants:
+            spoken = {
+                message.name
+                for message in chat_history.messages
+                if message.role == AuthorRole.ASSISTANT
+            }
+            if spoken.issuperset(self.participants):
+                should_terminate = BooleanResult(
+                    result=True, reason="Every expert has spoken."
+                )
+        if should_terminate.result:
+            self._record_chat(chat_history, early=False)
+        await self._emit("termination", should_terminate)
+        return should_terminate
+
+    @override
+    @_reports_failure
+    async def select_next_agent(
+        self,
+        chat_history: ChatHistory,
+        participant_descriptions: dict[str, str],
+    ) -> StringResult:
+        """Select the participants in round-robin order."""
+        if not self.participants:
+            self.participants = list(participant_descriptions)
+        next_agent = StringResult(
+            result=self.participants[self.current_index % len(self.participants)],
+            reason="Round-robin selection.",
         )
+        self.current_index += 1
+        await self._emit("selection", next_agent)
+        return next_agent
+
+
+def get_manager(
+    manager_mode: str,
+    agents: list[Agent],
+    event_callback: Callable[[str, dict], Awaitable[None]] | None = None,
+    max_rounds: int | None = None,
+) -> ChatCompletionGroupChatManager:
+    """Create the group chat manager for a manager mode ("llm" or "fast").
+
+    ``max_rounds`` limits the expert turns (at most GROUPCHAT_MAX_ROUNDS); by
+    default the LLM manager allows LLM_MAX_ROUNDS and the fast manager one
+    turn per expert.
+    """
+    topic = "Welche Eigenschaften machen eine Immobilie besonders wertvoll?"
+    if max_rounds is not None:
+        max_rounds = max(1, min(max_rounds, GROUPCHAT_MAX_ROUNDS))
+    if manager_mode == "fast":
+        return FastPathGroupChatManager(
+            topic=topic,
+            service=get_chat_service(),
+            max_rounds=max_rounds or len(agents),
+            participants=[agent.name for agent in agents],
+            event_callback=event_callback,
+            prompt_callback=manager_prompt_stats.record,
+        )
+    if manager_mode == "llm":
+        return ChatCompletionGroupChatManager(
+            topic=topic,
+            service=get_chat_service(),
+            max_rounds=max_rounds or LLM_MAX_ROUNDS,
+            event_callback=event_callback,
+            prompt_callback=manager_prompt_stats.record,
+        )
+    raise ValueError(f"Unknown manager mode: {manager_mode}.")
 
 
-def agent_response_callback(message: ChatMessageContent) -> None:
-    """Callback function to retrieve agent responses."""
-    print(f"**{message.name}**\n{message.content}")
-
-
-async def do_groupchat():
-    """Main function to run the agents."""
-    # 1. Create a group chat orchestration with the custom group chat manager
-    agents = get_agents()
-    group_chat_orchestration = GroupChatOrchestration(
-        members=agents,
-        manager=ChatCompletionGroupChatManager(
-            topic="Welche Eigenschaften machen eine Immobilie besonders wertvoll?",
-            service=AzureChatCompletion(),
-            max_rounds=2,
-        ),
-        agent_response_callback=agent_response_callback,
+async def concurrent_first_round(
+    agents: list[Agent], task: str = GROUPCHAT_TASK
+) -> list[ChatMessageContent]:
+    """Ask every expert for its first contribution at the same time.
+
+    Returns the discussion as the orchestration would record it, in member
+    order whatever order the answers arrive in: the task, then per expert a
+    "Transferred to" message and the expert's answer.
+    """
+    responses = await asyncio.gather(
+        *(agent.get_response(messages=task) for agent in agents)
     )
+    messages = [ChatMessageContent(role=AuthorRole.USER, content=task)]
+    for agent, response in zip(agents, responses):
+        message = response.message
+        message.name = agent.name
+        messages.append(
+            ChatMessageContent(role=AuthorRole.USER, content=f"Transferred to {agent.name}")
+        )
+        messages.append(message)
+    return messages
 
-    # 2. Create a runtime and start it
-    runtime = InProcessRuntime()
-    runtime.start()
 
-    # 3. Invoke the orchestration with a task and the runtime
-    orchestration_result = await group_chat_orchestration.invoke(
-        task="Please start the discussion.",
-        runtime=runtime,
-    )
+class PropertyGroupChatOrchestration(GroupChatOrchestration):
+    """Group chat orchestration whose participants can end it with an error.
+
+    The runtime only logs exceptions raised by the manager or an agent, which
+    would leave the result waiting until the timeout. ``report_failure`` delivers
+    the error as the result instead; do_groupchat() raises it again.
+    """
 
-    # 4. Wait for the results
-    value = await orchestration_result.get()
+    _result_callback: Callable[[ChatMessageContent], Awaitable[None]] | None = None
+    _failed: bool = False
+    # Unique per invocation; the shared runtime releases its actors by it
+    internal_topic_type: str | None = None
 
-    # Datei nur mit dem eigentlichen JSON-Inhalt speichern (ohne MessageResult-Wrapper)
-    json_content = value.content
-    with open("group_chat_result.txt", "w", encoding="utf-8") as file:
-        file.write(json_content)
+    @override
+    async def _prepare(self, runtime, internal_topic_type, result_callback) -> None:
+        self.internal_topic_type = internal_topic_type
+        self._result_callback = result_callback
+        await super()._prepare(
+            runtime,
+            internal_topic_type=internal_topic_type,
+            result_callback=result_callback,
+        )
 
-    # 5. Stop the runtime after the invocation is complete
-    await runtime.stop_when_idle()
+    async def report_failure(self, error: BaseException) -> None:
+        """End the invocation with ``error`` (only the first failure counts)."""
+        if self._result_callback is None or self._failed:
+            return
+        self._failed = True
+        await self._result_callback(
+            ChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                content=str(error),
+                metadata={RESULT_ERROR_KEY: error},
+            )
+        )
+
+
+def agent_response_callback(message: ChatMessageContent) -> None:
+    """Callback function to retrieve agent responses."""
+    logger.debug("**%s**\n%s", message.name, message.content)
+
+
+async def do_groupchat(
+    knowledge: GeneratedKnowledge,
+    on_event: Callable[[str, dict], Awaitable[None]] | None = None,
+    manager_mode: str = "llm",
+    expert_mode: str = "sequential",
+    max_rounds: int | None = None,
+) -> PropertyGenerationResponse:
+    """Main function to run the agents.
+
+    Returns the manager's final JSON validated against PropertyGenerationResponse.
+    If ``on_event`` is given, every expert turn ("agent_turn") and manager decision
+    ("termination", "selection") is passed to it as soon as it happens.
+    ``manager_mode`` selects the group chat manager, see get_manager().
+    With ``expert_mode`` "concurrent" the first round is answered by all experts
+    at once (see concurrent_first_round), which counts as one round against
+    ``max_rounds``, and the manager takes over from there.
+    ``max_rounds`` overrides the manager's limit of expert turns.
+    """
+    if expert_mode not in EXPERT_MODES:
+        raise ValueError(f"Unknown expert mode: {expert_mode}.")
+    start_time = time.time()
+    with tracer.start_as_current_span(
+        "groupchat", attributes={"groupchat.manager_mode": manager_mode}
+    ):
+        # Die Runtime-Tasks erben den Kontext nicht, daher explizit weitergeben
+        trace_context = context.get_current()
+        # An expert's turn starts once the manager has selected it
+        turn_start = time.time_ns()
+
+        async def manager_event(event: str, data: dict) -> None:
+            nonlocal turn_start
+            if event == "selection":
+                turn_start = time.time_ns()
+            if on_event is not None:
+                await on_event(event, data)
+
+        async def response_callback(message: ChatMessageContent) -> None:
+            agent_response_callback(message)
+            end = time.time_ns()
+            attributes = {
+                "groupchat.agent": message.name or "",
+                OUTPUT_TOKENS: count_tokens(str(message.content or "")),
+                **usage_attributes(message),
+            }
+            span = tracer.start_span(
+                "expert_turn",
+                context=trace_context,
+                start_time=turn_start,
+                attributes=attributes,
+            )
+            span.end(end_time=end)
+            turn_duration.record(
+                (end - turn_start) / 1e9, {"groupchat.agent": attributes["groupchat.agent"]}
+            )
+            if on_event is not None:
+                await on_event(
+                    "agent_turn", {"name": message.name, "content": message.content}
+                )
+
+        # 1. Create a group chat orchestration with the custom group chat manager
+        agents = get_agents(knowledge)
+        group_chat_manager = get_manager(
+            manager_mode, agents, event_callback=manager_event, max_rounds=max_rounds
+        )
+        group_chat_manager.trace_context = trace_context
+        group_chat_orchestration = PropertyGroupChatOrchestration(
+            members=agents,
+            manager=group_chat_manager,
+            agent_response_callback=response_callback,
+        )
+        group_chat_manager.failure_callback = group_chat_orchestration.report_failure
+        for agent in agents:
+            agent.failure_callback = group_chat_orchestration.report_failure
+
+        async with contextlib.AsyncExitStack() as stack:
+            manager = runtime_manager
+            if not manager.started:
+                # Ohne FastAPI-Lifespan (z.B. __main__) einen kurzlebigen Manager verwenden
+                manager = await stack.enter_async_context(RuntimeManager(max_concurrency=1))
+
+            task: str | list[ChatMessageContent] = GROUPCHAT_TASK
+            if expert_mode == "concurrent":
+                turn_start = time.time_ns()
+                # Same concurrency limit and timeout as the orchestration itself
+                async with manager.slot():
+                    task = await asyncio.wait_for(
+                        concurrent_first_round(agents), timeout=manager.timeout
+                    )
+                for message in task:
+                    if message.role == AuthorRole.ASSISTANT:
+                        await response_callback(message)
+                # Die parallele erste Runde zählt als eine Runde gegen max_rounds,
+                # sonst bliebe dem LLM-Manager (LLM_MAX_ROUNDS = 2) keine Entscheidung
+                group_chat_manager.current_round = 1
+
+            # 2. Invoke the orchestration on the shared runtime and wait for the results
+            value = await manager.run(group_chat_orchestration, task=task)
+
+        error = value.metadata.get(RESULT_ERROR_KEY)
+        if error is not None:
+            raise error
+
+        # filter_results hat das Ergebnis bereits validiert
+        result = value.metadata.get(RESULT_METADATA_KEY)
+        if result is None:
+            result = PropertyGenerationResponse.model_validate_json(value.content)
+        result.processing_time = time.time() - start_time
+        return result
 
 
 if __name__ == "__main__":
-    asyncio.run(do_groupchat())
+    # Verwendet den Debug-Dump von generate_knowledge.py, falls vorhanden
+    result = asyncio.run(do_groupchat(GeneratedKnowledge.load(".")))
+    print(result.model_dump_json(indent=2))
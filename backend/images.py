@@ -0,0 +1,144 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Image preprocessing before vision calls.
+
+Vision cost and latency grow with pixel count and image count, and sellers
+often upload the same shot twice. Images are deduplicated (exact and by
+difference hash), capped, downscaled to a maximum edge and re-encoded. Without
+Pillow only exact duplicates are dropped and the count is capped.
+"""
+
+import hashlib
+import io
+import os
+from typing import Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+
+# Same cap as the images of a generated listing
+MAX_IMAGES = 6
+
+
+def _dhash(image) -> int:
+    """64-bit difference hash: compares neighbouring pixels of a 9x8 thumbnail."""
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            bits = (bits << 1) | (left > pixels[row * 9 + col + 1])
+    return bits
+
+
+def _reencode(
+    image, data: bytes, mime_type: str, max_edge: int, quality: int
+) -> tuple[bytes, str]:
+    """Downscale to ``max_edge`` and re-encode as JPEG unless that is larger."""
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    if image.mode != "RGB":
+        # Fotos brauchen keinen Alphakanal; transparente Flächen werden weiß
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    if buffer.tell() >= len(data):
+        return data, mime_type
+    return buffer.getvalue(), "image/jpeg"
+
+
+def preprocess_images(
+    images: list[tuple[bytes, str]],
+    max_edge: Optional[int] = None,
+    max_images: Optional[int] = None,
+    quality: Optional[int] = None,
+    dhash_distance: Optional[int] = None,
+) -> tuple[list[tuple[bytes, str]], dict]:
+    """Deduplicate, cap and downscale (bytes, mime type) images.
+
+    Defaults come from IMAGE_MAX_EDGE (1024), IMAGE_MAX_COUNT (6),
+    IMAGE_JPEG_QUALITY (85) and IMAGE_DHASH_DISTANCE (6 of 64 bits). Returns
+    the kept images and a report with the counts and bytes saved. CPU bound;
+    call it from a worker thread.
+    """
+    max_edge = max_edge or int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+    max_images = max_images or int(os.getenv("IMAGE_MAX_COUNT", str(MAX_IMAGES)))
+    quality = quality or int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+    if dhash_distance is None:
+        dhash_distance = int(os.getenv("IMAGE_DHASH_DISTANCE", "6"))
+
+    report = {
+        "received": len(images),
+        "kept": 0,
+        "exact_duplicates": 0,
+        "near_duplicates": 0,
+        "over_limit": 0,
+        "bytes_in": sum(len(data) for data, _ in images),
+        "bytes_out": 0,
+        "bytes_saved": 0,
+    }
+    kept = []
+    digests = set()
+    hashes = []
+    for data, mime_type in images:
+        digest = hashlib.sha256(data).digest()
+        if digest in digests:
+            report["exact_duplicates"] += 1
+            continue
+        digests.add(digest)
+
+        if len(kept) >= max_images:
+            # Don't decode images that would be dropped anyway
+            report["over_limit"] += 1
+            continue
+
+        image = None
+        if Image is not None:
+            try:
+                image = Image.open(io.BytesIO(data))
+                # JPEGs can be decoded at a reduced scale, which is much faster
+                image.draft("RGB", (max_edge, max_edge))
+                image.load()
+            except (OSError, ValueError, Image.DecompressionBombError):
+                image = None  # Not a decodable image: pass it through unchanged
+
+        if image is not None:
+            image_hash = _dhash(image)
+            if any(bin(image_hash ^ h).count("1") <= dhash_distance for h in hashes):
+                report["near_duplicates"] += 1
+                continue
+            hashes.append(image_hash)
+            data, mime_type = _reencode(image, data, mime_type, max_edge, quality)
+        kept.append((data, mime_type))
+
+    report["kept"] = len(kept)
+    report["bytes_out"] = sum(len(data) for data, _ in kept)
+    report["bytes_saved"] = report["bytes_in"] - report["bytes_out"]
+    return kept, report
+
+
+class ImageStats:
+    """Totals of the preprocessing reports, for /api/metrics."""
+
+    def __init__(self) -> None:
+        self._totals: dict[str, int] = {}
+        self.requests = 0
+
+    def record(self, report: dict) -> None:
+        """Add one request's preprocessing report."""
+        self.requests += 1
+        for key, value in report.items():
+            self._totals[key] = self._totals.get(key, 0) + value
+
+    def stats(self) -> dict:
+        """Return the request count and summed report values."""
+        return {"requests": self.requests, **self._totals}
+
+
+image_stats = ImageStats()
@@ -0,0 +1,223 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Background job queue for listing generation.
+
+Generating a listing can take tens of seconds once the LLM pipeline is
+involved, so the generate endpoint only submits a job and returns. A bounded
+pool of worker tasks picks jobs by priority; every state change is reported
+through ``on_update`` so the caller can keep it next to the property record.
+``on_update`` usually writes to a database, so a single writer task calls it
+in a thread, in the order of the changes, instead of blocking the event loop.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Priority queue served by a fixed number of worker tasks."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        on_update: Optional[Callable[[str, dict], None]] = None,
+    ) -> None:
+        """Initialize the queue; ``workers`` defaults to GENERATION_WORKERS (4)."""
+        self.workers = workers or int(os.getenv("GENERATION_WORKERS", "4"))
+        self.on_update = on_update
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker_tasks: list[asyncio.Task] = []
+        # Unfinished jobs only; finished states live with the caller's record
+        self._jobs: dict[str, dict] = {}
+        self._handlers: dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._running: dict[str, asyncio.Task] = {}
+        # State changes waiting for on_update, and the task writing them
+        self._updates: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Tie-breaker so equal priorities run first-in, first-out
+        self._sequence = itertools.count()
+        self._counts = {COMPLETED: 0, FAILED: 0, CANCELLED: 0}
+
+    @property
+    def started(self) -> bool:
+        """Whether the workers are running."""
+        return bool(self._worker_tasks)
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        if self._worker_tasks:
+            raise RuntimeError("Job queue is already started.")
+        self._queue = asyncio.PriorityQueue()
+        self._updates = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_updates(), name="job-state-writer")
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"generation-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, timeout: Optional[float] = 30.0) -> None:
+        """Cancel queued jobs, wait for running ones and stop the workers.
+
+        Jobs still running after ``timeout`` seconds are cancelled.
+        """
+        if not self._worker_tasks:
+            return
+        for job_id, job in list(self._jobs.items()):
+            if job["state"] == QUEUED:
+                self._finish(job_id, CANCELLED)
+        if self._running:
+            _, pending = await asyncio.wait(
+                list(self._running.values()), timeout=timeout
+            )
+            for task in pending:
+                task.cancel()
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+        # Persist the final states before the caller closes its storage
+        await self.flush()
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        self._updates = None
+
+    def submit(
+        self,
+        job_id: str,
+        handler: Callable[[], Awaitable[Any]],
+        priority: int = 0,
+    ) -> dict:
+        """Queue ``handler`` under ``job_id``; higher priorities run first."""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started.")
+        if job_id in self._jobs:
+            raise ValueError(f"Job {job_id} is already {self._jobs[job_id]['state']}.")
+
+        job = {
+            "job_id": job_id,
+            "state": QUEUED,
+            "priority": priority,
+            "submitted_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+        self._jobs[job_id] = job
+        self._handlers[job_id] = handler
+        self._queue.put_nowait((-priority, next(self._sequence), job_id))
+        self._notify(job)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return a copy of a queued or running job, or None."""
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def jobs(self) -> list[dict]:
+        """Return copies of the queued and running jobs."""
+        return [dict(job) for job in self._jobs.values()]
+
+    async def flush(self) -> None:
+        """Wait until on_update has been called for every state change so far."""
+        if self._updates is not None:
+            await self._updates.join()
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued or running job; returns None if it is not active."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        task = self._running.get(job_id)
+        if task is not None:
+            # The worker records the cancellation once the task has unwound
+            task.cancel()
+            return dict(job, state=CANCELLED)
+        # Still queued: the worker skips it when it comes up
+        return self._finish(job_id, CANCELLED)
+
+    def stats(self) -> dict:
+        """Return queue depth and outcome counters."""
+        queued = sum(1 for job in self._jobs.values() if job["state"] == QUEUED)
+        return {
+            "workers": self.workers,
+            "queued": queued,
+            "running": len(self._running),
+            **self._counts,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                job = self._jobs.get(job_id)
+                if job is None or job["state"] != QUEUED:
+                    continue  # Cancelled while waiting
+                await self._run(job_id, job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, job: dict) -> None:
+        job["state"] = RUNNING
+        job["started_at"] = datetime.now().isoformat()
+        self._notify(job)
+
+        task = asyncio.create_task(self._handlers[job_id]())
+        self._running[job_id] = task
+        try:
+            # wait() does not raise when the job itself is cancelled
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # The worker is being stopped
+            task.cancel()
+            self._finish(job_id, CANCELLED)
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+        if task.cancelled():
+            self._finish(job_id, CANCELLED)
+        elif task.exception() is not None:
+            self._finish(job_id, FAILED, error=str(task.exception()))
+        else:
+            self._finish(job_id, COMPLETED)
+
+    def _finish(self, job_id: str, state: str, error: Optional[str] = None) -> dict:
+        job = self._jobs.pop(job_id)
+        self._handlers.pop(job_id, None)
+        job["state"] = state
+        job["finished_at"] = datetime.now().isoformat()
+        job["error"] = error
+        self._counts[state] += 1
+        self._notify(job)
+        return dict(job)
+
+    def _notify(self, job: dict) -> None:
+        if self.on_update is not None and self._updates is not None:
+            self._updates.put_nowait((job["job_id"], dict(job)))
+
+    async def _write_updates(self) -> None:
+        while True:
+            job_id, job = await self._updates.get()
+            try:
+                await asyncio.to_thread(self.on_update, job_id, job)
+            except Exception:
+                logger.exception("Storing the state of job %s failed", job_id)
+            finally:
+                self._updates.task_done()
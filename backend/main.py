@@ -1,24 +1,109 @@
+import asyncio
+import base64
+import hashlib
 import json
-import random
+import logging
+import os
+import socket
+import time
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Optional, Literal
+from typing import List, Literal, Optional, Union
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import (
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-from backend.generate_knowledge import generate_knowledge
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+
+from backend.blob_store import BlobTooLarge, blob_store
+from backend.cache import knowledge_cache
+from backend.completeness import termination_stats
+from backend.generate_knowledge import decode_image, generate_knowledge, knowledge_stats
+from backend.geo import neighborhood_coordinates
 from backend.groupchat import do_groupchat
-from backend.models import Input  # Import der Input-Klasse aus models.py
+from backend.images import MAX_IMAGES, image_stats
+from backend.jobs import CANCELLED, FAILED, FINISHED_STATES, QUEUED, RUNNING, JobQueue
+from backend.models import (  # Import der Modelle aus models.py
+    AIGeneratedProperty,
+    Input,
+    PricingAnalysis,
+    PropertyDetails,
+    PropertyGenerationResponse,
+    PropertyListing,
+    PropertyLocation,
+)
+from backend.pricing import (
+    ABOVE_MARKET_PERCENT,
+    BELOW_MARKET_PERCENT,
+    pricing_engine,
+)
+from backend.repository import property_repository
+from backend.runtime import runtime_manager
+from backend.search import search_index
+from backend.services import registry
+from backend.singleflight import input_key, prompt_flights
+from backend.telemetry import prompt_span, setup_telemetry, shutdown_telemetry
+from backend.tokens import context_stats, manager_prompt_stats
 
 load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# How often a worker indexes listings generated by the other workers
+INDEX_SYNC_INTERVAL_SECONDS = float(os.getenv("INDEX_SYNC_INTERVAL_SECONDS", "2"))
+# Unreferenced blobs (e.g. of failed uploads) are deleted once they are this old
+BLOB_GC_INTERVAL_SECONDS = float(os.getenv("BLOB_GC_INTERVAL_SECONDS", "3600"))
+BLOB_GC_MIN_AGE_SECONDS = float(os.getenv("BLOB_GC_MIN_AGE_SECONDS", "3600"))
+# How often a worker looks for cancel requests other workers stored for its jobs
+JOB_CANCEL_POLL_INTERVAL_SECONDS = float(
+    os.getenv("JOB_CANCEL_POLL_INTERVAL_SECONDS", "2")
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the shared agent runtime and release process-wide resources on shutdown."""
+    setup_telemetry()
+    await asyncio.to_thread(_fail_orphaned_jobs)
+    await asyncio.to_thread(_rebuild_indexes)
+    await runtime_manager.start()
+    await job_queue.start()
+    # Search and pricing indexes live per process; with a repository shared
+    # by several workers, each one follows the repository's changes
+    followers = []
+    if property_repository.shared:
+        followers.append(asyncio.create_task(_sync_indexes_periodically()))
+        followers.append(asyncio.create_task(_apply_cancel_requests_periodically()))
+    blob_gc = asyncio.create_task(_collect_blob_garbage_periodically())
+    yield
+    blob_gc.cancel()
+    for task in followers:
+        task.cancel()
+    await job_queue.stop()
+    await runtime_manager.stop()
+    # Gemeinsamen HTTP-Verbindungspool der Chat-Services schließen
+    await registry.aclose()
+    property_repository.close()
+    shutdown_telemetry()
+
+
 # FastAPI-Instanz erstellen
 app = FastAPI(
     title="Real Estate AI API",
     description="AI-powered real estate listing generation API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -42,73 +127,30 @@ class PropertyImageUpload(BaseModel):
     user_prompt: Optional[str] = None
 
 
+class BatchGenerationRequest(BaseModel):
+    # Prompts (like /prompt/) or uploads (like /api/property/upload)
+    items: List[Union[Input, PropertyImageUpload]]
+    concurrency: Optional[int] = None
+
+
 class PropertyGenerationRequest(BaseModel):
     property_id: str
     additional_info: Optional[str] = None
+    priority: int = 0  # Höhere Priorität wird zuerst bearbeitet
 
 
 # Response Models
-class PropertyLocation(BaseModel):
-    address: str
-    city: str
-    state: str
-    zipCode: str
-    neighborhood: Optional[str] = None
-    coordinates: Optional[dict] = None
-
-
-class PropertyDetails(BaseModel):
-    bedrooms: int
-    bathrooms: int
-    sqft: int
-    type: str
-    yearBuilt: Optional[int] = None
-    parking: Optional[int] = None
-    lotSize: Optional[int] = None
-
-
-class PropertyListing(BaseModel):
-    datePosted: str
-    daysOnMarket: int
-    status: str
-    agent: dict
-
-
-class PricingAnalysis(BaseModel):
-    market_position: Literal["competitive", "below_market", "above_market"]
-    confidence: float
-    price_difference_percentage: float
-    comparable_properties: dict
-    recommendations: List[str]
-    market_insights: List[str]
-
-
-class AIGeneratedProperty(BaseModel):
-    id: str
-    title: str
-    price: int
-    pricePerSqft: Optional[int] = None
-    location: PropertyLocation
-    details: PropertyDetails
-    images: List[str]
-    features: List[str]
-    description: str
-    listing: PropertyListing
-    confidence_score: float
-    ai_suggestions: List[str]
-    pricing_analysis: PricingAnalysis
-
-
 class PropertyUploadResponse(BaseModel):
     property_id: str
     status: str
     message: str
 
 
-class PropertyGenerationResponse(BaseModel):
-    property: AIGeneratedProperty
-    processing_time: float
-    recommendations: List[str]
+class GenerationJobResponse(BaseModel):
+    property_id: str
+    status: str
+    priority: int
+    message: str
 
 
 # Mock data for AI generation
@@ -157,8 +199,12 @@ MOCK_PROPERTY_TEMPLATES = [
     },
 ]
 
-# In-memory storage for demo (in production, use a database)
-property_uploads = {}
+ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+MAX_UPLOAD_IMAGES = 10
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
 
 
 @app.get("/")
@@ -169,39 +215,37 @@ def read_root():
         "version": "1.0.0",
         "endpoints": {
             "upload": "/api/property/upload",
+            "upload_multipart": "/api/property/upload/multipart",
             "generate": "/api/property/generate/{property_id}",
             "status": "/api/property/status/{property_id}",
+            "search": "/api/property/search",
+            "metrics": "/api/metrics",
         },
     }
 
 
-@app.post(
-    "/api/property/upload", response_model=PropertyUploadResponse, status_code=201
-)
-def upload_property_images(upload_request: PropertyImageUpload):
-    """Upload property images and description for AI processing."""
-
-    if not upload_request.images or len(upload_request.images) == 0:
+def _check_upload(images: list, description: Optional[str]) -> None:
+    """Reject uploads without images or with a too short description."""
+    if not images:
         raise HTTPException(status_code=400, detail="At least one image is required")
 
-    if not upload_request.description or len(upload_request.description.strip()) < 10:
+    if not description or len(description.strip()) < 10:
         raise HTTPException(
             status_code=400, detail="Description must be at least 10 characters long"
         )
 
-    # Generate unique property ID
-    property_id = str(uuid.uuid4())
 
-    # Store upload data (in production, save to database and cloud storage)
-    property_uploads[property_id] = {
-        "id": property_id,
-        "images": upload_request.images,
-        "description": upload_request.description,
-        "user_prompt": upload_request.user_prompt,
-        "uploaded_at": datetime.now().isoformat(),
-        "status": "uploaded",
-        "processed": False,
-    }
+@app.post(
+    "/api/property/upload", response_model=PropertyUploadResponse, status_code=201
+)
+def upload_property_images(upload_request: PropertyImageUpload):
+    """Upload property images and description for AI processing."""
+
+    _check_upload(upload_request.images, upload_request.description)
+
+    property_id = _create_upload_record(
+        upload_request.images, upload_request.description, upload_request.user_prompt
+    )
 
     return PropertyUploadResponse(
         property_id=property_id,
@@ -211,26 +255,123 @@ def upload_property_images(upload_request: PropertyImageUpload):
 
 
 @app.post(
-    "/api/property/generate/{property_id}", response_model=PropertyGenerationResponse
+    "/api/property/upload/multipart",
+    response_model=PropertyUploadResponse,
+    status_code=201,
 )
-def generate_property_listing(
-    property_id: str, generation_request: Optional[PropertyGenerationRequest] = None
+async def upload_property_files(
+    images: List[UploadFile] = File(...),
+    description: str = Form(...),
+    user_prompt: Optional[str] = Form(None),
 ):
-    """Generate AI-powered property listing from uploaded images and description."""
-
-    if property_id not in property_uploads:
-        raise HTTPException(status_code=404, detail="Property upload not found")
+    """Upload property images as multipart/form-data.
 
-    upload_data = property_uploads[property_id]
+    The images are streamed to the blob store in chunks; the upload record only
+    keeps references and serves them under /api/blobs/{blob_id}.
+    """
 
-    if upload_data["processed"]:
+    if len(images) > MAX_UPLOAD_IMAGES:
         raise HTTPException(
-            status_code=400, detail="Property listing already generated"
+            status_code=400, detail=f"Maximum {MAX_UPLOAD_IMAGES} images allowed"
         )
 
-    # Mock AI processing time
-    import time
+    _check_upload(images, description)
+
+    # Blobs of a failed upload may be shared with other uploads, so they are
+    # left to the blob garbage collection (_collect_blob_garbage)
+    image_refs = []
+    for image in images:
+        try:
+            if image.content_type not in ALLOWED_IMAGE_TYPES:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{image.filename}: Only JPEG, PNG, and WebP images are allowed",
+                )
+            image_refs.append(await blob_store.save_stream(image, image.content_type))
+        except BlobTooLarge as e:
+            raise HTTPException(status_code=413, detail=f"{image.filename}: {e}")
+        finally:
+            await image.close()
+
+    property_id = await asyncio.to_thread(
+        _create_upload_record,
+        [f"/api/blobs/{ref['blob_id']}" for ref in image_refs],
+        description,
+        user_prompt,
+        image_refs,
+    )
+
+    return PropertyUploadResponse(
+        property_id=property_id,
+        status="uploaded",
+        message="Images and description uploaded successfully. You can now generate the property listing.",
+    )
+
+
+def _collect_blob_garbage() -> int:
+    """Delete the blobs no property record references; return how many."""
+    referenced = set()
+    after = None
+    while page := property_repository.list_summaries(limit=1000, after=after):
+        for summary in page:
+            record = property_repository.get(summary["property_id"])
+            for ref in (record or {}).get("image_refs") or []:
+                referenced.add(ref["blob_id"])
+        after = (page[-1]["uploaded_at"], page[-1]["property_id"])
+    return blob_store.sweep(referenced, min_age=BLOB_GC_MIN_AGE_SECONDS)
+
+
+async def _collect_blob_garbage_periodically() -> None:
+    while True:
+        await asyncio.sleep(BLOB_GC_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_collect_blob_garbage)
+        except Exception:
+            logger.exception("Collecting unreferenced blobs failed")
+
+
+@app.get("/api/blobs/{blob_id}")
+def get_blob(blob_id: str):
+    """Serve an uploaded image from the blob store."""
+    if not blob_store.exists(blob_id):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        blob_store.path(blob_id), media_type=blob_store.content_type(blob_id)
+    )
+
+
+def _create_upload_record(
+    images: List[str],
+    description: str,
+    user_prompt: Optional[str],
+    image_refs: Optional[List[dict]] = None,
+) -> str:
+    """Store a new upload and return its property ID."""
+    # Generate unique property ID
+    property_id = str(uuid.uuid4())
+
+    # Store upload data (images live in the blob store or are inline base64)
+    property_repository.add(
+        {
+            "id": property_id,
+            "images": images,
+            "image_refs": image_refs or [],
+            "description": description,
+            "user_prompt": user_prompt,
+            "uploaded_at": datetime.now().isoformat(),
+            "status": "uploaded",
+            "processed": False,
+        }
+    )
+    return property_id
+
+
+def _generate_mock_listing(
+    property_id: str, upload_data: dict
+) -> PropertyGenerationResponse:
+    """Generate an AI-powered property listing from uploaded images and description."""
 
+    # Mock AI processing time
     start_time = time.time()
 
     # Simulate AI analysis of images and description
@@ -251,32 +392,60 @@ def generate_property_listing(
     elif "villa" in description_lower or "luxury" in description_lower:
         selected_template = MOCK_PROPERTY_TEMPLATES[0]
 
-    # Generate realistic pricing analysis
+    # Pricing analysis against comparable generated listings
     def generate_pricing_analysis(
         proposed_price: int, property_details: dict, location: dict
     ) -> PricingAnalysis:
-        # Mock market data based on property type and location
-        base_price = selected_template["price_range"][0]
-        high_price = selected_template["price_range"][1]
-        avg_price = (base_price + high_price) // 2
-
-        # Calculate market position
-        price_diff_percentage = ((proposed_price - avg_price) / avg_price) * 100
-
-        if price_diff_percentage < -10:
-            market_position = "below_market"
-        elif price_diff_percentage > 15:
-            market_position = "above_market"
+        coordinates = location.get("coordinates") or {}
+        comparables = pricing_engine.price(
+            proposed_price,
+            property_details["sqft"],
+            property_details["bedrooms"],
+            property_details["type"],
+            coordinates.get("lat"),
+            coordinates.get("lng"),
+        )
+
+        if comparables["sample_size"] >= pricing_engine.min_comparables:
+            base_price = comparables["p25_price"]
+            high_price = comparables["p75_price"]
+            avg_price = comparables["avg_price"]
+            market_position = comparables["market_position"]
+            price_diff_percentage = comparables["price_difference_percentage"]
+            confidence = comparables["confidence"]
+            comparable_properties = {
+                key: comparables[key]
+                for key in (
+                    "avg_price",
+                    "min_price",
+                    "max_price",
+                    "median_price",
+                    "p25_price",
+                    "p75_price",
+                    "estimated_price",
+                    "price_percentile",
+                    "sample_size",
+                )
+            }
         else:
-            market_position = "competitive"
-
-        # Generate comparable properties data
-        comparable_properties = {
-            "avg_price": avg_price,
-            "min_price": base_price - random.randint(50000, 100000),
-            "max_price": high_price + random.randint(50000, 150000),
-            "sample_size": random.randint(8, 18),
-        }
+            # Too few comparables yet: fall back to the template's price range
+            base_price = selected_template["price_range"][0]
+            high_price = selected_template["price_range"][1]
+            avg_price = (base_price + high_price) // 2
+            price_diff_percentage = ((proposed_price - avg_price) / avg_price) * 100
+            if price_diff_percentage < BELOW_MARKET_PERCENT:
+                market_position = "below_market"
+            elif price_diff_percentage > ABOVE_MARKET_PERCENT:
+                market_position = "above_market"
+            else:
+                market_position = "competitive"
+            confidence = 0.5
+            comparable_properties = {
+                "avg_price": avg_price,
+                "min_price": base_price,
+                "max_price": high_price,
+                "sample_size": comparables["sample_size"],
+            }
 
         # Generate specific recommendations based on market position
         recommendations = []
@@ -321,7 +490,7 @@ def generate_property_listing(
 
         return PricingAnalysis(
             market_position=market_position,
-            confidence=random.uniform(0.80, 0.95),
+            confidence=confidence,
             price_difference_percentage=round(price_diff_percentage, 1),
             comparable_properties=comparable_properties,
             recommendations=recommendations,
@@ -329,10 +498,14 @@ def generate_property_listing(
         )
 
     # Generate pricing analysis
+    # Spread listings around their neighbourhood instead of one fixed point
+    coordinates = neighborhood_coordinates(
+        selected_template["location"]["neighborhood"], property_id
+    )
     pricing_analysis = generate_pricing_analysis(
         selected_template["price_range"][1],
         selected_template["details"],
-        selected_template["location"],
+        {**selected_template["location"], "coordinates": coordinates},
     )
 
     # Generate AI property listing
@@ -349,10 +522,10 @@ def generate_property_listing(
             state=selected_template["location"]["state"],
             zipCode="80331",
             neighborhood=selected_template["location"]["neighborhood"],
-            coordinates={"lat": 48.1351, "lng": 11.5820},
+            coordinates=coordinates,
         ),
         details=PropertyDetails(**selected_template["details"]),
-        images=upload_data["images"][:6],  # Use uploaded images
+        images=upload_data["images"][:MAX_IMAGES],  # Use uploaded images
         features=selected_template["features"],
         description=f"{upload_data['description']}\n\nThis property features excellent craftsmanship and modern amenities. Located in a prime area with great connectivity and local amenities. Perfect for families looking for comfort and style.",
         listing=PropertyListing(
@@ -376,10 +549,6 @@ def generate_property_listing(
         pricing_analysis=pricing_analysis,
     )
 
-    # Mark as processed
-    property_uploads[property_id]["processed"] = True
-    property_uploads[property_id]["generated_property"] = ai_property.dict()
-
     processing_time = time.time() - start_time
 
     return PropertyGenerationResponse(
@@ -394,53 +563,636 @@ def generate_property_listing(
     )
 
 
+# Process that runs a job, so a restarted worker can tell its predecessor's
+# jobs from the ones other workers are still running
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _store_job_state(property_id: str, job: dict) -> None:
+    """Keep the latest job state in the property record."""
+    property_repository.update(property_id, job={**job, "worker": WORKER_ID})
+
+
+def _worker_alive(worker: Optional[str]) -> bool:
+    """Whether the process that stored a job state is still running.
+
+    The SQLite repository is only shared by the workers of one host, so a job
+    of another host (e.g. a replaced container) counts as orphaned.
+    """
+    hostname, _, pid = (worker or "").rpartition(":")
+    if hostname != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) in (0, os.getpid()):
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, but belongs to another user
+    return True
+
+
+def _fail_orphaned_jobs() -> int:
+    """Mark jobs failed whose worker died (crash or restart); returns their number.
+
+    Without this their property would stay queued or running and every new
+    generate request would get a 409.
+    """
+    orphaned = 0
+    for state in (QUEUED, RUNNING):
+        after = None
+        while page := property_repository.list_summaries(
+            status=state, limit=1000, after=after
+        ):
+            for summary in page:
+                record = property_repository.get(summary["property_id"])
+                job = (record or {}).get("job")
+                if job is None or _worker_alive(job.get("worker")):
+                    continue
+                property_repository.update(
+                    summary["property_id"],
+                    job={
+                        **job,
+                        "state": FAILED,
+                        "finished_at": datetime.now().isoformat(),
+                        "error": "Interrupted by a server restart",
+                    },
+                )
+                orphaned += 1
+            after = (page[-1]["uploaded_at"], page[-1]["property_id"])
+    return orphaned
+
+
+job_queue = JobQueue(on_update=_store_job_state)
+
+
+def _requested_cancellations(jobs: list[dict]) -> list[str]:
+    """Return the ids of the given jobs another worker was asked to cancel."""
+    requested = []
+    for job in jobs:
+        record = property_repository.get(job["job_id"])
+        # The request names the submission, so a later job is not cancelled
+        if record and record.get("cancel_requested") == job["submitted_at"]:
+            requested.append(job["job_id"])
+    return requested
+
+
+async def _apply_cancel_requests_periodically() -> None:
+    while True:
+        await asyncio.sleep(JOB_CANCEL_POLL_INTERVAL_SECONDS)
+        try:
+            jobs = job_queue.jobs()
+            if not jobs:
+                continue
+            for job_id in await asyncio.to_thread(_requested_cancellations, jobs):
+                job_queue.cancel(job_id)
+        except Exception:
+            logger.exception("Applying job cancel requests failed")
+
+
+async def _store_generation_result(
+    property_id: str, response: PropertyGenerationResponse
+) -> None:
+    """Mark an upload as processed and index its listing."""
+    generated_property = response.property.model_dump(mode="json")
+    await asyncio.to_thread(
+        property_repository.update,
+        property_id,
+        processed=True,
+        generated_property=generated_property,
+        generation_result=response.model_dump(mode="json"),
+    )
+    # Indexing copies NumPy arrays; keep it off the event loop
+    await asyncio.to_thread(_index_listing, property_id, generated_property)
+
+
+def _index_listing(property_id: str, listing: dict) -> None:
+    search_index.add(property_id, listing)
+    pricing_engine.add(property_id, listing)
+
+
+async def _run_generation_job(property_id: str) -> None:
+    upload_data = await asyncio.to_thread(property_repository.get, property_id)
+    if upload_data["processed"]:
+        return  # Generated by a request that raced this one
+    # Die Generierung ist synchron und darf die Event-Loop nicht blockieren
+    response = await asyncio.to_thread(
+        _generate_mock_listing, property_id, upload_data
+    )
+    await _store_generation_result(property_id, response)
+
+
+@app.post(
+    "/api/property/generate/{property_id}",
+    response_model=GenerationJobResponse,
+    status_code=202,
+)
+async def generate_property_listing(
+    property_id: str, generation_request: Optional[PropertyGenerationRequest] = None
+):
+    """Queue AI-powered listing generation; poll the status endpoint for the result."""
+
+    # The job queue lives on the event loop, only the repository runs in a thread
+    upload_data = await asyncio.to_thread(property_repository.get, property_id)
+    if upload_data is None:
+        raise HTTPException(status_code=404, detail="Property upload not found")
+
+    if upload_data["processed"]:
+        raise HTTPException(
+            status_code=400, detail="Property listing already generated"
+        )
+
+    job = upload_data.get("job")
+    if job and job["state"] not in FINISHED_STATES:
+        raise HTTPException(
+            status_code=409, detail=f"Property listing generation is already {job['state']}"
+        )
+
+    priority = generation_request.priority if generation_request else 0
+    # submit() checks and enqueues without awaiting in between, so of two
+    # concurrent requests for the same property only one gets the job
+    try:
+        job = job_queue.submit(
+            property_id, lambda: _run_generation_job(property_id), priority=priority
+        )
+    except ValueError:
+        active = job_queue.get(property_id)
+        state = active["state"] if active else "queued"
+        raise HTTPException(
+            status_code=409, detail=f"Property listing generation is already {state}"
+        )
+    # The status endpoint shows the job once this returns
+    await job_queue.flush()
+
+    return GenerationJobResponse(
+        property_id=property_id,
+        status=job["state"],
+        priority=job["priority"],
+        message="Listing generation queued. Poll the status endpoint for the result.",
+    )
+
+
+@app.delete("/api/property/generate/{property_id}", response_model=GenerationJobResponse)
+async def cancel_property_generation(property_id: str, response: Response):
+    """Cancel a queued or running listing generation.
+
+    A job of another worker is cancelled by that worker: this stores a cancel
+    request and answers 202 with the job's current state.
+    """
+
+    if await asyncio.to_thread(property_repository.get, property_id) is None:
+        raise HTTPException(status_code=404, detail="Property upload not found")
+
+    job = job_queue.cancel(property_id)
+    if job is not None:
+        await job_queue.flush()
+        return GenerationJobResponse(
+            property_id=property_id,
+            status=job["state"],
+            priority=job["priority"],
+            message="Listing generation cancelled.",
+        )
+
+    # Not in this worker's queue; read the stored state after this worker's
+    # own pending writes (e.g. of a job that just finished)
+    await job_queue.flush()
+    upload_data = await asyncio.to_thread(property_repository.get, property_id)
+    job = (upload_data or {}).get("job")
+    if job is None:
+        raise HTTPException(
+            status_code=409, detail="No queued or running generation for this property"
+        )
+    if job["state"] in FINISHED_STATES:
+        raise HTTPException(
+            status_code=409, detail=f"Property listing generation is already {job['state']}"
+        )
+
+    if not _worker_alive(job.get("worker")):
+        # Nobody would ever finish it
+        job = {**job, "state": CANCELLED, "finished_at": datetime.now().isoformat()}
+        await asyncio.to_thread(property_repository.update, property_id, job=job)
+        return GenerationJobResponse(
+            property_id=property_id,
+            status=job["state"],
+            priority=job["priority"],
+            message="Listing generation cancelled.",
+        )
+
+    await asyncio.to_thread(
+        property_repository.update, property_id, cancel_requested=job["submitted_at"]
+    )
+    response.status_code = 202
+    return GenerationJobResponse(
+        property_id=property_id,
+        status=job["state"],
+        priority=job["priority"],
+        message=(
+            f"Listing generation is {job['state']} on worker {job['worker']}; "
+            "cancellation requested. Poll the status endpoint for the result."
+        ),
+    )
+
+
 @app.get("/api/property/status/{property_id}")
 def get_property_status(property_id: str):
     """Get the status of a property upload and generation."""
 
-    if property_id not in property_uploads:
+    upload_data = property_repository.get(property_id)
+    if upload_data is None:
         raise HTTPException(status_code=404, detail="Property upload not found")
 
-    upload_data = property_uploads[property_id]
-
     return {
         "property_id": property_id,
-        "status": "processed" if upload_data["processed"] else "uploaded",
+        "status": upload_data["status"],
         "uploaded_at": upload_data["uploaded_at"],
         "images_count": len(upload_data["images"]),
         "description_length": len(upload_data["description"]),
         "processed": upload_data["processed"],
+        "job": upload_data.get("job"),
+        "result": upload_data.get("generation_result"),
     }
 
 
+def _encode_cursor(summary: dict) -> str:
+    key = json.dumps([summary["uploaded_at"], summary["property_id"]])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor))
+    except ValueError:  # Also binascii.Error and UnicodeDecodeError
+        key = None
+    if not (
+        isinstance(key, list) and len(key) == 2 and all(isinstance(k, str) for k in key)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key[0], key[1]
+
+
 @app.get("/api/property/list")
-def list_all_properties():
-    """List all uploaded properties (for development/testing)."""
+def list_all_properties(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    uploaded_from: Optional[str] = None,
+    uploaded_before: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """List uploaded properties, one page at a time.
+
+    Filters by status and an uploaded_at range ([uploaded_from, uploaded_before),
+    ISO timestamps). Pass ``next_cursor`` back as ``cursor`` for the next page.
+    Unchanged pages are answered with 304 when If-None-Match carries their ETag.
+    """
+    # Die Version ändert sich bei jedem Schreibzugriff, die Parameter bestimmen die Seite
+    params = f"{status}|{uploaded_from}|{uploaded_before}|{order}|{limit}|{cursor}"
+    etag = 'W/"{}-{}"'.format(
+        property_repository.version(),
+        hashlib.sha1(params.encode()).hexdigest()[:16],
+    )
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # One extra row tells whether there is another page
+    summaries = property_repository.list_summaries(
+        status=status,
+        uploaded_from=uploaded_from,
+        uploaded_before=uploaded_before,
+        descending=order == "desc",
+        limit=limit + 1,
+        after=_decode_cursor(cursor) if cursor else None,
+    )
+    page = summaries[:limit]
+    response.headers["ETag"] = etag
     return {
-        "properties": [
-            {
-                "property_id": pid,
-                "status": "processed" if data["processed"] else "uploaded",
-                "uploaded_at": data["uploaded_at"],
-            }
-            for pid, data in property_uploads.items()
-        ],
-        "total": len(property_uploads),
+        "properties": page,
+        # Matches all pages of this query, not just the status
+        "total": property_repository.count(
+            status, uploaded_from=uploaded_from, uploaded_before=uploaded_before
+        ),
+        "next_cursor": _encode_cursor(page[-1]) if len(summaries) > limit else None,
+    }
+
+
+# Repository version the search and pricing indexes are up to date with
+_indexed_version: Optional[str] = None
+
+
+def _rebuild_indexes() -> None:
+    """Index the listings already generated (e.g. stored in SQLite before a restart)."""
+    global _indexed_version
+    # Taken first, so listings written during the rebuild are synced again
+    version = property_repository.version()
+    after = None
+    while page := property_repository.list_summaries(
+        status="processed", limit=1000, after=after
+    ):
+        listings = []
+        for summary in page:
+            record = property_repository.get(summary["property_id"])
+            if record and record.get("generated_property"):
+                search_index.add(record["id"], record["generated_property"])
+                listings.append((record["id"], record["generated_property"]))
+        pricing_engine.add_many(listings)
+        after = (page[-1]["uploaded_at"], page[-1]["property_id"])
+    _indexed_version = version
+
+
+def _sync_indexes() -> int:
+    """Index the listings generated since the last rebuild or sync; return how many."""
+    global _indexed_version
+    records, version = property_repository.changes_since(
+        _indexed_version, status="processed"
+    )
+    listings = [
+        (record["id"], record["generated_property"])
+        for record in records
+        if record.get("generated_property")
+    ]
+    for property_id, listing in listings:
+        search_index.add(property_id, listing)
+    pricing_engine.add_many(listings)
+    _indexed_version = version
+    return len(listings)
+
+
+async def _sync_indexes_periodically() -> None:
+    while True:
+        await asyncio.sleep(INDEX_SYNC_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_sync_indexes)
+        except Exception:
+            logger.exception("Syncing the search and pricing indexes failed")
+
+
+@app.get("/api/property/search")
+def search_properties(
+    q: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_sqft: Optional[float] = None,
+    max_sqft: Optional[float] = None,
+    min_bedrooms: Optional[int] = None,
+    max_bedrooms: Optional[int] = None,
+    min_price_per_sqft: Optional[float] = None,
+    max_price_per_sqft: Optional[float] = None,
+    sort: Literal["relevance", "price_asc", "price_desc"] = "relevance",
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Search generated listings by words in title, features and description and by ranges."""
+    start_time = time.perf_counter()
+    results, total = search_index.search(
+        q,
+        ranges={
+            "price": (min_price, max_price),
+            "sqft": (min_sqft, max_sqft),
+            "bedrooms": (min_bedrooms, max_bedrooms),
+            "pricePerSqft": (min_price_per_sqft, max_price_per_sqft),
+        },
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
+    return {
+        "results": results,
+        "total": total,
+        "took_ms": (time.perf_counter() - start_time) * 1000,
+    }
+
+
+@app.get("/api/metrics")
+def get_metrics():
+    """Return in-process performance counters."""
+    return {
+        "knowledge_cache": knowledge_cache.stats(),
+        "jobs": job_queue.stats(),
+        "manager_prompts": manager_prompt_stats.stats(),
+        "group_chat_termination": termination_stats.stats(),
+        "context_compaction": context_stats.stats(),
+        "images": image_stats.stats(),
+        "knowledge_agents": knowledge_stats.stats(),
+        "search_index": {"listings": len(search_index)},
+        "pricing": {"listings": len(pricing_engine)},
+        "prompt_single_flight": prompt_flights.stats(),
     }
 
 
+def _check_images(input: Input) -> None:
+    """Reject requests with undecodable images or images not in the blob store."""
+    for index, image in enumerate(input.images):
+        try:
+            decode_image(image)
+        except ValueError as e:
+            name = image if len(image) <= 40 else f"{image[:37]}..."
+            raise HTTPException(status_code=422, detail=f"Image {index} ({name}): {e}")
+    for blob_id in input.image_ids:
+        if not blob_store.exists(blob_id):
+            raise HTTPException(status_code=404, detail=f"Image {blob_id} not found")
+
+
+async def _run_prompt(input: Input) -> PropertyGenerationResponse:
+    """Knowledge generation and group chat for one input.
+
+    Identical inputs arriving while a run is in flight share that run.
+    """
+
+    async def run() -> PropertyGenerationResponse:
+        with prompt_span("/prompt/", input.manager_mode):
+            knowledge = await generate_knowledge(input)
+            return await do_groupchat(
+                knowledge,
+                manager_mode=input.manager_mode,
+                expert_mode=input.expert_mode,
+                max_rounds=input.max_rounds,
+            )
+
+    result = await prompt_flights.run(input_key(input), run)
+    # Jeder Aufrufer bekommt eine eigene Kopie des geteilten Ergebnisses
+    return result.model_copy(deep=True)
+
+
 # Legacy endpoint for backward compatibility
-@app.post("/prompt/", status_code=201)
+@app.post("/prompt/", response_model=PropertyGenerationResponse, status_code=201)
 async def create_item_legacy(input: Input):
-    await generate_knowledge(input)
-    await do_groupchat()
+    _check_images(input)
+    try:
+        return await _run_prompt(input)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=502, detail=f"Group chat returned an invalid property: {e}"
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Group chat timed out")
+
+
+def _upload_input(upload: PropertyImageUpload) -> Input:
+    """Turn an upload payload into a prompt for the agent pipeline."""
+    prompt = upload.description
+    if upload.user_prompt:
+        prompt = f"{upload.user_prompt}\n\n{prompt}"
+    images, image_ids = [], []
+    for image in upload.images:
+        if image.startswith("/api/blobs/"):
+            image_ids.append(image.rsplit("/", 1)[-1])
+        else:
+            images.append(image)
+    return Input(prompt=prompt, images=images, image_ids=image_ids)
+
+
+def _pipeline_error(error: Exception) -> str:
+    """Error message of a failed pipeline run, worded like the /prompt/ errors."""
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    if isinstance(error, ValidationError):
+        return f"Group chat returned an invalid property: {error}"
+    if isinstance(error, asyncio.TimeoutError):
+        return "Group chat timed out"
+    return str(error) or type(error).__name__
+
+
+@app.post("/prompt/batch")
+async def create_items_batch(batch: BatchGenerationRequest):
+    """Run many prompts or uploads through the agent pipeline, streaming NDJSON.
+
+    Items run ``concurrency`` at a time (BATCH_CONCURRENCY by default). One
+    line is written per item as soon as it finishes, in completion order:
+    {"index", "status": "completed" | "failed", "result" | "error",
+    "elapsed_ms"}, plus "property_id" for uploads, which are stored like
+    /api/property/upload and marked processed on success. A failing item
+    does not affect the others. The last line is a summary.
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"Maximum {BATCH_MAX_ITEMS} items per batch"
+        )
+    concurrency = max(1, min(batch.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run_item(index: int, item: Union[Input, PropertyImageUpload]) -> None:
+        async with semaphore:
+            start_time = time.perf_counter()
+            line: dict = {"index": index}
+            try:
+                upload = item if isinstance(item, PropertyImageUpload) else None
+                if upload is not None:
+                    # Invalid uploads fail on their own line, without a record
+                    _check_upload(upload.images, upload.description)
+                    item = _upload_input(upload)
+                _check_images(item)
+                if upload is not None:
+                    line["property_id"] = await asyncio.to_thread(
+                        _create_upload_record,
+                        upload.images,
+                        upload.description,
+                        upload.user_prompt,
+                    )
+                result = await _run_prompt(item)
+                if "property_id" in line:
+                    result.property.id = line["property_id"]
+                    await _store_generation_result(line["property_id"], result)
+                line.update(status="completed", result=result.model_dump(mode="json"))
+            except Exception as e:
+                line.update(status="failed", error=_pipeline_error(e))
+            line["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 1)
+            await queue.put(line)
+
+    async def result_stream():
+        start_time = time.perf_counter()
+        tasks = [
+            asyncio.create_task(run_item(index, item))
+            for index, item in enumerate(batch.items)
+        ]
+        completed = 0
+        try:
+            for _ in tasks:
+                line = await queue.get()
+                completed += line["status"] == "completed"
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            summary = {
+                "items": len(tasks),
+                "completed": completed,
+                "failed": len(tasks) - completed,
+                "concurrency": concurrency,
+                "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+            }
+            yield json.dumps({"summary": summary}) + "\n"
+        finally:
+            # Client disconnected (or batch finished): stop the remaining items
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # Datei lesen
-    data = {}
-    with open("group_chat_result.txt", "r", encoding="utf-8") as f:
-        content = f.read()
 
-    return json.loads(content)
+def _sse(event: str, data: dict) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/prompt/stream")
+async def create_item_stream(input: Input):
+    """Streaming variant of /prompt/ using server-sent events.
+
+    Emits an "images_preprocessed" report and "knowledge" events as the
+    knowledge agents answer, then "agent_turn",
+    "selection" and "termination" events while the group chat runs, and finally
+    a "result" event with the property (or an "error" event).
+    """
+    _check_images(input)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_event(event: str, data: dict) -> None:
+        await queue.put((event, data))
+
+    async def run_pipeline() -> None:
+        try:
+            with prompt_span("/prompt/stream", input.manager_mode):
+                knowledge = await generate_knowledge(input, on_event=on_event)
+                result = await do_groupchat(
+                    knowledge,
+                    on_event=on_event,
+                    manager_mode=input.manager_mode,
+                    expert_mode=input.expert_mode,
+                    max_rounds=input.max_rounds,
+                )
+            await queue.put(("result", result.model_dump(mode="json")))
+        except ValidationError as e:
+            await queue.put(
+                ("error", {"detail": f"Group chat returned an invalid property: {e}"})
+            )
+        except asyncio.TimeoutError:
+            await queue.put(("error", {"detail": "Group chat timed out"}))
+        except Exception as e:
+            await queue.put(("error", {"detail": str(e)}))
+        finally:
+            await queue.put(None)
+
+    async def event_stream():
+        task = asyncio.create_task(run_pipeline())
+        try:
+            while (item := await queue.get()) is not None:
+                yield _sse(*item)
+        finally:
+            # Client disconnected (or stream finished): stop the pipeline
+            task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 if __name__ == "__main__":
@@ -1,10 +1,141 @@
-from typing import List
+import os
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel
 
+KNOWLEDGE_FILES = {
+    "location": "generated_knowledge_location.txt",
+    "customer": "generated_knowledge_customer.txt",
+    "images": "generated_knowledge_images.txt",
+}
+
 
 class Input(BaseModel):
     """Input model for property data and images."""
 
     prompt: str
     images: List[str] = []  # List of base64-encoded images
+    image_ids: List[str] = []  # Images uploaded to the blob store
+    # "llm": the model decides on termination and speaker order,
+    # "fast": round-robin until every expert has spoken once (no extra LLM calls)
+    manager_mode: Literal["llm", "fast"] = "llm"
+    # "sequential": every turn waits for the previous one,
+    # "concurrent": all experts answer the first round at the same time
+    expert_mode: Literal["sequential", "concurrent"] = "sequential"
+    # Limit of expert turns for this request (the manager's default if not set)
+    max_rounds: Optional[int] = None
+    # Position of the property, if known; nearby listings are only given to
+    # the LocationExpert for real coordinates
+    coordinates: Optional["Coordinates"] = None
+
+
+class GeneratedKnowledge(BaseModel):
+    """Knowledge generated for a single request and handed to the group chat experts."""
+
+    location: str = "Keine Standortinformationen verfügbar."
+    customer: str = "Keine Kundeninformationen verfügbar."
+    images: str = "Keine Bildinformationen verfügbar."
+
+    def dump(self, directory: str) -> None:
+        """Write the knowledge to generated_knowledge_*.txt files (debugging only)."""
+        os.makedirs(directory, exist_ok=True)
+        for field, filename in KNOWLEDGE_FILES.items():
+            with open(os.path.join(directory, filename), "w", encoding="utf-8") as file:
+                file.write(getattr(self, field))
+
+    @classmethod
+    def load(cls, directory: str) -> "GeneratedKnowledge":
+        """Read a previous debug dump, falling back to the defaults for missing files."""
+        values = {}
+        for field, filename in KNOWLEDGE_FILES.items():
+            try:
+                with open(
+                    os.path.join(directory, filename), "r", encoding="utf-8"
+                ) as file:
+                    values[field] = file.read()
+            except FileNotFoundError:
+                pass
+        return cls(**values)
+
+
+# Response Models
+class Coordinates(BaseModel):
+    lat: float
+    lng: float
+
+
+class PropertyLocation(BaseModel):
+    address: str
+    city: str
+    state: str
+    zipCode: str
+    neighborhood: Optional[str] = None
+    coordinates: Optional[Coordinates] = None
+
+
+class PropertyDetails(BaseModel):
+    bedrooms: int
+    bathrooms: int
+    sqft: int
+    type: str
+    yearBuilt: Optional[int] = None
+    parking: Optional[int] = None
+    lotSize: Optional[int] = None
+
+
+class ListingAgent(BaseModel):
+    name: str
+    company: str
+    phone: str
+    email: str
+
+
+class PropertyListing(BaseModel):
+    datePosted: str
+    daysOnMarket: int
+    status: str
+    agent: ListingAgent
+
+
+class ComparableProperties(BaseModel):
+    avg_price: int
+    min_price: int
+    max_price: int
+    sample_size: int
+    # Only set when the comparables engine found enough listings
+    median_price: Optional[int] = None
+    p25_price: Optional[int] = None
+    p75_price: Optional[int] = None
+    estimated_price: Optional[int] = None
+    price_percentile: Optional[float] = None
+
+
+class PricingAnalysis(BaseModel):
+    market_position: Literal["competitive", "below_market", "above_market"]
+    confidence: float
+    price_difference_percentage: float
+    comparable_properties: ComparableProperties
+    recommendations: List[str]
+    market_insights: List[str]
+
+
+class AIGeneratedProperty(BaseModel):
+    id: str
+    title: str
+    price: int
+    pricePerSqft: Optional[int] = None
+    location: PropertyLocation
+    details: PropertyDetails
+    images: List[str]
+    features: List[str]
+    description: str
+    listing: PropertyListing
+    confidence_score: float
+    ai_suggestions: List[str]
+    pricing_analysis: PricingAnalysis
+
+
+class PropertyGenerationResponse(BaseModel):
+    property: AIGeneratedProperty
+    processing_time: float
+    recommendations: List[str]
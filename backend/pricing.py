@@ -0,0 +1,372 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Comparable-properties pricing over the generated listings.
+
+Listings are stored as NumPy columns with a sort order by (property type,
+sqft) and a spatial grid per property type. A query only looks at the nearby
+listings of the same type (or, without coordinates or nearby listings, at the
+ones closest in size), picks the nearest ones by size, bedrooms and distance,
+and derives price statistics and the market position from them. The
+statistics are vectorised over queries as well, so a batch of listings is
+priced with a handful of array operations.
+"""
+
+import math
+import os
+import threading
+from collections.abc import Iterable, Sequence
+from typing import Optional
+
+import numpy as np
+
+from backend.geo import KM_PER_DEGREE, GridIndex
+
+# Sort key: type code * KEY_SCALE + sqft
+KEY_SCALE = 1e7
+
+# Distances at which a comparable counts as "one unit" different
+SQFT_SCALE = 0.25  # log ratio, i.e. ~25 % larger or smaller
+BEDROOM_SCALE = 1.0
+DISTANCE_SCALE_KM = 2.0
+
+# Same thresholds as the former mock analysis
+BELOW_MARKET_PERCENT = -10
+ABOVE_MARKET_PERCENT = 15
+
+_COLUMNS = ("type", "price", "sqft", "bedrooms", "lat", "lng")
+
+
+def _normalize_type(property_type: Optional[str]) -> str:
+    return (property_type or "").strip().lower()
+
+
+def _percentiles(ordered: np.ndarray, counts: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Linear-interpolated quantiles ``q`` of the first ``counts`` values per row.
+
+    ``ordered`` has shape (series, rows, values) and is sorted along the last
+    axis; the result has shape (series, rows, len(q)).
+    """
+    position = q[None, :] * np.maximum(counts - 1, 0)[:, None]
+    lower = np.floor(position).astype(np.intp)
+    upper = np.ceil(position).astype(np.intp)
+    rows = np.arange(len(counts))[:, None]
+    low_values = ordered[:, rows, lower]
+    return low_values + (ordered[:, rows, upper] - low_values) * (position - lower)
+
+
+class ComparablesEngine:
+    """Finds comparable listings and prices properties against them."""
+
+    def __init__(
+        self,
+        neighbours: Optional[int] = None,
+        window: Optional[int] = None,
+        radius_km: Optional[float] = None,
+        min_comparables: int = 3,
+        merge_size: Optional[int] = None,
+    ) -> None:
+        """``neighbours`` (PRICING_NEIGHBOURS, 15) comparables are chosen from the
+        ``window`` (PRICING_WINDOW, 256) nearest listings of the same type within
+        ``radius_km`` (PRICING_RADIUS_KM, 3), or else from those closest in size.
+
+        New listings are merged into the sort order once ``merge_size``
+        (PRICING_MERGE_SIZE, 256) of them are pending, or by the next query."""
+        self.neighbours = neighbours or int(os.getenv("PRICING_NEIGHBOURS", "15"))
+        self.window = max(window or int(os.getenv("PRICING_WINDOW", "256")), self.neighbours)
+        self.radius_km = radius_km or float(os.getenv("PRICING_RADIUS_KM", "3"))
+        self.min_comparables = min_comparables
+        self.merge_size = merge_size or int(os.getenv("PRICING_MERGE_SIZE", "256"))
+        self._types: dict[str, int] = {}
+        self._type_names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._property_ids: list[Optional[str]] = []
+        # Columns by slot, and the slots sorted by (type, sqft); slots from
+        # len(self._keys) on are not merged into the sort order yet
+        self._data = {column: np.full(1024, np.nan) for column in _COLUMNS}
+        self._size = 0
+        self._keys = np.empty(0)
+        self._order = np.empty(0, dtype=np.int64)
+        self._grid = GridIndex()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, property_id: str, listing: dict) -> None:
+        """Add a generated listing (AIGeneratedProperty as dict)."""
+        self.add_many([(property_id, listing)])
+
+    def add_many(self, listings: Iterable[tuple[str, dict]]) -> None:
+        """Add several (property_id, listing) pairs; known ids are skipped."""
+        with self._lock:
+            rows = []
+            for property_id, listing in listings:
+                if property_id in self._ids or not listing.get("price"):
+                    continue
+                self._ids[property_id] = self._size + len(rows)
+                details = listing.get("details") or {}
+                coordinates = (listing.get("location") or {}).get("coordinates") or {}
+                rows.append(
+                    (
+                        listing["price"],
+                        details.get("sqft") or np.nan,
+                        details.get("bedrooms", np.nan),
+                        details.get("type"),
+                        coordinates.get("lat", np.nan),
+                        coordinates.get("lng", np.nan),
+                        property_id,
+                    )
+                )
+            if rows:
+                *columns, property_ids = zip(*rows)
+                self._insert(*columns, property_ids=property_ids)
+
+    def add_arrays(
+        self,
+        price: Sequence[float],
+        sqft: Sequence[float],
+        bedrooms: Sequence[float],
+        types: Sequence[str],
+        lat: Sequence[float],
+        lng: Sequence[float],
+    ) -> None:
+        """Add listings given as columns (bulk imports and benchmarks)."""
+        with self._lock:
+            self._insert(price, sqft, bedrooms, types, lat, lng)
+
+    def _insert(
+        self, price, sqft, bedrooms, types, lat, lng, property_ids=None
+    ) -> None:
+        new = {
+            "type": self._type_codes(types, create=True),
+            "price": np.asarray(price, dtype=np.float64),
+            "sqft": np.asarray(sqft, dtype=np.float64),
+            "bedrooms": np.asarray(bedrooms, dtype=np.float64),
+            "lat": np.asarray(lat, dtype=np.float64),
+            "lng": np.asarray(lng, dtype=np.float64),
+        }
+        count = len(new["price"])
+        slots = np.arange(self._size, self._size + count)
+        self._grow(self._size + count)
+        for column in _COLUMNS:
+            self._data[column][slots] = new[column]
+        self._property_ids.extend(property_ids or [None] * count)
+        self._size += count
+        self._grid.add_many(slots, new["lat"], new["lng"], new["type"].astype(np.int64))
+        # Merging copies the whole sort order (~2.4 ms at 1M listings), so
+        # listings added one at a time are merged in batches
+        if self._size - len(self._keys) >= self.merge_size:
+            self._merge()
+
+    def _merge(self) -> None:
+        """Merge the listings added since the last merge into the sort order."""
+        count = self._size - len(self._keys)
+        if not count:
+            return
+        if count * 64 < len(self._keys):
+            # A few listings: insert at their sorted positions
+            slots = np.arange(len(self._keys), self._size)
+            keys = self._sort_keys(slots)
+            order = np.argsort(keys, kind="stable")
+            positions = np.searchsorted(self._keys, keys[order])
+            self._keys = np.insert(self._keys, positions, keys[order])
+            self._order = np.insert(self._order, positions, slots[order])
+        else:
+            all_slots = np.arange(self._size)
+            keys = self._sort_keys(all_slots)
+            self._order = np.argsort(keys, kind="stable")
+            self._keys = keys[self._order]
+
+    def _sort_keys(self, slots: np.ndarray) -> np.ndarray:
+        sqft = np.nan_to_num(self._data["sqft"][slots])
+        return self._data["type"][slots] * KEY_SCALE + np.clip(sqft, 0, KEY_SCALE - 1)
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self._data["price"])
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for column, values in self._data.items():
+            grown = np.full(capacity, np.nan)
+            grown[: len(values)] = values
+            self._data[column] = grown
+
+    def _type_codes(self, types: Sequence[str], create: bool = False) -> np.ndarray:
+        """Type codes per listing; unknown types are -1 unless ``create``."""
+        names, inverse = np.unique(
+            np.array([_normalize_type(t) for t in types], dtype=str), return_inverse=True
+        )
+        codes = []
+        for name in names:
+            code = self._types.get(name)
+            if code is None and create:
+                code = self._types[name] = len(self._types)
+                self._type_names.append(name)
+            codes.append(-1 if code is None else code)
+        return np.array(codes, dtype=np.float64)[inverse.reshape(-1)]
+
+    def nearby(
+        self, lat: float, lng: float, radius_km: float = 1.0, limit: int = 10
+    ) -> tuple[list[dict], int]:
+        """The ``limit`` nearest listings within ``radius_km`` and how many there are."""
+        with self._lock:
+            slots, distances = self._grid.within(lat, lng, radius_km)
+            return [
+                {
+                    "property_id": self._property_ids[slot],
+                    "type": self._type_names[int(self._data["type"][slot])],
+                    "price": float(self._data["price"][slot]),
+                    "sqft": float(self._data["sqft"][slot]),
+                    "bedrooms": float(self._data["bedrooms"][slot]),
+                    "distance_km": float(distance),
+                }
+                for slot, distance in zip(slots[:limit].tolist(), distances[:limit].tolist())
+            ], len(slots)
+
+    def price_many(
+        self,
+        proposed_price: Sequence[float],
+        sqft: Sequence[float],
+        bedrooms: Sequence[float],
+        types: Sequence[str],
+        lat: Optional[Sequence[float]] = None,
+        lng: Optional[Sequence[float]] = None,
+    ) -> dict[str, np.ndarray]:
+        """Price a batch of properties against their comparables.
+
+        Returns columns: sample_size, avg_price, min_price, max_price,
+        p25_price, median_price, p75_price, estimated_price,
+        price_difference_percentage, price_percentile, market_position and
+        confidence. Statistics are NaN where no comparable was found.
+        """
+        proposed_price = np.asarray(proposed_price, dtype=np.float64)
+        if not len(proposed_price):
+            return {}
+        sqft = np.maximum(np.asarray(sqft, dtype=np.float64), 1)
+        bedrooms = np.asarray(bedrooms, dtype=np.float64)
+        with self._lock:
+            self._merge()
+            return self._price_many(proposed_price, sqft, bedrooms, types, lat, lng)
+
+    def _price_many(self, proposed_price, sqft, bedrooms, types, lat, lng) -> dict:
+        data = self._data
+        size = self._size
+        width = min(self.window, max(size, 1))
+        neighbours = min(self.neighbours, width)
+        codes = self._type_codes(types)
+
+        # Window of listings with the same type and the closest sqft
+        base = codes * KEY_SCALE
+        keys = self._keys
+        low = np.searchsorted(keys, base)
+        high = np.where(base < 0, low, np.searchsorted(keys, base + KEY_SCALE))
+        position = np.searchsorted(keys, base + np.minimum(sqft, KEY_SCALE - 1))
+        start = np.clip(position - width // 2, low, np.maximum(low, high - width))
+        window = start[:, None] + np.arange(width)
+        valid = window < high[:, None]
+        index = self._order[np.minimum(window, size - 1)] if size else np.zeros_like(window)
+
+        if lat is not None and lng is not None:
+            lat = np.asarray(lat, dtype=np.float64)
+            lng = np.asarray(lng, dtype=np.float64)
+            # Prefer the nearest listings of the same type, if there are enough
+            for row in np.flatnonzero((codes >= 0) & ~np.isnan(lat) & ~np.isnan(lng)):
+                slots, _ = self._grid.nearest(
+                    lat[row], lng[row], width, group=int(codes[row]), max_radius_km=self.radius_km
+                )
+                if len(slots) >= self.min_comparables:
+                    index[row, : len(slots)] = slots
+                    valid[row] = np.arange(width) < len(slots)
+
+        distance = (np.log(np.maximum(data["sqft"][index], 1) / sqft[:, None]) / SQFT_SCALE) ** 2
+        # Comparables without bedrooms or coordinates count as one unit away
+        term = ((data["bedrooms"][index] - bedrooms[:, None]) / BEDROOM_SCALE) ** 2
+        distance += np.where(np.isnan(term), 1.0, term)
+        if lat is not None and lng is not None:
+            # Equirectangular approximation, exact enough within a city
+            north_km = (data["lat"][index] - lat[:, None]) * KM_PER_DEGREE
+            east_km = (data["lng"][index] - lng[:, None]) * (
+                KM_PER_DEGREE * np.cos(np.radians(lat))
+            )[:, None]
+            term = (north_km**2 + east_km**2) / DISTANCE_SCALE_KM**2
+            distance += np.where(np.isnan(term), 1.0, term)
+        distance[~valid] = np.inf
+
+        rows = np.arange(len(sqft))[:, None]
+        nearest = np.argpartition(distance, neighbours - 1, axis=1)[:, :neighbours]
+        chosen = index[rows, nearest]
+        found = distance[rows, nearest] < np.inf
+        counts = found.sum(axis=1)
+
+        # Prices and prices per sqft of the comparables; sorting puts the NaNs
+        # of missing comparables at the end of each row
+        price = data["price"][chosen]
+        values = np.where(found, np.stack((price, price / data["sqft"][chosen])), np.nan)
+        values.sort(axis=2)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # min, p25, median, p75 and max of both
+            quantiles = _percentiles(values, counts, np.array([0, 0.25, 0.5, 0.75, 1]))
+            quantiles[:, counts == 0] = np.nan
+            min_price, p25, median, p75, max_price = np.moveaxis(quantiles[0], 1, 0)
+            _, per_sqft_p25, per_sqft_median, per_sqft_p75, _ = np.moveaxis(quantiles[1], 1, 0)
+            avg_price = np.nansum(values[0], axis=1) / counts
+
+            # Compare on price per sqft, so smaller and larger comparables still count
+            estimated = per_sqft_median * sqft
+            difference = (proposed_price - estimated) / estimated * 100
+            percentile = (values[0] <= proposed_price[:, None]).sum(axis=1) / counts * 100
+            dispersion = (per_sqft_p75 - per_sqft_p25) / per_sqft_median
+            dispersion = np.where(np.isnan(dispersion), 1.0, np.clip(dispersion, 0, 1))
+            confidence = 0.5 + 0.45 * (counts / self.neighbours) * (1 - dispersion)
+
+        market_position = np.select(
+            [difference < BELOW_MARKET_PERCENT, difference > ABOVE_MARKET_PERCENT],
+            ["below_market", "above_market"],
+            "competitive",
+        )
+        return {
+            "sample_size": counts,
+            "avg_price": avg_price,
+            "min_price": min_price,
+            "max_price": max_price,
+            "p25_price": p25,
+            "median_price": median,
+            "p75_price": p75,
+            "estimated_price": estimated,
+            "price_difference_percentage": difference,
+            "price_percentile": percentile,
+            "market_position": market_position,
+            "confidence": np.round(confidence, 2),
+        }
+
+    def price(
+        self,
+        proposed_price: float,
+        sqft: float,
+        bedrooms: float,
+        property_type: str,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+    ) -> dict:
+        """Price one property; see price_many. Missing statistics are None."""
+        columns = self.price_many(
+            [proposed_price],
+            [sqft],
+            [bedrooms],
+            [property_type],
+            None if lat is None else [lat],
+            None if lng is None else [lng],
+        )
+        result = {}
+        for name, values in columns.items():
+            value = values[0].item()
+            if isinstance(value, float) and math.isnan(value):
+                value = None
+            elif name.endswith("_price"):
+                value = round(value)
+            result[name] = value
+        return result
+
+
+pricing_engine = ComparablesEngine()
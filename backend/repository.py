@@ -0,0 +1,472 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Storage of property upload records.
+
+The endpoints used to keep uploads in a module-level dict, which was lost on
+restart and could not be shared between uvicorn workers. Records now go
+through a repository: in memory for development, or SQLite (PROPERTY_STORE=sqlite)
+so that several workers serve the same data. Both keep indexes on status and
+uploaded_at, so list queries don't scan every record.
+"""
+
+import bisect
+import copy
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+
+def property_status(record: dict) -> str:
+    """Overall status: uploaded, queued, running, processed, failed or cancelled."""
+    if record["processed"]:
+        return "processed"
+    job = record.get("job")
+    return job["state"] if job else "uploaded"
+
+
+class PropertyRepository(ABC):
+    """Stores property records (plain dicts keyed by their "id")."""
+
+    # Whether other processes may write to the same records
+    shared = False
+
+    @abstractmethod
+    def add(self, record: dict) -> None:
+        """Store a new record."""
+
+    def add_many(self, records: Iterable[dict]) -> None:
+        """Store several new records (e.g. an import)."""
+        for record in records:
+            self.add(record)
+
+    @abstractmethod
+    def get(self, property_id: str) -> Optional[dict]:
+        """Return a copy of a record or None."""
+
+    @abstractmethod
+    def update(self, property_id: str, **changes) -> Optional[dict]:
+        """Merge ``changes`` into a record and return the updated copy (None if missing)."""
+
+    @abstractmethod
+    def list_summaries(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        """Return property_id, status and uploaded_at of matching records.
+
+        Records are ordered by (uploaded_at, id). ``uploaded_from`` is inclusive,
+        ``uploaded_before`` exclusive. ``after`` is the (uploaded_at, id) key of
+        the last record of the previous page (keyset pagination).
+        """
+
+    @abstractmethod
+    def count(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+    ) -> int:
+        """Return the number of records matching the filters of list_summaries."""
+
+    @abstractmethod
+    def version(self) -> str:
+        """Return a token that changes whenever any record changes."""
+
+    @abstractmethod
+    def changes_since(
+        self, version: Optional[str], status: Optional[str] = None
+    ) -> tuple[list[dict], str]:
+        """Return the records (with the given status) written after ``version``.
+
+        ``version`` is a token of version(); None returns every record. The
+        second value is the version to pass next time.
+        """
+
+    def close(self) -> None:
+        """Release resources held by the repository."""
+
+
+class InMemoryPropertyRepository(PropertyRepository):
+    """Process-local repository with status and uploaded_at indexes."""
+
+    def __init__(self) -> None:
+        self._records: dict[str, dict] = {}
+        # Sorted (uploaded_at, id) keys, overall and per status
+        self._by_uploaded_at: list[tuple[str, str]] = []
+        self._by_status: dict[str, list[tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        # Unique per process, so versions of different workers never collide
+        self._instance = uuid.uuid4().hex[:8]
+        self._version = 0
+        # Version of the last write per record
+        self._changed: dict[str, int] = {}
+
+    def add(self, record: dict) -> None:
+        record = copy.deepcopy(record)
+        record["status"] = property_status(record)
+        key = (record["uploaded_at"], record["id"])
+        with self._lock:
+            if record["id"] in self._records:
+                raise ValueError(f"Property {record['id']} already exists.")
+            self._records[record["id"]] = record
+            bisect.insort(self._by_uploaded_at, key)
+            bisect.insort(self._by_status.setdefault(record["status"], []), key)
+            self._version += 1
+            self._changed[record["id"]] = self._version
+
+    def get(self, property_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get(property_id)
+            return copy.deepcopy(record) if record is not None else None
+
+    def update(self, property_id: str, **changes) -> Optional[dict]:
+        with self._lock:
+            record = self._records.get(property_id)
+            if record is None:
+                return None
+            old_status = record["status"]
+            record.update(copy.deepcopy(changes))
+            record["status"] = property_status(record)
+            if record["status"] != old_status:
+                key = (record["uploaded_at"], property_id)
+                index = self._by_status[old_status]
+                del index[bisect.bisect_left(index, key)]
+                bisect.insort(self._by_status.setdefault(record["status"], []), key)
+            self._version += 1
+            self._changed[property_id] = self._version
+            return copy.deepcopy(record)
+
+    def list_summaries(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        with self._lock:
+            index = (
+                self._by_uploaded_at
+                if status is None
+                else self._by_status.get(status, [])
+            )
+            start, end = self._bounds(index, uploaded_from, uploaded_before)
+            if after is not None:
+                if descending:
+                    end = min(end, bisect.bisect_left(index, after))
+                else:
+                    start = max(start, bisect.bisect_right(index, after))
+            if limit is not None:
+                if descending:
+                    start = max(start, end - limit)
+                else:
+                    end = min(end, start + limit)
+
+            keys = index[start:end]
+            if descending:
+                keys.reverse()
+            return [self._summary(self._records[pid]) for _, pid in keys]
+
+    def count(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+    ) -> int:
+        with self._lock:
+            index = (
+                self._by_uploaded_at
+                if status is None
+                else self._by_status.get(status, [])
+            )
+            start, end = self._bounds(index, uploaded_from, uploaded_before)
+            return max(end - start, 0)
+
+    @staticmethod
+    def _bounds(
+        index: list[tuple[str, str]],
+        uploaded_from: Optional[str],
+        uploaded_before: Optional[str],
+    ) -> tuple[int, int]:
+        """Slice of a sorted (uploaded_at, id) index within the uploaded_at range."""
+        start = 0
+        end = len(index)
+        if uploaded_from is not None:
+            start = bisect.bisect_left(index, (uploaded_from, ""))
+        if uploaded_before is not None:
+            end = bisect.bisect_left(index, (uploaded_before, ""))
+        return start, end
+
+    def version(self) -> str:
+        return f"{self._instance}-{self._version}"
+
+    def changes_since(
+        self, version: Optional[str], status: Optional[str] = None
+    ) -> tuple[list[dict], str]:
+        instance, _, number = (version or "").rpartition("-")
+        since = int(number) if instance == self._instance else 0
+        with self._lock:
+            records = [
+                copy.deepcopy(self._records[pid])
+                for pid, changed in self._changed.items()
+                if changed > since
+                and (status is None or self._records[pid]["status"] == status)
+            ]
+            return records, self.version()
+
+    @staticmethod
+    def _summary(record: dict) -> dict:
+        return {
+            "property_id": record["id"],
+            "status": record["status"],
+            "uploaded_at": record["uploaded_at"],
+        }
+
+
+class SQLitePropertyRepository(PropertyRepository):
+    """SQLite repository; safe to share between threads and worker processes."""
+
+    shared = True
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(
+            """
+            BEGIN;
+            CREATE TABLE IF NOT EXISTS properties (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                uploaded_at TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_properties_status
+                ON properties (status, uploaded_at, id);
+            CREATE INDEX IF NOT EXISTS idx_properties_uploaded_at
+                ON properties (uploaded_at, id);
+            -- Bumped in the same transaction as every write, for ETags
+            CREATE TABLE IF NOT EXISTS repository_version (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                version INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO repository_version (id, version) VALUES (0, 0);
+            COMMIT;
+            """
+        )
+        self._add_changed_version_column()
+
+    def _add_changed_version_column(self) -> None:
+        """Version of the last write per row, for changes_since() (added to older databases)."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(properties)")]
+            if "changed_version" not in columns:
+                connection.execute(
+                    "ALTER TABLE properties ADD COLUMN changed_version INTEGER NOT NULL DEFAULT 0"
+                )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_properties_changed_version"
+                " ON properties (changed_version)"
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not thread-safe)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def add(self, record: dict) -> None:
+        self.add_many([record])
+
+    def add_many(self, records: Iterable[dict]) -> None:
+        rows = []
+        for record in records:
+            record = dict(record, status=property_status(record))
+            rows.append(
+                (record["id"], record["status"], record["uploaded_at"], json.dumps(record))
+            )
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._bump_version(connection)
+            connection.executemany(
+                "INSERT INTO properties (id, status, uploaded_at, data, changed_version)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [row + (version,) for row in rows],
+            )
+            connection.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            connection.execute("ROLLBACK")
+            raise ValueError("Property already exists.")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get(self, property_id: str) -> Optional[dict]:
+        row = (
+            self._connection()
+            .execute("SELECT data FROM properties WHERE id = ?", (property_id,))
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def update(self, property_id: str, **changes) -> Optional[dict]:
+        connection = self._connection()
+        # IMMEDIATE takes the write lock up front, so concurrent read-modify-write
+        # cycles from other workers cannot interleave
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT data FROM properties WHERE id = ?", (property_id,)
+            ).fetchone()
+            if row is None:
+                connection.execute("ROLLBACK")
+                return None
+            record = json.loads(row[0])
+            record.update(changes)
+            record["status"] = property_status(record)
+            version = self._bump_version(connection)
+            connection.execute(
+                "UPDATE properties SET status = ?, data = ?, changed_version = ? WHERE id = ?",
+                (record["status"], json.dumps(record), version, property_id),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return record
+
+    def list_summaries(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        after: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        conditions, params = self._filters(status, uploaded_from, uploaded_before)
+        if after is not None:
+            conditions.append(f"(uploaded_at, id) {'<' if descending else '>'} (?, ?)")
+            params += list(after)
+
+        query = "SELECT id, status, uploaded_at FROM properties"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        direction = "DESC" if descending else "ASC"
+        query += f" ORDER BY uploaded_at {direction}, id {direction} LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        return [
+            {"property_id": pid, "status": status, "uploaded_at": uploaded_at}
+            for pid, status, uploaded_at in self._connection().execute(query, params)
+        ]
+
+    def count(
+        self,
+        status: Optional[str] = None,
+        uploaded_from: Optional[str] = None,
+        uploaded_before: Optional[str] = None,
+    ) -> int:
+        conditions, params = self._filters(status, uploaded_from, uploaded_before)
+        query = "SELECT COUNT(*) FROM properties"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return self._connection().execute(query, params).fetchone()[0]
+
+    @staticmethod
+    def _filters(
+        status: Optional[str],
+        uploaded_from: Optional[str],
+        uploaded_before: Optional[str],
+    ) -> tuple[list[str], list]:
+        """WHERE conditions and their parameters for the list_summaries filters."""
+        conditions = []
+        params: list = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if uploaded_from is not None:
+            conditions.append("uploaded_at >= ?")
+            params.append(uploaded_from)
+        if uploaded_before is not None:
+            conditions.append("uploaded_at < ?")
+            params.append(uploaded_before)
+        return conditions, params
+
+    def version(self) -> str:
+        row = (
+            self._connection()
+            .execute("SELECT version FROM repository_version WHERE id = 0")
+            .fetchone()
+        )
+        return str(row[0])
+
+    def changes_since(
+        self, version: Optional[str], status: Optional[str] = None
+    ) -> tuple[list[dict], str]:
+        connection = self._connection()
+        # One read transaction, so the version matches the rows returned
+        connection.execute("BEGIN")
+        try:
+            query = "SELECT data FROM properties WHERE changed_version > ?"
+            # Rows of databases created before changed_version existed have 0
+            params: list = [int(version) if version else -1]
+            if status is not None:
+                query += " AND status = ?"
+                params.append(status)
+            records = [json.loads(row[0]) for row in connection.execute(query, params)]
+            current = connection.execute(
+                "SELECT version FROM repository_version WHERE id = 0"
+            ).fetchone()[0]
+        finally:
+            connection.execute("COMMIT")
+        return records, str(current)
+
+    @staticmethod
+    def _bump_version(connection: sqlite3.Connection) -> int:
+        """Increment the version inside the caller's transaction and return it."""
+        connection.execute("UPDATE repository_version SET version = version + 1 WHERE id = 0")
+        return connection.execute(
+            "SELECT version FROM repository_version WHERE id = 0"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def create_repository() -> PropertyRepository:
+    """Create the repository selected by PROPERTY_STORE ("memory" or "sqlite").
+
+    The SQLite database lives at PROPERTY_DB_PATH (default "properties.db").
+    """
+    store = os.getenv("PROPERTY_STORE", "memory")
+    if store == "sqlite":
+        return SQLitePropertyRepository(os.getenv("PROPERTY_DB_PATH", "properties.db"))
+    if store == "memory":
+        return InMemoryPropertyRepository()
+    raise ValueError(f"Unknown PROPERTY_STORE: {store}.")
+
+
+property_repository = create_repository()
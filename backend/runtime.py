@@ -0,0 +1,210 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Long-lived agent runtime shared by all orchestrations of the process.
+
+Starting and stopping an InProcessRuntime per request costs a background task,
+a fresh message queue and a drain on every /prompt/ call. The RuntimeManager
+starts one runtime in the FastAPI lifespan, runs many orchestrations on it
+with a bounded concurrency limit and a timeout per orchestration, and drains
+them gracefully on shutdown. With ``shared=False`` (or
+ORCHESTRATION_SHARED_RUNTIME=0) every orchestration gets its own runtime
+instead, e.g. to compare both in backend.benchmarks.bench_runtime.
+"""
+
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+from opentelemetry import trace
+from semantic_kernel.agents.orchestration.orchestration_base import OrchestrationBase
+from semantic_kernel.agents.runtime import InProcessRuntime
+from semantic_kernel.agents.runtime.in_process.runtime_impl_helpers import (
+    SubscriptionManager,
+)
+
+
+class _ScopedSubscriptionManager(SubscriptionManager):
+    """Subscription manager that only updates the topics a new subscription matches.
+
+    The stock manager rebuilds the recipients of every topic it has seen on each
+    added subscription, which is fine for a runtime per request but becomes the
+    bottleneck once many orchestrations share one runtime.
+    """
+
+    async def add_subscription(self, subscription) -> None:
+        # No duplicate scan: orchestration subscriptions are scoped to a topic type
+        # that is unique per invocation, and the scan dominates with many in flight
+        self._subscriptions.append(subscription)
+        for topic in self._seen_topics:
+            if subscription.is_match(topic):
+                self._subscribed_recipients[topic].append(
+                    subscription.map_to_agent(topic)
+                )
+
+    def release(self, internal_topic_type: str) -> None:
+        """Drop the topics and subscriptions of a finished orchestration."""
+        for topic in [t for t in self._seen_topics if internal_topic_type in t.type]:
+            self._seen_topics.discard(topic)
+            self._subscribed_recipients.pop(topic, None)
+        self._subscriptions = [
+            s
+            for s in self._subscriptions
+            if internal_topic_type not in getattr(s, "topic_type", "")
+            and internal_topic_type not in s.agent_type
+        ]
+
+
+def _new_runtime() -> InProcessRuntime:
+    # Message delivery spans of the runtime would be separate traces per
+    # message; backend.telemetry traces the orchestration steps instead
+    runtime = InProcessRuntime(tracer_provider=trace.NoOpTracerProvider())
+    runtime._subscription_manager = _ScopedSubscriptionManager()
+    runtime.start()
+    return runtime
+
+
+class RuntimeManager:
+    """Runs orchestrations with a concurrency limit and a timeout."""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        shared: Optional[bool] = None,
+    ) -> None:
+        """Initialize the manager.
+
+        Defaults come from ORCHESTRATION_MAX_CONCURRENCY (16),
+        ORCHESTRATION_TIMEOUT (300 seconds per orchestration) and
+        ORCHESTRATION_SHARED_RUNTIME (1).
+        """
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("ORCHESTRATION_MAX_CONCURRENCY", "16")
+        )
+        self.timeout = timeout or float(os.getenv("ORCHESTRATION_TIMEOUT", "300"))
+        self.shared = (
+            os.getenv("ORCHESTRATION_SHARED_RUNTIME", "1") != "0" if shared is None else shared
+        )
+        self._runtime: Optional[InProcessRuntime] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._draining = False
+
+    @property
+    def started(self) -> bool:
+        """Whether the manager accepts orchestrations."""
+        return self._semaphore is not None
+
+    @property
+    def in_flight(self) -> int:
+        """Number of orchestrations currently running or waiting for a slot."""
+        return self._in_flight
+
+    async def start(self) -> None:
+        """Start accepting orchestrations (and the shared runtime)."""
+        if self._semaphore is not None:
+            raise RuntimeError("Runtime manager is already started.")
+        self._draining = False
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.shared:
+            self._runtime = _new_runtime()
+
+    async def stop(self, timeout: Optional[float] = 30.0) -> None:
+        """Stop accepting orchestrations, wait for running ones and stop the runtime.
+
+        Orchestrations still running after ``timeout`` seconds are abandoned and
+        the shared runtime is stopped immediately.
+        """
+        if self._semaphore is None:
+            return
+        self._draining = True
+        runtime = self._runtime
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            if runtime is not None:
+                await runtime.stop()
+        else:
+            if runtime is not None:
+                await runtime.stop_when_idle()
+        finally:
+            self._runtime = None
+            self._semaphore = None
+
+    async def run(self, orchestration: OrchestrationBase, task: Any) -> Any:
+        """Invoke an orchestration and return its result.
+
+        The result is awaited with the manager's timeout and the invocation is
+        cancelled on expiry. Failing agents and managers must report their error
+        through the orchestration result (see PropertyGroupChatOrchestration),
+        because the runtime only logs exceptions of message handlers.
+        """
+        async with self.slot():
+            runtime = self._runtime or _new_runtime()
+            try:
+                orchestration_result = await orchestration.invoke(
+                    task=task, runtime=runtime
+                )
+                try:
+                    return await orchestration_result.get(timeout=self.timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    # Also stop the group chat when the caller goes away
+                    # (e.g. a closed streaming connection)
+                    if not orchestration_result.event.is_set():
+                        orchestration_result.cancel()
+                    raise
+            finally:
+                if runtime is self._runtime:
+                    topic = getattr(orchestration, "internal_topic_type", None)
+                    if topic is not None:
+                        self._release(runtime, topic)
+                else:
+                    # Handlers still running (e.g. after a timeout) are abandoned
+                    await runtime.stop()
+
+    @staticmethod
+    def _release(runtime: InProcessRuntime, internal_topic_type: str) -> None:
+        """Forget the actors and subscriptions of a finished orchestration.
+
+        Every invocation registers its actors under a unique topic type; without
+        this the long-lived runtime would keep them (and their chat histories)
+        forever. The runtime has no public API to unregister agent types, so
+        this is the one place that touches its internals.
+        """
+        runtime._subscription_manager.release(internal_topic_type)
+        for agent_type in [t for t in runtime._agent_factories if internal_topic_type in t]:
+            del runtime._agent_factories[agent_type]
+        for agent_id in [
+            a for a in runtime._instantiated_agents if internal_topic_type in a.type
+        ]:
+            del runtime._instantiated_agents[agent_id]
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the ``max_concurrency`` slots (counted as in flight)."""
+        if self._semaphore is None or self._draining:
+            raise RuntimeError("Runtime manager is not accepting orchestrations.")
+        semaphore = self._semaphore
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.set()
+
+    async def __aenter__(self) -> "RuntimeManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+
+runtime_manager = RuntimeManager()
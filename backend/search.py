@@ -0,0 +1,237 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""In-process search index over generated property listings.
+
+Every listing gets an integer slot. An inverted index maps the words of
+title, features and description to the slots containing them (weighted by
+field), and price, sqft, bedrooms and pricePerSqft are kept as NumPy columns
+indexed by slot. Queries intersect sorted posting arrays, filter the columns
+with vectorised comparisons and pick the requested page with argpartition,
+so even broad queries avoid per-listing Python work.
+
+The index lives in each worker process. With a repository shared by several
+workers (SQLite), main.py indexes the listings of the other workers from the
+repository's changes every INDEX_SYNC_INTERVAL_SECONDS; the pricing index in
+backend.pricing is kept up to date the same way.
+"""
+
+import re
+import threading
+from typing import Optional
+
+import numpy as np
+
+RANGE_FIELDS = ("price", "sqft", "bedrooms", "pricePerSqft")
+
+# Weight of a word by the field it appears in
+FIELD_WEIGHTS = {"title": 3, "features": 2, "description": 1}
+
+SORT_ORDERS = ("relevance", "price_asc", "price_desc")
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased words of at least two characters."""
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1]
+
+
+def _range_values(listing: dict) -> dict:
+    details = listing.get("details") or {}
+    return {
+        "price": listing.get("price"),
+        "sqft": details.get("sqft"),
+        "bedrooms": details.get("bedrooms"),
+        "pricePerSqft": listing.get("pricePerSqft"),
+    }
+
+
+class PropertySearchIndex:
+    """Inverted index plus numeric columns, updated one listing at a time."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._slots: dict[str, int] = {}
+        self._listings: list[Optional[dict]] = []
+        self._terms: list[dict[str, int]] = []
+        # Slot -> weight per token, plus (slots, weights) arrays built on demand
+        self._postings: dict[str, dict[int, int]] = {}
+        self._posting_arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        # Missing values are NaN, which fails every range comparison
+        self._columns = {
+            field: np.full(capacity, np.nan) for field in RANGE_FIELDS
+        }
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, property_id: str, listing: dict) -> None:
+        """Index a generated listing, replacing a previous version."""
+        terms: dict[str, int] = {}
+        texts = {
+            "title": listing.get("title") or "",
+            "features": " ".join(listing.get("features") or []),
+            "description": listing.get("description") or "",
+        }
+        for field, text in texts.items():
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0) + FIELD_WEIGHTS[field]
+        values = _range_values(listing)
+
+        with self._lock:
+            slot = self._slots.get(property_id)
+            if slot is None:
+                slot = len(self._listings)
+                self._slots[property_id] = slot
+                self._listings.append(None)
+                self._terms.append({})
+                self._grow(slot + 1)
+            else:
+                self._drop_terms(slot)
+
+            self._listings[slot] = listing
+            self._terms[slot] = terms
+            for token, weight in terms.items():
+                self._postings.setdefault(token, {})[slot] = weight
+                self._posting_arrays.pop(token, None)
+            for field, value in values.items():
+                self._columns[field][slot] = np.nan if value is None else value
+            self._alive[slot] = True
+
+    def remove(self, property_id: str) -> None:
+        """Drop a listing from the index (its slot stays unused)."""
+        with self._lock:
+            slot = self._slots.pop(property_id, None)
+            if slot is None:
+                return
+            self._drop_terms(slot)
+            self._listings[slot] = None
+            self._terms[slot] = {}
+            for column in self._columns.values():
+                column[slot] = np.nan
+            self._alive[slot] = False
+
+    def _drop_terms(self, slot: int) -> None:
+        for token in self._terms[slot]:
+            postings = self._postings[token]
+            del postings[slot]
+            self._posting_arrays.pop(token, None)
+            if not postings:
+                del self._postings[token]
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for field, column in self._columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[: len(column)] = column
+            self._columns[field] = grown
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(self._alive)] = self._alive
+        self._alive = alive
+
+    def _posting_array(self, token: str) -> tuple[np.ndarray, np.ndarray]:
+        """Sorted slots and weights of a token (cached until the token changes)."""
+        arrays = self._posting_arrays.get(token)
+        if arrays is None:
+            postings = self._postings.get(token, {})
+            slots = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            weights = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            order = np.argsort(slots)
+            arrays = self._posting_arrays[token] = (slots[order], weights[order])
+        return arrays
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        ranges: Optional[dict[str, tuple[Optional[float], Optional[float]]]] = None,
+        sort: str = "relevance",
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[list[dict], int]:
+        """Return a page of matching listings and the total number of matches.
+
+        All query words must match. ``ranges`` maps fields of RANGE_FIELDS to
+        inclusive (min, max) bounds, either of which may be None. ``sort`` is
+        "relevance", "price_asc" or "price_desc".
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort}.")
+        ranges = {
+            field: bounds
+            for field, bounds in (ranges or {}).items()
+            if bounds[0] is not None or bounds[1] is not None
+        }
+        for field in ranges:
+            if field not in RANGE_FIELDS:
+                raise ValueError(f"Unknown range field: {field}.")
+        tokens = list(dict.fromkeys(tokenize(query or "")))
+
+        with self._lock:
+            slots, scores = self._match_tokens(tokens)
+            if ranges:
+                size = len(self._listings)
+                mask = None
+                for field, (low, high) in ranges.items():
+                    column = self._columns[field][:size] if slots is None else (
+                        self._columns[field][slots]
+                    )
+                    condition = np.ones(len(column), dtype=bool)
+                    if low is not None:
+                        condition &= column >= low
+                    if high is not None:
+                        condition &= column <= high
+                    mask = condition if mask is None else mask & condition
+                if slots is None:
+                    slots = np.flatnonzero(mask & self._alive[:size])
+                else:
+                    slots, scores = slots[mask], scores[mask]
+            elif slots is None:
+                slots = np.flatnonzero(self._alive[: len(self._listings)])
+
+            total = len(slots)
+            if sort == "relevance" and tokens:
+                keys = -scores
+            else:
+                keys = np.nan_to_num(self._columns["price"][slots])
+                if sort == "price_desc":
+                    keys = -keys
+            page = self._top(slots, keys, offset + limit)[offset:]
+            return [self._listings[slot] for slot in page], total
+
+    def _match_tokens(
+        self, tokens: list[str]
+    ) -> tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Slots containing every token and their summed weights (None: no words)."""
+        if not tokens:
+            return None, None
+        arrays = sorted((self._posting_array(token) for token in tokens), key=lambda a: len(a[0]))
+        slots, scores = arrays[0]
+        for other_slots, other_weights in arrays[1:]:
+            if not len(slots):
+                break
+            positions = np.searchsorted(other_slots, slots)
+            positions[positions == len(other_slots)] = 0
+            found = other_slots[positions] == slots if len(other_slots) else np.zeros(
+                len(slots), dtype=bool
+            )
+            slots = slots[found]
+            scores = scores[found] + other_weights[positions[found]]
+        return slots, scores
+
+    @staticmethod
+    def _top(slots: np.ndarray, keys: np.ndarray, count: int) -> np.ndarray:
+        """The ``count`` slots with the smallest keys, ties broken by slot."""
+        if count < len(slots):
+            # Everything tied with the count-th key must compete for the page
+            threshold = np.partition(keys, count - 1)[count - 1]
+            candidates = keys <= threshold
+            slots, keys = slots[candidates], keys[candidates]
+        order = np.lexsort((slots, keys))[:count]
+        return slots[order]
+
+
+search_index = PropertySearchIndex()
@@ -0,0 +1,142 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Process-wide registry of pooled chat completion services.
+
+Every agent and group chat manager used to build its own AzureChatCompletion,
+which meant a fresh HTTP connection pool (and TLS handshake) per agent and per
+request. The registry hands out one service per deployment that all share a
+single keep-alive connection pool, and is closed from the FastAPI lifespan.
+"""
+
+import os
+from typing import Optional
+
+import httpx
+from azure.identity.aio import DefaultAzureCredential, get_bearer_token_provider
+from openai import AsyncAzureOpenAI
+from semantic_kernel.connectors.ai.chat_completion_client_base import (
+    ChatCompletionClientBase,
+)
+from semantic_kernel.connectors.ai.open_ai import (
+    AzureChatCompletion,
+    AzureOpenAISettings,
+)
+
+
+class ServiceRegistry:
+    """Hands out one pooled chat completion service per deployment."""
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        api_key: Optional[str] = None,
+        api_version: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+    ) -> None:
+        """Initialize the registry.
+
+        Unset values are read from the environment when the first service is
+        created, so a .env file loaded after import is still honoured.
+        """
+        self._endpoint = endpoint
+        self._api_key = api_key
+        self._api_version = api_version
+        self._max_connections = max_connections
+        self._max_keepalive_connections = max_keepalive_connections
+        self._keepalive_expiry = keepalive_expiry
+        self._default_deployment: Optional[str] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._credential: Optional[DefaultAzureCredential] = None
+        self._services: dict[str, ChatCompletionClientBase] = {}
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the shared connection pool, creating it on first use."""
+        if self._http_client is None or self._http_client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self._max_connections
+                or int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=self._max_keepalive_connections
+                or int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")),
+                keepalive_expiry=self._keepalive_expiry
+                or float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60")),
+            )
+            self._http_client = httpx.AsyncClient(
+                limits=limits, timeout=httpx.Timeout(600.0, connect=10.0)
+            )
+        return self._http_client
+
+    def _create_service(self, deployment_name: str) -> ChatCompletionClientBase:
+        """Create an AzureChatCompletion bound to the shared connection pool."""
+        settings = AzureOpenAISettings()
+        endpoint = self._endpoint or settings.endpoint or settings.base_url
+        if not endpoint:
+            raise RuntimeError(
+                "AZURE_OPENAI_ENDPOINT (or AZURE_OPENAI_BASE_URL) is not set."
+            )
+        client_args = {
+            "azure_endpoint": str(endpoint),
+            "azure_deployment": deployment_name,
+            "api_version": self._api_version or settings.api_version,
+            "http_client": self._get_http_client(),
+        }
+        api_key = self._api_key or (
+            settings.api_key.get_secret_value() if settings.api_key else None
+        )
+        if api_key:
+            client_args["api_key"] = api_key
+        else:
+            # The clients live as long as the process, so they need a provider
+            # that refreshes the Entra token instead of a single token
+            if self._credential is None:
+                self._credential = DefaultAzureCredential()
+            client_args["azure_ad_token_provider"] = get_bearer_token_provider(
+                self._credential, settings.token_endpoint
+            )
+
+        return AzureChatCompletion(
+            deployment_name=deployment_name,
+            async_client=AsyncAzureOpenAI(**client_args),
+        )
+
+    def get_chat_service(
+        self, deployment_name: Optional[str] = None
+    ) -> ChatCompletionClientBase:
+        """Return the shared service for a deployment (default: AZURE_OPENAI_CHAT_DEPLOYMENT_NAME)."""
+        if deployment_name is None:
+            # Parsing the settings is comparatively slow, so resolve the default once
+            if self._default_deployment is None:
+                self._default_deployment = AzureOpenAISettings().chat_deployment_name
+            deployment_name = self._default_deployment
+        if not deployment_name:
+            raise RuntimeError("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME is not set.")
+
+        if deployment_name not in self._services:
+            self._services[deployment_name] = self._create_service(deployment_name)
+        return self._services[deployment_name]
+
+    def register(
+        self, deployment_name: str, service: ChatCompletionClientBase
+    ) -> None:
+        """Use a custom service for a deployment (e.g. a fake for benchmarks)."""
+        self._services[deployment_name] = service
+
+    async def aclose(self) -> None:
+        """Close the shared connection pool and credential and forget all services."""
+        self._services.clear()
+        self._default_deployment = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self._credential is not None:
+            await self._credential.close()
+            self._credential = None
+
+
+registry = ServiceRegistry()
+
+
+def get_chat_service(deployment_name: Optional[str] = None) -> ChatCompletionClientBase:
+    """Return the process-wide pooled service for a deployment."""
+    return registry.get_chat_service(deployment_name)
@@ -0,0 +1,66 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Coalescing of concurrent identical requests ("single flight").
+
+When a seller double-submits or the frontend retries, the same /prompt/ input
+arrives while the first run is still going. Instead of a second knowledge and
+group chat run, later callers await the task of the first one and share its
+result (or its exception).
+"""
+
+import asyncio
+import hashlib
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from backend.models import Input
+
+
+def input_key(input: Input) -> str:
+    """Hash of everything that determines the result of a /prompt/ request."""
+    digest = hashlib.sha256()
+    digest.update(input.manager_mode.encode())
+    digest.update(b"\0" + input.expert_mode.encode())
+    digest.update(f"\0{input.max_rounds}".encode())
+    digest.update(b"\0" + input.prompt.encode())
+    for image in input.images:
+        digest.update(b"\0image:" + hashlib.sha256(image.encode()).digest())
+    for blob_id in input.image_ids:
+        digest.update(b"\0blob:" + blob_id.encode())
+    if input.coordinates is not None:
+        digest.update(f"\0at:{input.coordinates.lat},{input.coordinates.lng}".encode())
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one task per key; concurrent callers share its outcome."""
+
+    def __init__(self) -> None:
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of ``factory()``, joining a run in flight for ``key``."""
+        task = self._tasks.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A caller that goes away (client disconnect) must not cancel the run
+        # the other callers are waiting for
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Return the number of runs, coalesced callers and runs in flight."""
+        return {
+            "runs": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+        }
+
+
+prompt_flights = SingleFlight()
@@ -0,0 +1,141 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""OpenTelemetry tracing and metrics for the generation pipeline.
+
+Spans cover the /prompt/ run, every knowledge agent call, every manager
+decision and LLM call, every expert turn and filter_results, with token
+counts as ``gen_ai.usage.*`` attributes. Histograms record the duration of
+whole runs and of the individual steps.
+
+Nothing is exported unless TELEMETRY_EXPORTER is "console" (stdout) or "file"
+(one JSON document per line in TELEMETRY_FILE); without it the OpenTelemetry
+API stays a no-op. Semantic Kernel's own "invoke_agent" spans use the same
+provider once it is set up.
+"""
+
+import os
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO, Any, Optional
+
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    ConsoleMetricExporter,
+    PeriodicExportingMetricReader,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+SERVICE_NAME = "real-estate-ai-backend"
+
+INPUT_TOKENS = "gen_ai.usage.input_tokens"
+OUTPUT_TOKENS = "gen_ai.usage.output_tokens"
+
+tracer = trace.get_tracer("backend")
+meter = metrics.get_meter("backend")
+
+prompt_duration = meter.create_histogram(
+    "prompt.duration",
+    unit="s",
+    description="Knowledge generation plus group chat of one input",
+)
+knowledge_duration = meter.create_histogram(
+    "knowledge.agent.duration",
+    unit="s",
+    description="Knowledge agent call until answer or deadline",
+)
+manager_duration = meter.create_histogram(
+    "groupchat.manager.duration", unit="s", description="LLM call of the group chat manager"
+)
+turn_duration = meter.create_histogram(
+    "groupchat.turn.duration", unit="s", description="Expert turn from selection to answer"
+)
+
+_providers: Optional[tuple[TracerProvider, MeterProvider]] = None
+_output: Optional[IO] = None
+
+
+def usage_attributes(message: Any) -> dict:
+    """Token counts from the usage metadata of a chat message, if reported."""
+    usage = (getattr(message, "metadata", None) or {}).get("usage")
+    if usage is None:
+        return {}
+    return {
+        INPUT_TOKENS: usage.prompt_tokens or 0,
+        OUTPUT_TOKENS: usage.completion_tokens or 0,
+    }
+
+
+@contextmanager
+def prompt_span(endpoint: str, manager_mode: str) -> Iterator[trace.Span]:
+    """Span and duration histogram of one knowledge + group chat run."""
+    attributes = {"prompt.endpoint": endpoint, "groupchat.manager_mode": manager_mode}
+    start = time.perf_counter()
+    failed = True
+    try:
+        with tracer.start_as_current_span("prompt", attributes=attributes) as span:
+            yield span
+        failed = False
+    finally:
+        prompt_duration.record(
+            time.perf_counter() - start, {**attributes, "prompt.failed": failed}
+        )
+
+
+def setup_telemetry() -> None:
+    """Install the tracer and meter providers configured by the environment (once)."""
+    global _providers, _output
+    exporter = os.getenv("TELEMETRY_EXPORTER", "none")
+    if _providers is not None or exporter == "none":
+        return
+    if exporter == "console":
+        _output = sys.stdout
+    elif exporter == "file":
+        _output = open(
+            os.getenv("TELEMETRY_FILE", "telemetry.jsonl"), "a", encoding="utf-8"
+        )
+    else:
+        raise ValueError(f"Unknown TELEMETRY_EXPORTER: {exporter}.")
+
+    resource = Resource.create({"service.name": SERVICE_NAME})
+    tracer_provider = TracerProvider(resource=resource)
+    tracer_provider.add_span_processor(
+        BatchSpanProcessor(
+            ConsoleSpanExporter(
+                out=_output, formatter=lambda span: span.to_json(indent=None) + "\n"
+            )
+        )
+    )
+    meter_provider = MeterProvider(
+        resource=resource,
+        metric_readers=[
+            PeriodicExportingMetricReader(
+                ConsoleMetricExporter(
+                    out=_output,
+                    formatter=lambda data: data.to_json(indent=None) + "\n",
+                ),
+                export_interval_millis=1000
+                * float(os.getenv("TELEMETRY_METRICS_INTERVAL_SECONDS", "60")),
+            )
+        ],
+    )
+    # The module-level tracer and meter are proxies and pick these up
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(meter_provider)
+    _providers = (tracer_provider, meter_provider)
+
+
+def shutdown_telemetry() -> None:
+    """Flush pending spans and metrics and close the output file."""
+    global _output
+    if _providers is None:
+        return
+    for provider in _providers:
+        provider.shutdown()
+    if _output is not None and _output is not sys.stdout:
+        _output.close()
+    _output = None
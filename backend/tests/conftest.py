@@ -0,0 +1,36 @@
+"""Shared test setup: no Azure access, local data in a temporary directory.
+
+Run from the repository root: python -m pytest backend/tests
+"""
+
+import os
+import tempfile
+
+# Read when the backend modules are imported, so set them first
+os.environ.setdefault("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o")
+os.environ.setdefault("BLOB_STORE_DIR", tempfile.mkdtemp(prefix="blob_store_"))
+os.environ.setdefault("PROPERTY_STORE", "memory")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend.repository import InMemoryPropertyRepository  # noqa: E402
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    """A fresh in-memory repository used by the API."""
+    import backend.main
+
+    repository = InMemoryPropertyRepository()
+    monkeypatch.setattr(backend.main, "property_repository", repository)
+    return repository
+
+
+@pytest.fixture
+def client(repository):
+    """Test client of the API, with lifespan, on a fresh repository."""
+    from backend.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,168 @@
+import base64
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import WORKER_ID, _fail_orphaned_jobs, app
+from backend.tests.test_repository import make_record
+
+
+def test_orphaned_jobs_fail_on_startup(repository):
+    # pid 0 never belongs to a running worker
+    dead_worker = f"{WORKER_ID.rpartition(':')[0]}:0"
+    parent_worker = f"{WORKER_ID.rpartition(':')[0]}:{os.getppid()}"
+    repository.add(make_record(1, job={"state": "queued", "worker": dead_worker}))
+    repository.add(make_record(2, job={"state": "running", "worker": "other-host:1"}))
+    repository.add(make_record(3, job={"state": "running", "worker": parent_worker}))
+    repository.add(make_record(4, job={"state": "completed"}, processed=True))
+
+    assert _fail_orphaned_jobs() == 2
+
+    for property_id in ("property-0001", "property-0002"):
+        record = repository.get(property_id)
+        assert record["status"] == "failed"
+        assert record["job"]["error"] == "Interrupted by a server restart"
+    assert repository.get("property-0003")["status"] == "running"
+    assert repository.get("property-0004")["status"] == "processed"
+
+
+def test_orphaned_job_can_be_generated_again(repository):
+    repository.add(make_record(1, job={"state": "running", "worker": "crashed:1"}))
+
+    with TestClient(app) as client:
+        response = client.post("/api/property/generate/property-0001")
+    assert response.status_code == 202
+
+
+def _list(client, **params):
+    response = client.get("/api/property/list", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_list_cursor_round_trip(client, repository):
+    repository.add_many(make_record(i) for i in range(7))
+
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = _list(client, limit=3, **({"cursor": cursor} if cursor else {}))
+        ids += [summary["property_id"] for summary in page["properties"]]
+        assert page["total"] == 7
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert ids == [f"property-{i:04d}" for i in range(7)]
+
+    descending = _list(client, limit=4, order="desc")
+    rest = _list(client, limit=4, order="desc", cursor=descending["next_cursor"])
+    ids = [s["property_id"] for s in descending["properties"] + rest["properties"]]
+    assert ids == [f"property-{i:04d}" for i in reversed(range(7))]
+    assert rest["next_cursor"] is None
+
+
+def test_list_filters(client, repository):
+    repository.add_many(make_record(i) for i in range(6))
+    repository.update("property-0001", processed=True)
+    repository.update("property-0004", processed=True)
+
+    processed = _list(client, status="processed")
+    assert [s["property_id"] for s in processed["properties"]] == [
+        "property-0001",
+        "property-0004",
+    ]
+    assert processed["total"] == 2
+
+    window = _list(
+        client,
+        uploaded_from=make_record(2)["uploaded_at"],
+        uploaded_before=make_record(5)["uploaded_at"],
+    )
+    assert [s["property_id"] for s in window["properties"]] == [
+        "property-0002",
+        "property-0003",
+        "property-0004",
+    ]
+    assert window["total"] == 3
+
+    processed_window = _list(
+        client, status="processed", uploaded_from=make_record(2)["uploaded_at"]
+    )
+    assert processed_window["total"] == 1
+
+
+def test_list_etag(client, repository):
+    repository.add(make_record(1))
+
+    response = client.get("/api/property/list")
+    etag = response.headers["ETag"]
+    cached = client.get("/api/property/list", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # Other parameters are another page
+    other = client.get("/api/property/list?limit=1", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    repository.update("property-0001", description="Changed")
+    changed = client.get("/api/property/list", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        base64.urlsafe_b64encode(b"5").decode(),
+        base64.urlsafe_b64encode(b'"2025-07-01"').decode(),
+        base64.urlsafe_b64encode(b'["2025-07-01"]').decode(),
+        base64.urlsafe_b64encode(b'["2025-07-01", "a", "b"]').decode(),
+        base64.urlsafe_b64encode(b'{"a": 1, "b": 2}').decode(),
+        base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    ],
+)
+def test_list_invalid_cursor(client, cursor):
+    response = client.get("/api/property/list", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_batch_reports_invalid_uploads_per_item(client, repository):
+    image = "data:image/png;base64," + base64.b64encode(b"png").decode()
+    response = client.post(
+        "/prompt/batch",
+        json={
+            "items": [
+                {"images": [], "description": "Bright flat with a balcony"},
+                {"images": [image], "description": "Too short"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    errors = {line["index"]: line["error"] for line in lines[:-1]}
+    assert errors == {
+        0: "At least one image is required",
+        1: "Description must be at least 10 characters long",
+    }
+    assert all(line["status"] == "failed" for line in lines[:-1])
+    assert "property_id" not in lines[0] and "property_id" not in lines[1]
+    assert lines[-1]["summary"]["failed"] == 2
+    assert repository.count() == 0
+
+
+def test_prompt_rejects_images_that_are_not_base64(client):
+    image = base64.b64encode(b"png bytes").decode()
+    for bad in ("https://example.com/photos/front.jpg", "data:image/png;base64,%%%"):
+        response = client.post(
+            "/prompt/", json={"prompt": "Flat in Pasing", "images": [image, bad]}
+        )
+        assert response.status_code == 422
+        detail = response.json()["detail"]
+        assert detail.startswith(f"Image 1 ({bad[:37]}")
+        assert "not a base64-encoded image" in detail
@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+
+from backend.blob_store import BlobStore, blob_store
+from backend.main import _collect_blob_garbage
+from backend.tests.test_repository import make_record
+
+HOUR = 3600
+
+
+def save(store: BlobStore, data: bytes) -> dict:
+    class Source:
+        def __init__(self) -> None:
+            self.stream = io.BytesIO(data)
+
+        async def read(self, size: int = -1) -> bytes:
+            return self.stream.read(size)
+
+    return asyncio.run(store.save_stream(Source(), "image/png"))
+
+
+def age(store: BlobStore, blob_id: str, seconds: float) -> None:
+    past = time.time() - seconds
+    os.utime(store.path(blob_id), (past, past))
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path), chunk_size=4)
+    first = save(store, b"same image bytes")
+    second = save(store, b"same image bytes")
+    assert first == second
+    assert first["size"] == 16
+    assert asyncio.run(store.read(first["blob_id"])) == (b"same image bytes", "image/png")
+    blobs = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert sorted(blobs) == sorted([first["blob_id"], f"{first['blob_id']}.type"])
+
+
+def test_sweep_deletes_only_old_unreferenced_blobs(tmp_path):
+    store = BlobStore(str(tmp_path))
+    kept = save(store, b"referenced")["blob_id"]
+    orphan = save(store, b"orphan")["blob_id"]
+    young = save(store, b"young orphan")["blob_id"]
+    for blob_id in (kept, orphan):
+        age(store, blob_id, 2 * HOUR)
+    stale_tmp = tmp_path / ".interrupted.tmp"
+    stale_tmp.write_bytes(b"partial")
+    os.utime(stale_tmp, (time.time() - 2 * HOUR,) * 2)
+
+    assert store.sweep({kept}, min_age=HOUR) == 1
+    assert store.exists(kept)
+    assert store.exists(young)
+    assert not store.exists(orphan)
+    assert not os.path.exists(f"{store.path(orphan)}.type")
+    assert not stale_tmp.exists()
+
+
+def test_storing_again_protects_a_blob_from_the_sweep(tmp_path):
+    store = BlobStore(str(tmp_path))
+    blob_id = save(store, b"reuploaded")["blob_id"]
+    age(store, blob_id, 2 * HOUR)
+    save(store, b"reuploaded")
+    assert store.sweep(set(), min_age=HOUR) == 0
+
+
+def test_failed_upload_keeps_blobs_shared_with_other_uploads(client):
+    image = ("a.png", b"shared image", "image/png")
+    blob_id = hashlib.sha256(b"shared image").hexdigest()
+    response = client.post(
+        "/api/property/upload/multipart",
+        files=[("images", image)],
+        data={"description": "Bright flat with a balcony"},
+    )
+    assert response.status_code == 201
+
+    # Stores the same image, then fails on the second one
+    response = client.post(
+        "/api/property/upload/multipart",
+        files=[("images", image), ("images", ("b.gif", b"gif", "image/gif"))],
+        data={"description": "Bright flat with a balcony"},
+    )
+    assert response.status_code == 400
+    response = client.get(f"/api/blobs/{blob_id}")
+    assert response.status_code == 200
+    assert response.content == b"shared image"
+
+
+def test_collect_blob_garbage(repository):
+    kept = save(blob_store, b"image of a stored upload")
+    orphan = save(blob_store, b"image of a failed upload")["blob_id"]
+    repository.add(make_record(1, image_refs=[kept]))
+    for blob_id in (kept["blob_id"], orphan):
+        age(blob_store, blob_id, 2 * HOUR)
+
+    assert _collect_blob_garbage() == 1
+    assert blob_store.exists(kept["blob_id"])
+    assert not blob_store.exists(orphan)
@@ -0,0 +1,97 @@
+import asyncio
+
+from backend.benchmarks.fake_chat import FakeChatCompletion
+from backend.cache import ResponseCache
+from backend.generate_knowledge import generate_knowledge
+from backend.models import Input
+from backend.services import registry
+
+
+def test_key_is_content_addressed():
+    key = ResponseCache.key("instructions", "prompt", [b"image"])
+    assert key == ResponseCache.key("instructions", "prompt", ["image"])
+    assert key != ResponseCache.key("instructions", "prompt", [b"other image"])
+    # Parts do not run into each other
+    assert ResponseCache.key("ab", "c") != ResponseCache.key("a", "bc")
+
+
+def test_hit_and_miss():
+    cache = ResponseCache()
+
+    async def run() -> None:
+        assert await cache.get("k") is None
+        await cache.set("k", "answer")
+        assert await cache.get("k") == "answer"
+
+    asyncio.run(run())
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    cache = ResponseCache(ttl=60)
+    now = 1_000_000.0
+    monkeypatch.setattr("backend.cache.time.time", lambda: now)
+    asyncio.run(cache.set("k", "answer"))
+
+    now += 61
+    assert asyncio.run(cache.get("k")) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+
+    async def run() -> None:
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a")
+        await cache.set("c", "3")
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "1"
+        assert await cache.get("c") == "3"
+
+    asyncio.run(run())
+    assert cache.stats()["evictions"] == 1
+
+
+def test_size_limit_evicts_oldest():
+    cache = ResponseCache(max_bytes=10)
+
+    async def run() -> None:
+        await cache.set("a", "x" * 6)
+        await cache.set("b", "y" * 6)
+        assert await cache.get("a") is None
+
+    asyncio.run(run())
+    assert cache.stats()["bytes"] == 6
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    asyncio.run(ResponseCache(directory=str(tmp_path)).set("key", "answer"))
+
+    cache = ResponseCache(directory=str(tmp_path))
+    assert asyncio.run(cache.get("key")) == "answer"
+    assert cache.stats()["disk_hits"] == 1
+    # Promoted to the memory tier
+    assert cache.stats()["entries"] == 1
+
+
+def test_repeated_knowledge_requests_are_answered_from_the_cache(monkeypatch):
+    monkeypatch.setattr("backend.generate_knowledge.knowledge_cache", ResponseCache())
+    service = FakeChatCompletion(ai_model_id="fake")
+    registry.register("gpt-4o", service)
+    input = Input(prompt="Villa in Bogenhausen with a garden")
+
+    async def run() -> None:
+        first = await generate_knowledge(input)
+        calls = service.calls
+        assert await generate_knowledge(input) == first
+        assert service.calls == calls
+        await generate_knowledge(Input(prompt="Flat in Pasing"))
+        assert service.calls > calls
+
+    try:
+        asyncio.run(run())
+    finally:
+        asyncio.run(registry.aclose())
@@ -0,0 +1,52 @@
+import pytest
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from backend.benchmarks.fake_chat import COMPLETE_EXPERT_ANSWER
+from backend.completeness import listing_facts, missing_facts
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "The villa is located in Bogenhausen.",
+        "Adresse: Musterstraße 12, München",
+        "Address: Leopoldstr. 5",
+        "situated in the district of Schwabing",
+        "It lies at 221B Baker Street, London.",
+        "Die Wohnung liegt in der Maxvorstadt.",
+        "A flat in the city of Munich.",
+        "Stadtteil Sendling, ruhige Lage.",
+    ],
+)
+def test_location_with_street_district_or_city(text):
+    assert "location" in listing_facts(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "The address is not known yet.",
+        "Please provide the address.",
+        "It is located in a quiet area.",
+        "Located in an up-and-coming district.",
+        "Situated in the heart of the city.",
+        "The neighbourhood is calm.",
+        "Stellplatz available during 5 days.",
+    ],
+)
+def test_location_cue_without_place_is_missing(text):
+    assert "location" not in listing_facts(text)
+
+
+def test_missing_facts():
+    def expert(content: str) -> ChatMessageContent:
+        return ChatMessageContent(role=AuthorRole.ASSISTANT, name="Expert", content=content)
+
+    assert missing_facts([expert(COMPLETE_EXPERT_ANSWER)]) == []
+    messages = [
+        ChatMessageContent(role=AuthorRole.USER, content="Located in Schwabing, €500,000"),
+        expert("4 bedrooms on 120 m², located in a quiet street."),
+    ]
+    assert missing_facts(messages) == ["price", "location"]
+    messages.append(expert("Listed at €650.000 in Schwabing."))
+    assert missing_facts(messages) == []
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from backend.benchmarks.fake_chat import FakeChatCompletion
+from backend.groupchat import do_groupchat
+from backend.models import GeneratedKnowledge
+from backend.runtime import runtime_manager
+from backend.services import registry
+
+# A failed group chat must not wait for the orchestration timeout
+TIMEOUT = 10.0
+
+
+class UnrepairableChatCompletion(FakeChatCompletion):
+    """Returns an invalid price and answers repair requests without fixes."""
+
+    result_overrides: dict = {"property.price": "on request"}
+
+    def _respond(self, response_format, chat_history) -> str:
+        if isinstance(response_format, dict) and response_format.get("type") == "json_object":
+            return json.dumps({"fixes": []})
+        return super()._respond(response_format, chat_history)
+
+
+@pytest.fixture
+def chat():
+    service = UnrepairableChatCompletion(ai_model_id="fake")
+    registry.register("gpt-4o", service)
+    yield service
+    asyncio.run(registry.aclose())
+
+
+def test_do_groupchat_raises_after_failed_repairs(chat, monkeypatch):
+    monkeypatch.setattr(runtime_manager, "timeout", TIMEOUT)
+
+    async def run() -> None:
+        async with runtime_manager:
+            await do_groupchat(GeneratedKnowledge(), manager_mode="fast")
+
+    start = time.perf_counter()
+    with pytest.raises(ValidationError):
+        asyncio.run(run())
+    assert time.perf_counter() - start < TIMEOUT / 2
+    # Result, then one repair request per attempt
+    assert chat.calls >= 3
+
+
+def test_prompt_returns_502_after_failed_repairs(chat, repository, monkeypatch):
+    monkeypatch.setattr(runtime_manager, "timeout", TIMEOUT)
+    from backend.main import app
+
+    with TestClient(app) as client:
+        registry.register("gpt-4o", chat)
+        start = time.perf_counter()
+        response = client.post(
+            "/prompt/",
+            json={"prompt": "Villa in Bogenhausen, repair test", "manager_mode": "fast"},
+        )
+    assert response.status_code == 502
+    assert "invalid property" in response.json()["detail"]
+    assert time.perf_counter() - start < TIMEOUT / 2
+
+
+def test_concurrent_first_round_leaves_rounds_to_the_manager():
+    service = FakeChatCompletion(ai_model_id="fake")
+    registry.register("gpt-4o", service)
+    events = []
+
+    async def on_event(event: str, data: dict) -> None:
+        events.append(event)
+
+    async def run() -> None:
+        async with runtime_manager:
+            await do_groupchat(
+                GeneratedKnowledge(), on_event=on_event, expert_mode="concurrent"
+            )
+
+    try:
+        asyncio.run(run())
+    finally:
+        asyncio.run(registry.aclose())
+    # All experts at once count as one of the LLM manager's two rounds, so
+    # the manager still selects one more expert
+    assert events.count("selection") == 1
+    assert events.count("agent_turn") == 4
+    assert runtime_manager.in_flight == 0
+
+
+def test_concurrent_first_round_is_bounded_by_the_timeout(monkeypatch):
+    service = FakeChatCompletion(ai_model_id="fake", latency=5.0)
+    registry.register("gpt-4o", service)
+    monkeypatch.setattr(runtime_manager, "timeout", 0.2)
+
+    async def run() -> None:
+        async with runtime_manager:
+            await do_groupchat(GeneratedKnowledge(), expert_mode="concurrent")
+
+    start = time.perf_counter()
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(run())
+    finally:
+        asyncio.run(registry.aclose())
+    assert time.perf_counter() - start < 2
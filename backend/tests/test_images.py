@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from backend.images import preprocess_images
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def photo(width: int, height: int, shade: int = 0, mode: str = "RGB") -> bytes:
+    """A PNG with a horizontal gradient, so it has a distinct difference hash."""
+    image = Image.new(mode, (width, height))
+    image.putdata(
+        [
+            ((x * 255 // width + shade) % 256, 128, 255 - x * 255 // width)
+            + ((255,) if mode == "RGBA" else ())
+            for _ in range(height)
+            for x in range(width)
+        ]
+    )
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def mirrored(data: bytes) -> bytes:
+    image = Image.open(io.BytesIO(data)).transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_large_images_are_downscaled_to_jpeg():
+    kept, report = preprocess_images([(photo(2000, 1000), "image/png")], max_edge=512)
+    ((data, mime_type),) = kept
+    assert mime_type == "image/jpeg"
+    assert Image.open(io.BytesIO(data)).size == (512, 256)
+    assert report["bytes_saved"] > 0
+
+
+def test_transparent_images_are_flattened():
+    image = photo(600, 600, mode="RGBA")
+    kept, _ = preprocess_images([(image, "image/png")], max_edge=300)
+    assert Image.open(io.BytesIO(kept[0][0])).mode == "RGB"
+
+
+def test_exact_and_near_duplicates_are_dropped():
+    original = photo(400, 300)
+    # Same picture, another size: same difference hash
+    resized = photo(200, 150)
+    other = mirrored(original)
+    kept, report = preprocess_images(
+        [(data, "image/png") for data in (original, original, resized, other)]
+    )
+    assert len(kept) == 2
+    assert report["exact_duplicates"] == 1
+    assert report["near_duplicates"] == 1
+    assert report["kept"] == 2
+
+
+def test_image_count_is_capped():
+    images = [(photo(64, 64, shade=10 * i), "image/png") for i in range(4)]
+    kept, report = preprocess_images(images, max_images=2, dhash_distance=0)
+    assert len(kept) == 2
+    assert report["over_limit"] == 2
+
+
+def test_undecodable_data_passes_through_unchanged():
+    kept, report = preprocess_images([(b"not an image", "image/jpeg")])
+    assert kept == [(b"not an image", "image/jpeg")]
+    assert report["bytes_saved"] == 0
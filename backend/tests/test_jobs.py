@@ -0,0 +1,132 @@
+import asyncio
+import os
+import threading
+
+from backend.jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, JobQueue
+from backend.main import WORKER_ID, _requested_cancellations
+from backend.tests.test_repository import make_record
+
+
+async def finish(queue: JobQueue, jobs: int) -> None:
+    """Wait for ``jobs`` jobs to finish, then stop the queue."""
+    while sum(queue.stats()[state] for state in (COMPLETED, FAILED)) < jobs:
+        await asyncio.sleep(0.01)
+    await queue.stop()
+
+
+def test_higher_priority_runs_first():
+    order = []
+
+    async def run() -> None:
+        queue = JobQueue(workers=1)
+        await queue.start()
+
+        async def job(name: str) -> None:
+            order.append(name)
+
+        for name, priority in [("low", 0), ("high", 5), ("also low", 0)]:
+            queue.submit(name, lambda name=name: job(name), priority=priority)
+        await finish(queue, 3)
+
+    asyncio.run(run())
+    # Equal priorities keep their submission order
+    assert order == ["high", "low", "also low"]
+
+
+def test_cancel_queued_and_running_jobs():
+    updates = []
+
+    async def run() -> dict:
+        queue = JobQueue(workers=1, on_update=lambda job_id, job: updates.append(job))
+        await queue.start()
+        started = asyncio.Event()
+
+        async def forever() -> None:
+            started.set()
+            await asyncio.sleep(3600)
+
+        queue.submit("running", forever)
+        queue.submit("queued", forever)
+        await started.wait()
+        assert queue.get("running")["state"] == RUNNING
+        assert queue.cancel("queued")["state"] == CANCELLED
+        assert queue.cancel("running")["state"] == CANCELLED
+        assert queue.cancel("unknown") is None
+        await queue.flush()
+        assert queue.get("running") is None
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["cancelled"] == 2
+    assert [(job["job_id"], job["state"]) for job in updates] == [
+        ("running", QUEUED),
+        ("queued", QUEUED),
+        ("running", RUNNING),
+        ("queued", CANCELLED),
+        ("running", CANCELLED),
+    ]
+
+
+def test_updates_are_stored_in_order_off_the_event_loop():
+    updates = []
+
+    def store(job_id: str, job: dict) -> None:
+        updates.append((threading.get_ident(), job["state"]))
+
+    async def run() -> int:
+        queue = JobQueue(workers=2, on_update=store)
+        await queue.start()
+
+        async def fail() -> None:
+            raise ValueError("no listing")
+
+        queue.submit("ok", lambda: asyncio.sleep(0))
+        queue.submit("failing", fail)
+        await finish(queue, 2)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert all(thread != loop_thread for thread, _ in updates)
+    states = [state for _, state in updates]
+    for final in (COMPLETED, FAILED):
+        assert states.index(final) > states.index(RUNNING)
+    assert len(states) == 6
+
+
+def test_requested_cancellations(repository):
+    job = {"job_id": "property-0001", "submitted_at": "2025-01-01T10:00:00"}
+    repository.add(make_record(1, cancel_requested="2025-01-01T10:00:00"))
+    assert _requested_cancellations([job]) == ["property-0001"]
+    # A request for an earlier submission does not cancel a new job
+    later = dict(job, submitted_at="2025-01-01T11:00:00")
+    assert _requested_cancellations([later]) == []
+
+
+def test_cancel_a_job_of_another_worker(client, repository):
+    other_worker = f"{WORKER_ID.rpartition(':')[0]}:{os.getppid()}"
+    job = {
+        "job_id": "property-0001",
+        "state": RUNNING,
+        "priority": 0,
+        "submitted_at": "2025-01-01T10:00:00",
+        "worker": other_worker,
+    }
+    repository.add(make_record(1, job=job))
+
+    response = client.delete("/api/property/generate/property-0001")
+    assert response.status_code == 202
+    assert response.json()["status"] == RUNNING
+    assert repository.get("property-0001")["cancel_requested"] == job["submitted_at"]
+
+    # The worker died: nobody else would finish the job
+    repository.update("property-0001", job=dict(job, worker="crashed:1"))
+    response = client.delete("/api/property/generate/property-0001")
+    assert response.status_code == 200
+    assert response.json()["status"] == CANCELLED
+    assert repository.get("property-0001")["status"] == CANCELLED
+
+    response = client.delete("/api/property/generate/property-0001")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Property listing generation is already cancelled"
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from typing import Optional
+
+import pytest
+
+from backend.generate_knowledge import _answer_within_deadline, knowledge_stats
+
+
+def agent(*latencies: float, error: Optional[Exception] = None):
+    """A request whose n-th call answers after ``latencies[n]`` seconds."""
+    calls = []
+
+    async def request() -> str:
+        calls.append(None)
+        call = len(calls)
+        await asyncio.sleep(latencies[call - 1])
+        if error is not None:
+            raise error
+        return f"answer {call}"
+
+    request.calls = calls
+    return request
+
+
+def answer(request, deadline: float = 1.0, hedge_after: float = 0) -> tuple[str, bool]:
+    return asyncio.run(
+        _answer_within_deadline(
+            "test", request, "fallback", deadline=deadline, hedge_after=hedge_after
+        )
+    )
+
+
+def test_answer_before_the_deadline():
+    request = agent(0.01)
+    assert answer(request) == ("answer 1", False)
+    assert len(request.calls) == 1
+
+
+def test_fallback_after_the_deadline():
+    request = agent(5.0)
+    start = time.perf_counter()
+    assert answer(request, deadline=0.05) == ("fallback", True)
+    assert time.perf_counter() - start < 1
+    assert knowledge_stats.stats()["test"]["deadline_hits"] >= 1
+
+
+def test_hedged_request_wins_over_a_slow_first_call():
+    request = agent(5.0, 0.01)
+    assert answer(request, deadline=1.0, hedge_after=0.05) == ("answer 2", False)
+    assert len(request.calls) == 2
+    assert knowledge_stats.stats()["test"]["hedge_wins"] >= 1
+
+
+def test_no_hedge_when_the_first_call_is_fast():
+    request = agent(0.01, 0.01)
+    assert answer(request, hedge_after=0.5) == ("answer 1", False)
+    assert len(request.calls) == 1
+
+
+def test_error_is_raised_when_every_call_fails():
+    request = agent(0.01, error=RuntimeError("service down"))
+    with pytest.raises(RuntimeError, match="service down"):
+        answer(request)
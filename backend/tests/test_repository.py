@@ -0,0 +1,234 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.repository import (
+    InMemoryPropertyRepository,
+    SQLitePropertyRepository,
+    property_status,
+)
+
+START = datetime(2025, 7, 1)
+
+
+def make_record(i: int, **fields) -> dict:
+    return {
+        "id": f"property-{i:04d}",
+        "images": [],
+        "image_refs": [],
+        "description": f"Apartment {i}",
+        "user_prompt": None,
+        "uploaded_at": (START + timedelta(minutes=i)).isoformat(),
+        "processed": False,
+        **fields,
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "memory":
+        repository = InMemoryPropertyRepository()
+    else:
+        repository = SQLitePropertyRepository(str(tmp_path / "properties.db"))
+    yield repository
+    repository.close()
+
+
+def test_add_get_update(repo):
+    repo.add(make_record(1))
+
+    record = repo.get("property-0001")
+    assert record["description"] == "Apartment 1"
+    assert record["status"] == "uploaded"
+
+    updated = repo.update("property-0001", description="Bright apartment")
+    assert updated["description"] == "Bright apartment"
+    assert repo.get("property-0001")["description"] == "Bright apartment"
+
+
+def test_missing_records(repo):
+    assert repo.get("unknown") is None
+    assert repo.update("unknown", processed=True) is None
+
+
+def test_duplicate_id_is_rejected(repo):
+    repo.add(make_record(1))
+    with pytest.raises(ValueError):
+        repo.add(make_record(1))
+    assert repo.count() == 1
+
+
+def test_get_returns_a_copy(repo):
+    repo.add(make_record(1, images=["a"]))
+    repo.get("property-0001")["images"].append("b")
+    assert repo.get("property-0001")["images"] == ["a"]
+
+
+def test_status_transitions(repo):
+    repo.add(make_record(1))
+    transitions = [
+        ({"job": {"state": "queued"}}, "queued"),
+        ({"job": {"state": "running"}}, "running"),
+        ({"job": {"state": "failed"}}, "failed"),
+        ({"job": {"state": "queued"}}, "queued"),
+        ({"job": {"state": "completed"}, "processed": True}, "processed"),
+    ]
+    for changes, status in transitions:
+        assert repo.update("property-0001", **changes)["status"] == status
+        assert repo.count(status) == 1
+        assert [s["property_id"] for s in repo.list_summaries(status=status)] == [
+            "property-0001"
+        ]
+    assert repo.count("uploaded") == 0
+    assert repo.count("queued") == 0
+
+
+def test_property_status():
+    assert property_status(make_record(1)) == "uploaded"
+    assert property_status(make_record(1, job={"state": "cancelled"})) == "cancelled"
+    assert property_status(make_record(1, processed=True, job={"state": "running"})) == (
+        "processed"
+    )
+
+
+def test_list_summaries_pages_and_filters(repo):
+    repo.add_many(make_record(i) for i in range(10))
+    for i in range(0, 10, 2):
+        repo.update(f"property-{i:04d}", processed=True)
+
+    first = repo.list_summaries(limit=4)
+    assert [s["property_id"] for s in first] == [f"property-{i:04d}" for i in range(4)]
+    after = (first[-1]["uploaded_at"], first[-1]["property_id"])
+    second = repo.list_summaries(limit=4, after=after)
+    assert [s["property_id"] for s in second] == [f"property-{i:04d}" for i in range(4, 8)]
+
+    descending = repo.list_summaries(descending=True, limit=3)
+    assert [s["property_id"] for s in descending] == [
+        f"property-{i:04d}" for i in (9, 8, 7)
+    ]
+
+    processed = repo.list_summaries(status="processed")
+    assert [s["property_id"] for s in processed] == [
+        f"property-{i:04d}" for i in range(0, 10, 2)
+    ]
+
+    window = repo.list_summaries(
+        uploaded_from=(START + timedelta(minutes=3)).isoformat(),
+        uploaded_before=(START + timedelta(minutes=6)).isoformat(),
+    )
+    assert [s["property_id"] for s in window] == [f"property-{i:04d}" for i in (3, 4, 5)]
+    uploaded_from = (START + timedelta(minutes=3)).isoformat()
+    uploaded_before = (START + timedelta(minutes=6)).isoformat()
+    assert repo.count(uploaded_from=uploaded_from, uploaded_before=uploaded_before) == 3
+    assert repo.count("processed", uploaded_from=uploaded_from) == 3
+    assert repo.count(uploaded_from=START.isoformat(), uploaded_before=START.isoformat()) == 0
+
+
+def test_version_changes_on_every_write(repo):
+    versions = {repo.version()}
+    repo.add(make_record(1))
+    versions.add(repo.version())
+    repo.update("property-0001", description="Changed")
+    versions.add(repo.version())
+    assert len(versions) == 3
+    # Reads leave it alone
+    repo.get("property-0001")
+    repo.list_summaries()
+    assert repo.version() in versions
+
+
+def test_concurrent_writes(repo):
+    threads = 8
+    per_thread = 25
+
+    def write(t: int) -> None:
+        for n in range(per_thread):
+            i = t * per_thread + n
+            repo.add(make_record(i))
+            repo.update(f"property-{i:04d}", job={"state": "queued"})
+
+    workers = [threading.Thread(target=write, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert repo.count() == threads * per_thread
+    assert repo.count("queued") == threads * per_thread
+    assert len(repo.list_summaries()) == threads * per_thread
+
+
+def test_sqlite_uses_wal(tmp_path):
+    path = str(tmp_path / "properties.db")
+    repo = SQLitePropertyRepository(path)
+    repo.add(make_record(1))
+    mode = sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+    repo.close()
+
+
+def test_sqlite_is_shared_between_instances(tmp_path):
+    # Two repositories on one file behave like two uvicorn workers
+    path = str(tmp_path / "properties.db")
+    first = SQLitePropertyRepository(path)
+    second = SQLitePropertyRepository(path)
+
+    first.add(make_record(1))
+    assert second.get("property-0001")["description"] == "Apartment 1"
+
+    version = first.version()
+    second.update("property-0001", processed=True)
+    assert first.version() != version
+    assert first.get("property-0001")["status"] == "processed"
+    first.close()
+    second.close()
+
+
+def test_changes_since(repo):
+    repo.add(make_record(1))
+    repo.add(make_record(2))
+    records, version = repo.changes_since(None)
+    assert sorted(record["id"] for record in records) == ["property-0001", "property-0002"]
+    assert repo.changes_since(version) == ([], version)
+
+    repo.update("property-0002", processed=True)
+    repo.add(make_record(3))
+    records, version = repo.changes_since(version)
+    assert sorted(record["id"] for record in records) == ["property-0002", "property-0003"]
+
+    repo.update("property-0003", processed=True)
+    records, _ = repo.changes_since(version, status="processed")
+    assert [record["id"] for record in records] == ["property-0003"]
+    records, _ = repo.changes_since(None, status="processed")
+    assert sorted(record["id"] for record in records) == ["property-0002", "property-0003"]
+
+
+def test_sqlite_adds_changed_version_to_old_database(tmp_path):
+    path = str(tmp_path / "properties.db")
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE properties (
+            id TEXT PRIMARY KEY, status TEXT NOT NULL, uploaded_at TEXT NOT NULL, data TEXT NOT NULL
+        );
+        """
+    )
+    connection.execute(
+        "INSERT INTO properties VALUES (?, ?, ?, ?)",
+        ("property-0001", "uploaded", START.isoformat(), json.dumps(make_record(1))),
+    )
+    connection.commit()
+    connection.close()
+
+    repository = SQLitePropertyRepository(path)
+    try:
+        records, version = repository.changes_since(None)
+        assert [record["id"] for record in records] == ["property-0001"]
+        repository.update("property-0001", processed=True)
+        records, _ = repository.changes_since(version)
+        assert [record["id"] for record in records] == ["property-0001"]
+    finally:
+        repository.close()
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from backend.benchmarks.fake_chat import FakeChatCompletion
+from backend.groupchat import do_groupchat
+from backend.models import GeneratedKnowledge
+from backend.runtime import RuntimeManager
+from backend.services import registry
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """A runtime manager used by do_groupchat(), with a fake chat service."""
+    import backend.groupchat
+
+    registry.register("gpt-4o", FakeChatCompletion(ai_model_id="fake"))
+    manager = RuntimeManager(max_concurrency=4, timeout=10)
+    monkeypatch.setattr(backend.groupchat, "runtime_manager", manager)
+    yield manager
+    asyncio.run(registry.aclose())
+
+
+def test_orchestrations_share_one_runtime(manager):
+    async def run() -> None:
+        async with manager:
+            runtime = manager._runtime
+            assert runtime is not None
+            await asyncio.gather(*(do_groupchat(GeneratedKnowledge()) for _ in range(8)))
+            assert manager._runtime is runtime
+            # The actors and subscriptions of finished group chats are released
+            assert not runtime._agent_factories
+            assert not runtime._instantiated_agents
+            assert not runtime._subscription_manager.subscriptions
+            assert manager.in_flight == 0
+        assert not manager.started
+
+    asyncio.run(run())
+
+
+def test_stopped_manager_rejects_orchestrations(manager):
+    async def run() -> None:
+        async with manager:
+            pass
+        await do_groupchat(GeneratedKnowledge())
+
+    # Without a started manager, do_groupchat uses a short-lived one
+    asyncio.run(run())
+
+    async def run_on_stopped() -> None:
+        async with manager.slot():
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_on_stopped())
+
+
+def test_per_request_runtime(manager):
+    manager.shared = False
+
+    async def run() -> None:
+        async with manager:
+            assert manager._runtime is None
+            await do_groupchat(GeneratedKnowledge())
+
+    asyncio.run(run())
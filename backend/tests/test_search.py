@@ -0,0 +1,181 @@
+import pytest
+
+import backend.main
+from backend.generate_knowledge import nearby_listings_context
+from backend.models import Coordinates
+from backend.pricing import ComparablesEngine
+from backend.repository import SQLitePropertyRepository
+from backend.search import PropertySearchIndex
+from backend.tests.test_repository import make_record
+
+# Marienplatz, Munich
+LAT, LNG = 48.1374, 11.5755
+
+
+def make_listing(
+    title: str,
+    price: float,
+    sqft: float,
+    bedrooms: int = 2,
+    features: tuple = (),
+    description: str = "",
+    lat: float = LAT,
+    lng: float = LNG,
+) -> dict:
+    return {
+        "title": title,
+        "description": description,
+        "features": list(features),
+        "price": price,
+        "pricePerSqft": price / sqft,
+        "details": {"type": "apartment", "sqft": sqft, "bedrooms": bedrooms},
+        "location": {"coordinates": {"lat": lat, "lng": lng}},
+    }
+
+
+@pytest.fixture
+def index():
+    index = PropertySearchIndex(capacity=2)
+    index.add("a", make_listing("Sunny loft", 300_000, 800, features=["balcony"]))
+    index.add("b", make_listing("Quiet apartment", 450_000, 1000, features=["garden"]))
+    index.add(
+        "c",
+        make_listing("Sunny apartment", 600_000, 1200, description="Balcony with a view"),
+    )
+    return index
+
+
+def ids(results: list[dict]) -> list[str]:
+    return [listing["title"] for listing in results]
+
+
+def test_search_requires_every_token(index):
+    results, total = index.search("sunny balcony")
+    assert total == 2
+    assert set(ids(results)) == {"Sunny loft", "Sunny apartment"}
+    assert index.search("sunny garden") == ([], 0)
+    assert index.search("unknown") == ([], 0)
+
+
+def test_search_ranks_by_field_weight(index):
+    # "apartment" in the title outweighs "balcony" in the description
+    results, _ = index.search("balcony")
+    assert ids(results) == ["Sunny loft", "Sunny apartment"]
+
+
+def test_search_price_ranges(index):
+    results, total = index.search(ranges={"price": (400_000, None)}, sort="price_asc")
+    assert total == 2
+    assert ids(results) == ["Quiet apartment", "Sunny apartment"]
+    results, total = index.search(
+        "apartment", ranges={"price": (None, 500_000), "bedrooms": (2, 2)}
+    )
+    assert (ids(results), total) == (["Quiet apartment"], 1)
+    assert index.search(ranges={"price": (700_000, 800_000)}) == ([], 0)
+
+
+def test_search_sort_and_pages(index):
+    results, total = index.search(sort="price_desc", limit=2)
+    assert total == 3
+    assert ids(results) == ["Sunny apartment", "Quiet apartment"]
+    results, _ = index.search(sort="price_desc", limit=2, offset=2)
+    assert ids(results) == ["Sunny loft"]
+
+
+def test_search_replace_and_remove(index):
+    index.add("a", make_listing("Dark basement", 100_000, 500))
+    assert index.search("sunny")[1] == 1
+    assert ids(index.search("basement")[0]) == ["Dark basement"]
+    index.remove("a")
+    assert index.search("basement") == ([], 0)
+    assert len(index) == 2
+
+
+def test_search_rejects_unknown_fields(index):
+    with pytest.raises(ValueError):
+        index.search(ranges={"floors": (1, 2)})
+    with pytest.raises(ValueError):
+        index.search(sort="newest")
+
+
+def test_nearby():
+    engine = ComparablesEngine()
+    # 0.01 degrees of latitude are about 1.1 km
+    for i, offset in enumerate([0.001, 0.005, 0.02, 0.1]):
+        engine.add(f"p{i}", make_listing(f"Listing {i}", 400_000, 900, lat=LAT + offset))
+
+    results, total = engine.nearby(LAT, LNG, radius_km=1.0)
+    assert total == 2
+    assert [result["property_id"] for result in results] == ["p0", "p1"]
+    assert results[0]["distance_km"] == pytest.approx(0.111, abs=0.01)
+
+    results, total = engine.nearby(LAT, LNG, radius_km=5.0, limit=1)
+    assert total == 3
+    assert [result["property_id"] for result in results] == ["p0"]
+    assert engine.nearby(LAT + 1, LNG, radius_km=1.0) == ([], 0)
+
+
+def test_nearby_listings_context(monkeypatch):
+    engine = ComparablesEngine()
+    engine.add("p0", make_listing("Listing 0", 400_000, 900, lat=LAT + 0.002))
+    monkeypatch.setattr("backend.generate_knowledge.pricing_engine", engine)
+
+    # A neighbourhood centre would give fake-precise distances
+    assert nearby_listings_context(None) == ""
+    context = nearby_listings_context(Coordinates(lat=LAT, lng=LNG))
+    assert context.startswith("Listings within 1 km of the property: 1, nearest:")
+    assert "(0.2 km away)" in context
+    assert nearby_listings_context(Coordinates(lat=LAT + 1, lng=LNG)) == ""
+
+
+def test_price_merges_pending_listings():
+    engine = ComparablesEngine(merge_size=100)
+    for i in range(5):
+        engine.add(f"p{i}", make_listing(f"Listing {i}", 400_000 + i * 10_000, 900))
+    assert len(engine) == 5
+    result = engine.price(420_000, 900, 2, "apartment", LAT, LNG)
+    assert result["sample_size"] == 5
+    assert result["median_price"] == 420_000
+    assert result["market_position"] == "competitive"
+
+    # Merged on their own once merge_size listings are pending
+    engine = ComparablesEngine(merge_size=2)
+    engine.add("a", make_listing("A", 300_000, 800))
+    engine.add("b", make_listing("B", 350_000, 800))
+    assert len(engine._keys) == 2
+
+
+def test_indexes_follow_other_workers(tmp_path, monkeypatch):
+    """Listings generated by another worker show up after a sync."""
+    path = str(tmp_path / "properties.db")
+    this_worker = SQLitePropertyRepository(path)
+    other_worker = SQLitePropertyRepository(path)
+    monkeypatch.setattr(backend.main, "property_repository", this_worker)
+    monkeypatch.setattr(backend.main, "search_index", PropertySearchIndex())
+    monkeypatch.setattr(backend.main, "pricing_engine", ComparablesEngine())
+    monkeypatch.setattr(backend.main, "_indexed_version", None)
+    try:
+        other_worker.add(make_record(1))
+        other_worker.update(
+            "property-0001",
+            processed=True,
+            generated_property=make_listing("Sunny loft", 300_000, 800),
+        )
+        backend.main._rebuild_indexes()
+        assert len(backend.main.search_index) == 1
+        assert backend.main._sync_indexes() == 0
+
+        other_worker.add(make_record(2))
+        assert backend.main._sync_indexes() == 0  # Not generated yet
+        other_worker.update(
+            "property-0002",
+            processed=True,
+            generated_property=make_listing("Quiet apartment", 450_000, 1000),
+        )
+        assert backend.main._sync_indexes() == 1
+        assert ids(backend.main.search_index.search("apartment")[0]) == ["Quiet apartment"]
+        assert len(backend.main.pricing_engine) == 2
+        assert backend.main._sync_indexes() == 0
+    finally:
+        other_worker.close()
+        this_worker.close()
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from backend.models import Input
+from backend.singleflight import SingleFlight, input_key
+
+
+def test_concurrent_callers_share_one_run():
+    flights = SingleFlight()
+    runs = 0
+
+    async def work() -> dict:
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    async def run() -> list:
+        return await asyncio.gather(*(flights.run("k", work) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert runs == 1
+    assert results == [{"answer": 42}] * 5
+    assert flights.stats() == {"runs": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_later_calls_start_a_new_run():
+    flights = SingleFlight()
+    runs = []
+
+    async def work() -> int:
+        runs.append(None)
+        return len(runs)
+
+    async def run() -> None:
+        assert await flights.run("k", work) == 1
+        assert await flights.run("k", work) == 2
+        assert await flights.run("other", work) == 3
+
+    asyncio.run(run())
+
+
+def test_callers_share_the_exception():
+    flights = SingleFlight()
+
+    async def fail() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("group chat failed")
+
+    async def run() -> list:
+        return await asyncio.gather(
+            flights.run("k", fail), flights.run("k", fail), return_exceptions=True
+        )
+
+    errors = asyncio.run(run())
+    assert [str(error) for error in errors] == ["group chat failed"] * 2
+    assert flights.stats()["runs"] == 1
+
+
+def test_a_caller_going_away_does_not_cancel_the_run():
+    flights = SingleFlight()
+
+    async def work() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run() -> str:
+        first = asyncio.ensure_future(flights.run("k", work))
+        second = asyncio.ensure_future(flights.run("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_input_key():
+    base = Input(prompt="Villa in Bogenhausen")
+    assert input_key(base) == input_key(Input(prompt="Villa in Bogenhausen"))
+    for other in (
+        Input(prompt="Villa in Pasing"),
+        Input(prompt="Villa in Bogenhausen", manager_mode="fast"),
+        Input(prompt="Villa in Bogenhausen", expert_mode="concurrent"),
+        Input(prompt="Villa in Bogenhausen", max_rounds=2),
+        Input(prompt="Villa in Bogenhausen", images=["aGVsbG8="]),
+        Input(prompt="Villa in Bogenhausen", image_ids=["abc"]),
+        Input(prompt="Villa in Bogenhausen", coordinates={"lat": 48.15, "lng": 11.61}),
+    ):
+        assert input_key(other) != input_key(base)
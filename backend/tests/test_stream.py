@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.benchmarks.fake_chat import FakeChatCompletion
+from backend.services import registry
+from backend.tests.test_groupchat import UnrepairableChatCompletion
+
+
+def parse_events(text: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        data = json.loads(data.removeprefix("data: "))
+        events.append((event.removeprefix("event: "), data))
+    return events
+
+
+@pytest.fixture
+def stream(repository):
+    """Post to /prompt/stream with the given chat service; return the events."""
+    from backend.main import app
+
+    def post(service: FakeChatCompletion, **input) -> list[tuple[str, dict]]:
+        with TestClient(app) as client:
+            registry.register("gpt-4o", service)
+            response = client.post("/prompt/stream", json=input)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return parse_events(response.text)
+
+    yield post
+    asyncio.run(registry.aclose())
+
+
+def test_stream_emits_events_in_pipeline_order(stream):
+    events = stream(
+        FakeChatCompletion(ai_model_id="fake"),
+        prompt="Villa in Bogenhausen, stream test",
+        manager_mode="fast",
+    )
+    names = [event for event, _ in events]
+    knowledge = [data["agent"] for event, data in events if event == "knowledge"]
+    assert sorted(knowledge) == ["customer", "images", "location"]
+    assert names.index("images_preprocessed") < names.index("knowledge")
+    # The group chat starts once all knowledge is there
+    last_knowledge = len(names) - 1 - names[::-1].index("knowledge")
+    assert last_knowledge < names.index("agent_turn")
+    assert names.count("agent_turn") == 3
+    assert names[-1] == "result"
+    assert events[-1][1]["property"]["location"]["city"] == "Munich"
+
+
+def test_stream_ends_with_an_error_event(stream, monkeypatch):
+    from backend.runtime import runtime_manager
+
+    monkeypatch.setattr(runtime_manager, "timeout", 10.0)
+    events = stream(
+        UnrepairableChatCompletion(ai_model_id="fake"),
+        prompt="Villa in Bogenhausen, stream error test",
+        manager_mode="fast",
+    )
+    event, data = events[-1]
+    assert event == "error"
+    assert "invalid property" in data["detail"]
+    assert "result" not in [event for event, _ in events]
+
+
+def test_stream_rejects_unknown_images(client):
+    response = client.post(
+        "/prompt/stream", json={"prompt": "Flat in Pasing", "image_ids": ["missing"]}
+    )
+    assert response.status_code == 404
@@ -0,0 +1,183 @@
+# Copyright (c) Microsoft. All rights reserved.
+
+"""Token counting and prompt size statistics.
+
+Uses tiktoken when it is installed (and its encoding can be loaded), otherwise
+a character based estimate that is good enough to spot growing prompts.
+
+The context budget keeps prompts from growing with the number of rounds:
+knowledge blocks are cut to CONTEXT_KNOWLEDGE_TOKENS, and of the discussion
+only the newest turns that fit into CONTEXT_HISTORY_TOKENS are sent in full,
+older turns are shortened to their first CONTEXT_OLDER_TURN_TOKENS tokens or
+dropped.
+"""
+
+import os
+from collections.abc import Iterable, Sequence
+
+from semantic_kernel.contents import ChatMessageContent
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+CONTEXT_KNOWLEDGE_TOKENS = int(os.getenv("CONTEXT_KNOWLEDGE_TOKENS", "1500"))
+CONTEXT_HISTORY_TOKENS = int(os.getenv("CONTEXT_HISTORY_TOKENS", "4000"))
+CONTEXT_OLDER_TURN_TOKENS = int(os.getenv("CONTEXT_OLDER_TURN_TOKENS", "120"))
+
+TRUNCATION_MARKER = " […]"
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # The encoding is downloaded on first use, which fails offline
+            _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens of ``text`` (estimated without tiktoken)."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Roughly four characters per token for English and German prose
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(messages: Iterable[ChatMessageContent]) -> int:
+    """Return the prompt tokens of a list of chat messages."""
+    return sum(
+        count_tokens(str(message.content or "")) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Return the first ``max_tokens`` tokens of ``text``, marked if cut."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        head = encoding.decode(tokens[:max_tokens])
+    else:
+        if len(text) <= max_tokens * 4:
+            return text
+        head = text[: max_tokens * 4]
+    # Nicht mitten im Wort abschneiden
+    cut = head.rstrip().rfind(" ")
+    if cut > len(head) // 2:
+        head = head[:cut]
+    return head.rstrip() + TRUNCATION_MARKER
+
+
+def compact_messages(
+    messages: Sequence[ChatMessageContent],
+    budget: int,
+    older_turn_tokens: int = CONTEXT_OLDER_TURN_TOKENS,
+) -> tuple[list[ChatMessageContent], int, int]:
+    """Fit a discussion into ``budget`` tokens, keeping the newest turns intact.
+
+    Walking back from the newest message, messages are kept in full while
+    they fit, then shortened to ``older_turn_tokens`` while those fit, and
+    dropped after that. The newest message is always kept. Returns the
+    messages (the originals are not modified) and the tokens before and after.
+    """
+    costs = [
+        count_tokens(str(message.content or "")) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    ]
+    before = sum(costs)
+    if before <= budget or not messages:
+        return list(messages), before, before
+
+    kept: list[ChatMessageContent] = []
+    remaining = budget
+    full = True
+    for index in range(len(messages) - 1, -1, -1):
+        message, cost = messages[index], costs[index]
+        if full and (cost <= remaining or not kept):
+            kept.append(message)
+            remaining -= cost
+            continue
+        # Ab der ersten Nachricht, die nicht mehr passt, nur noch Auszüge
+        full = False
+        excerpt = truncate_tokens(str(message.content or ""), older_turn_tokens)
+        cost = count_tokens(excerpt) + MESSAGE_OVERHEAD_TOKENS
+        if cost > remaining:
+            break
+        kept.append(
+            ChatMessageContent(role=message.role, name=message.name, content=excerpt)
+        )
+        remaining -= cost
+    kept.reverse()
+    return kept, before, budget - remaining
+
+
+class PromptStats:
+    """Aggregates the prompt size of model calls by call name."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, dict] = {}
+
+    def record(self, call: str, tokens: int, messages: int) -> None:
+        """Record one model call with its prompt size."""
+        entry = self._calls.setdefault(
+            call, {"calls": 0, "tokens": 0, "max_tokens": 0, "max_messages": 0}
+        )
+        entry["calls"] += 1
+        entry["tokens"] += tokens
+        entry["max_tokens"] = max(entry["max_tokens"], tokens)
+        entry["max_messages"] = max(entry["max_messages"], messages)
+
+    def stats(self) -> dict:
+        """Return calls, average and maximum prompt size per call name."""
+        return {
+            call: {
+                "calls": entry["calls"],
+                "avg_tokens": entry["tokens"] / entry["calls"],
+                "max_tokens": entry["max_tokens"],
+                "max_messages": entry["max_messages"],
+            }
+            for call, entry in self._calls.items()
+        }
+
+    def clear(self) -> None:
+        """Reset all statistics."""
+        self._calls.clear()
+
+
+class CompactionStats:
+    """Tokens removed by the context budget, by kind ("knowledge", "history")."""
+
+    def __init__(self) -> None:
+        self._kinds: dict[str, dict[str, int]] = {}
+
+    def record(self, kind: str, before: int, after: int) -> None:
+        """Record one compaction check with the token counts before and after."""
+        entry = self._kinds.setdefault(
+            kind, {"checks": 0, "compacted": 0, "tokens_before": 0, "tokens_saved": 0}
+        )
+        entry["checks"] += 1
+        entry["compacted"] += after < before
+        entry["tokens_before"] += before
+        entry["tokens_saved"] += before - after
+
+    def stats(self) -> dict:
+        """Return checks, compactions, tokens before and tokens saved per kind."""
+        return {kind: dict(entry) for kind, entry in self._kinds.items()}
+
+
+manager_prompt_stats = PromptStats()
+context_stats = CompactionStats()
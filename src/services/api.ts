@@ -82,6 +82,23 @@ export interface PropertyGenerationResponse {
   recommendations: string[]
 }
 
+export interface GenerationJob {
+  job_id: string
+  state: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled'
+  priority: number
+  submitted_at: string
+  started_at: string | null
+  finished_at: string | null
+  error: string | null
+}
+
+export interface GenerationJobResponse {
+  property_id: string
+  status: string
+  priority: number
+  message: string
+}
+
 export interface PropertyStatus {
   property_id: string
   status: string
@@ -89,6 +106,8 @@ export interface PropertyStatus {
   images_count: number
   description_length: number
   processed: boolean
+  job?: GenerationJob | null
+  result?: PropertyGenerationResponse | null
 }
 
 // API Error class
@@ -235,10 +254,36 @@ export class PropertyAPI {
     }
   }
 
+  /**
+   * Upload property image files as multipart/form-data (no base64 encoding)
+   */
+  async uploadPropertyFiles(
+    files: File[],
+    description: string,
+    userPrompt?: string
+  ): Promise<PropertyUploadResponse> {
+    const formData = new FormData()
+    files.forEach(file => formData.append('images', file))
+    formData.append('description', description)
+    if (userPrompt) {
+      formData.append('user_prompt', userPrompt)
+    }
+
+    const response = await fetch(`${this.baseURL}/api/property/upload/multipart`, {
+      method: 'POST',
+      body: formData
+    })
+    return handleResponse<PropertyUploadResponse>(response)
+  }
+
   /**
    * Generate AI property listing from uploaded data
    */
-  async generatePropertyListing(propertyId: string): Promise<PropertyGenerationResponse> {
+  async generatePropertyListing(
+    propertyId: string,
+    pollIntervalMs: number = 1000,
+    timeoutMs: number = 120000
+  ): Promise<PropertyGenerationResponse> {
     if (this.useMockData || propertyId.startsWith('mock-')) {
       // Simulate AI processing delay
       await new Promise(resolve => setTimeout(resolve, 2000))
@@ -257,14 +302,31 @@ export class PropertyAPI {
     }
 
     try {
+      // Generation runs as a background job: submit it, then poll the status
       const response = await fetch(`${this.baseURL}/api/property/generate/${propertyId}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         }
       })
+      await handleResponse<GenerationJobResponse>(response)
 
-      return handleResponse<PropertyGenerationResponse>(response)
+      const deadline = Date.now() + timeoutMs
+      while (Date.now() < deadline) {
+        const status = await this.getPropertyStatus(propertyId)
+        if (status.result) {
+          return status.result
+        }
+        if (status.job && (status.job.state === 'failed' || status.job.state === 'cancelled')) {
+          throw new APIError(
+            `Generation ${status.job.state}`,
+            500,
+            status.job.error || `Listing generation ${status.job.state}`
+          )
+        }
+        await new Promise(resolve => setTimeout(resolve, pollIntervalMs))
+      }
+      throw new APIError('Generation timed out', 504, 'Listing generation did not finish in time')
     } catch (error) {
       if (error instanceof APIError) {
         throw error
@@ -276,6 +338,16 @@ export class PropertyAPI {
     }
   }
 
+  /**
+   * Cancel a queued or running listing generation
+   */
+  async cancelPropertyGeneration(propertyId: string): Promise<GenerationJobResponse> {
+    const response = await fetch(`${this.baseURL}/api/property/generate/${propertyId}`, {
+      method: 'DELETE'
+    })
+    return handleResponse<GenerationJobResponse>(response)
+  }
+
   /**
    * Get property upload status
    */
@@ -308,7 +380,7 @@ export class PropertyAPI {
   /**
    * List all properties (for development)
    */
-  async listAllProperties(): Promise<{ properties: any[]; total: number }> {
+  async listAllProperties(): Promise<{ properties: any[]; total: number; next_cursor?: string | null }> {
     if (this.useMockData) {
       return {
         properties: [
@@ -324,7 +396,7 @@ export class PropertyAPI {
 
     try {
       const response = await fetch(`${this.baseURL}/api/property/list`)
-      return handleResponse<{ properties: any[]; total: number }>(response)
+      return handleResponse<{ properties: any[]; total: number; next_cursor?: string | null }>(response)
     } catch (error) {
       if (error instanceof APIError) {
         throw error